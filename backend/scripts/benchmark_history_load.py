@@ -0,0 +1,170 @@
+#!python3
+
+"""
+Compare rebuilding status logs from a persisted history by replaying
+add_sample against the bulk from_data path, and the legacy json history
+files against the columnar (.npz) format
+
+Generates a 7 day, 5 s sampled history for several channels
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import json
+import pathlib as pt
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from waterer_backend.history_file import load_history_file, save_history_file
+from waterer_backend.models import (
+    BinaryStatusLogData,
+    FloatStatusLogData,
+    SmartPumpStatusData,
+)
+from waterer_backend.status_log import BinaryStatusLog, FloatStatusLog
+
+###############################################################
+# Definitions
+###############################################################
+
+NUM_CHANNELS = 4
+SAMPLE_INTERVAL_S = 5
+HISTORY_DURATION_S = 3600 * 24 * 7
+
+###############################################################
+# Functions
+###############################################################
+
+
+def make_history(seed: int) -> SmartPumpStatusData:
+
+    rng = np.random.default_rng(seed)
+
+    times = 1.6e9 + np.arange(0, HISTORY_DURATION_S, SAMPLE_INTERVAL_S)
+    times += rng.uniform(0, 0.1, len(times))
+
+    humidity_V = 1.5 + np.cumsum(rng.normal(0, 1e-3, len(times)))
+    pump_running = rng.random(len(times)) < 0.01
+
+    return SmartPumpStatusData(
+        rel_humidity_V_log=FloatStatusLogData(
+            times=times.tolist(), values=humidity_V.tolist()
+        ),
+        smoothed_rel_humidity_V_log=FloatStatusLogData(
+            times=times.tolist(), values=humidity_V.tolist()
+        ),
+        pump_status_log=BinaryStatusLogData(
+            times=times.tolist(), values=pump_running.tolist()
+        ),
+    )
+
+
+def replay_logs(history: SmartPumpStatusData) -> None:
+
+    for float_data in [
+        history.rel_humidity_V_log,
+        history.smoothed_rel_humidity_V_log,
+    ]:
+        float_log = FloatStatusLog()
+        for time, value in zip(float_data.times, float_data.values):
+            float_log.add_sample(time, value)
+
+    binary_log = BinaryStatusLog()
+    for time, value in zip(
+        history.pump_status_log.times, history.pump_status_log.values
+    ):
+        binary_log.add_sample(time, value)
+
+
+def bulk_load_logs(history: SmartPumpStatusData) -> None:
+
+    FloatStatusLog.from_data(history.rel_humidity_V_log)
+    FloatStatusLog.from_data(history.smoothed_rel_humidity_V_log)
+    BinaryStatusLog.from_data(history.pump_status_log)
+
+
+###############################################################
+# Main
+###############################################################
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as history_dir:
+
+        filepaths = []
+        for channel in range(NUM_CHANNELS):
+            filepath = pt.Path(history_dir) / f"pump_{channel}_history.json"
+            with open(filepath, "w") as fh:
+                json.dump(make_history(channel).dict(), fh)
+            filepaths.append(filepath)
+
+        print(
+            f"{NUM_CHANNELS} channels of {HISTORY_DURATION_S // SAMPLE_INTERVAL_S} samples"
+        )
+
+        T0 = perf_counter()
+        histories = []
+        for filepath in filepaths:
+            with open(filepath, "r") as fh:
+                histories.append(SmartPumpStatusData(**json.load(fh)))
+        print(f"parse json:  {perf_counter() - T0:.2f} s")
+
+        T0 = perf_counter()
+        for history in histories:
+            replay_logs(history)
+        print(f"replay:      {perf_counter() - T0:.2f} s")
+
+        T0 = perf_counter()
+        for history in histories:
+            bulk_load_logs(history)
+        print(f"bulk load:   {perf_counter() - T0:.2f} s")
+
+        logs = []
+        for history in histories:
+            logs.append(
+                {
+                    "rel_humidity_V_log": FloatStatusLog.from_data(
+                        history.rel_humidity_V_log
+                    ),
+                    "smoothed_rel_humidity_V_log": FloatStatusLog.from_data(
+                        history.smoothed_rel_humidity_V_log
+                    ),
+                    "pump_status_log": BinaryStatusLog.from_data(
+                        history.pump_status_log
+                    ),
+                }
+            )
+
+        T0 = perf_counter()
+        for channel in range(NUM_CHANNELS):
+            with open(filepaths[channel], "w") as fh:
+                json.dump(
+                    SmartPumpStatusData(
+                        **{name: log.to_data() for name, log in logs[channel].items()}
+                    ).dict(),
+                    fh,
+                )
+        print(f"save json:   {perf_counter() - T0:.2f} s")
+
+        T0 = perf_counter()
+        archive_filepaths = []
+        for channel in range(NUM_CHANNELS):
+            archive_filepath = pt.Path(history_dir) / f"pump_{channel}_history.npz"
+            save_history_file(archive_filepath, logs[channel])
+            archive_filepaths.append(archive_filepath)
+        print(f"save npz:    {perf_counter() - T0:.2f} s")
+
+        T0 = perf_counter()
+        for archive_filepath in archive_filepaths:
+            arrays = load_history_file(archive_filepath)
+            FloatStatusLog.from_arrays(*arrays["rel_humidity_V_log"])
+            FloatStatusLog.from_arrays(*arrays["smoothed_rel_humidity_V_log"])
+            BinaryStatusLog.from_arrays(*arrays["pump_status_log"])
+        print(f"load npz:    {perf_counter() - T0:.2f} s")
+
+        json_size = sum(filepath.stat().st_size for filepath in filepaths)
+        archive_size = sum(filepath.stat().st_size for filepath in archive_filepaths)
+        print(f"size json: {json_size / 1e6:.1f} MB, npz: {archive_size / 1e6:.1f} MB")
@@ -0,0 +1,111 @@
+#!python3
+
+"""
+Compare the memory used by (and the speed of) FloatStatusLogs storing
+their samples raw and compressed
+
+Generates 30 days of 5 s sampled humidity voltages all of which are
+retained at full resolution
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+from time import perf_counter
+
+import numpy as np
+from waterer_backend.models import FloatStatusLogSettings
+from waterer_backend.status_log import FloatStatusLog
+
+###############################################################
+# Definitions
+###############################################################
+
+SAMPLE_INTERVAL_S = 5
+HISTORY_DURATION_S = 3600 * 24 * 30
+NUM_APPENDED = 10000
+
+# of the embedded analogue input
+STEP_RESOLUTION_V = 5 / 1023
+
+###############################################################
+# Functions
+###############################################################
+
+
+def make_samples(seed: int) -> dict:
+
+    rng = np.random.default_rng(seed)
+
+    times = 1.6e9 + np.arange(0, HISTORY_DURATION_S, SAMPLE_INTERVAL_S)
+    times += rng.uniform(0, 0.1, len(times))
+
+    # (single precision) multiples of the ADC step
+
+    drift = 300 + np.cumsum(rng.normal(0, 0.05, len(times)))
+    steps = np.round(drift + rng.normal(0, 0.5, len(times)))
+    humidity_V = (steps * np.float32(STEP_RESOLUTION_V)).astype(np.float32)
+
+    # exponentially smoothed
+
+    smoothed_humidity_V = np.empty(len(times))
+    smoothed_humidity_V[0] = humidity_V[0]
+    for index in range(1, len(times)):
+        smoothed_humidity_V[index] = (
+            0.9 * smoothed_humidity_V[index - 1] + 0.1 * humidity_V[index]
+        )
+
+    return {
+        "humidity": (times, humidity_V.astype(np.float64)),
+        "smoothed humidity": (times, smoothed_humidity_V),
+    }
+
+
+###############################################################
+# Main
+###############################################################
+
+if __name__ == "__main__":
+
+    settings = FloatStatusLogSettings(
+        low_res_switchover_age_s=3600,
+        low_res_interval_s=0,
+        low_res_max_age_s=HISTORY_DURATION_S,
+    )
+
+    for name, (times, values) in make_samples(0).items():
+
+        print(f"{name}: {len(times)} samples")
+
+        for compress_samples in [False, True]:
+
+            log = FloatStatusLog(
+                settings.copy(update={"compress_samples": compress_samples})
+            )
+
+            T0 = perf_counter()
+            log.add_samples(times[:-NUM_APPENDED], values[:-NUM_APPENDED])
+            load_time_s = perf_counter() - T0
+
+            T0 = perf_counter()
+            for time, value in zip(times[-NUM_APPENDED:], values[-NUM_APPENDED:]):
+                log.add_sample(time, value)
+            append_time_s = (perf_counter() - T0) / NUM_APPENDED
+
+            T0 = perf_counter()
+            log.get_arrays()
+            query_all_time_s = perf_counter() - T0
+
+            T0 = perf_counter()
+            log.get_arrays(times[-1] - 3600 * 24)
+            query_day_time_s = perf_counter() - T0
+
+            print(
+                f"  {'compressed' if compress_samples else 'raw':>10}: "
+                f"{log.nbytes / 1e6:5.2f} MB ({log.nbytes / len(times):4.1f} B/sample), "
+                f"load {load_time_s:.3f} s, "
+                f"append {append_time_s * 1e6:.0f} us, "
+                f"query all {query_all_time_s * 1e3:.1f} ms, "
+                f"last day {query_day_time_s * 1e3:.1f} ms"
+            )
@@ -0,0 +1,88 @@
+#!python3
+
+"""
+Compare the per-message cost of serializing and parsing requests/responses
+with the schema loaded (and compiled) on every call against the cached
+protocol codec
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import json
+import pathlib as pt
+from dataclasses import asdict
+from time import perf_counter
+
+import jsonschema
+import pkg_resources as rc
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+
+###############################################################
+# Definitions
+###############################################################
+
+NUM_MESSAGES = 2000
+
+###############################################################
+# Functions
+###############################################################
+
+
+def legacy_check_valid(message_str: str, schema_filename: str) -> None:
+    """
+    n.b. as check_valid prior to the protocol codec
+    """
+
+    schema_filepath = rc.resource_filename(
+        "waterer_backend", str(pt.Path("config") / schema_filename)
+    )
+
+    with open(schema_filepath, "r") as fh:
+        schema = json.load(fh)
+
+    validator = jsonschema.Draft7Validator(schema=schema)
+
+    validator.validate(json.loads(message_str))
+
+
+def legacy_round_trip(request: Request, response: Response) -> None:
+
+    # serialize the request
+    request_str = json.dumps(asdict(request))
+    legacy_check_valid(request_str, "request_schema.json")
+
+    # parse the response
+    response_str = json.dumps(asdict(response))
+    legacy_check_valid(response_str, "response_schema.json")
+    Response(**json.loads(response_str))
+
+
+def codec_round_trip(request: Request, response: Response) -> None:
+
+    request.serialize()
+
+    Response.create(repr(response))
+
+
+###############################################################
+# Main
+###############################################################
+
+if __name__ == "__main__":
+
+    request = Request(channel=1, instruction="get_voltage", data=0, id=1234)
+    response = Response(1234, 1, "get_voltage", True, 2.4853515625, "")
+
+    for label, round_trip in [
+        ("legacy", legacy_round_trip),
+        ("codec", codec_round_trip),
+    ]:
+        T0 = perf_counter()
+        for _ in range(NUM_MESSAGES):
+            round_trip(request, response)
+        dt_us = 1e6 * (perf_counter() - T0) / NUM_MESSAGES
+
+        print(f"{label:8s} {dt_us:8.1f} us per request/response")
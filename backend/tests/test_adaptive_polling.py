@@ -0,0 +1,82 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import pytest
+from pydantic import ValidationError
+from waterer_backend.adaptive_polling import next_status_update_interval_s
+from waterer_backend.models import SmartPumpSettings
+
+###############################################################
+# Definitions
+###############################################################
+
+SETTINGS = SmartPumpSettings(
+    min_status_update_interval_s=1,
+    max_status_update_interval_s=60,
+    polling_change_threshold_V=0.1,
+)
+
+###############################################################
+# Tests
+###############################################################
+
+
+@pytest.mark.parametrize(
+    "pump_running, pump_switched", [(True, False), (False, True), (True, True)]
+)
+def test_minimum_interval_around_activation(pump_running, pump_switched):
+
+    assert (
+        next_status_update_interval_s(30, SETTINGS, pump_running, pump_switched, 0)
+        == SETTINGS.min_status_update_interval_s
+    )
+
+
+def test_flat_signal_backs_off_to_maximum():
+
+    interval_s = 1.0
+    for _ in range(20):
+        interval_s = next_status_update_interval_s(
+            interval_s, SETTINGS, False, False, 0.001
+        )
+
+    assert interval_s == SETTINGS.max_status_update_interval_s
+
+
+def test_rapid_change_speeds_up_to_minimum():
+
+    assert next_status_update_interval_s(40, SETTINGS, False, False, -0.2) == 20
+
+    interval_s = 40.0
+    for _ in range(20):
+        interval_s = next_status_update_interval_s(
+            interval_s, SETTINGS, False, False, 0.2
+        )
+
+    assert interval_s == SETTINGS.min_status_update_interval_s
+
+
+def test_moderate_change_or_first_sample_holds_interval():
+
+    assert next_status_update_interval_s(10, SETTINGS, False, False, 0.05) == 10
+    assert next_status_update_interval_s(10, SETTINGS, False, False, None) == 10
+    assert next_status_update_interval_s(100, SETTINGS, False, False, None) == 60
+
+
+def test_settings_bounds_are_validated():
+
+    assert not SmartPumpSettings().adaptive_polling
+
+    for bounds in (
+        dict(min_status_update_interval_s=0),
+        dict(min_status_update_interval_s=10, max_status_update_interval_s=5),
+        dict(polling_change_threshold_V=-0.1),
+    ):
+        with pytest.raises(ValidationError):
+            SmartPumpSettings(adaptive_polling=True, **bounds)
+
+    with pytest.raises(ValidationError):
+        SmartPumpSettings.parse_obj({"max_status_update_interval_s": 0.5})
@@ -0,0 +1,229 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import asyncio
+import json
+import os
+import pty
+import select
+import threading
+import tty
+
+import pytest
+import waterer_backend.binary_frame as bf
+from waterer_backend.async_embedded_arduino import AsyncEmbeddedArduino
+from waterer_backend.async_smart_pump import AsyncSmartPump
+from waterer_backend.embedded_arduino import ALLOW_FAKE_DATA_KEY
+from waterer_backend.models import SmartPumpSettings
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+
+###############################################################
+# Functions
+###############################################################
+
+
+def _serve(master_fd: int, version: float = 1.0) -> None:
+    """
+    Arduino on the other end of a pty: replies with the voltage of the channel
+    (and to frames if the version supports them)
+    """
+
+    # n.b. repeated until the first request as pyserial discards any input
+    # received before the port is opened (the repeats are discarded as
+    # unparseable responses)
+    while not select.select([master_fd], [], [], 0.05)[0]:
+        os.write(master_fd, b"Arduino ready\r\n")
+
+    with os.fdopen(master_fd, "rb", buffering=0) as fh:
+        line = b""
+        while True:
+            try:
+                char = fh.read(1)
+            except OSError:
+                return
+            if not char:
+                return
+
+            line += char
+
+            is_frame = line[0] == bf.REQUEST_SYNC
+            if is_frame and len(line) == bf.REQUEST_FRAME_SIZE:
+                request = bf.decode_request(line)
+            elif not is_frame and line.endswith(b"\n"):
+                request = Request(**json.loads(line))
+            else:
+                continue
+
+            line = b""
+
+            assert request.id is not None
+            response = Response(
+                request.id,
+                request.channel,
+                request.instruction,
+                True,
+                version
+                if request.instruction == "get_version"
+                else 0.5 * request.channel,
+                "",
+            )
+
+            if is_frame:
+                os.write(master_fd, bf.encode_response(response))
+            else:
+                os.write(master_fd, f"{response.serialize()}\r\n".encode())
+
+
+def _start_arduino(version: float = 1.0) -> int:
+    """
+    Returns:
+        slave_fd: of the pty served by the arduino
+    """
+
+    master_fd, slave_fd = pty.openpty()
+
+    # n.b. otherwise the startup message is echoed back to the arduino
+    tty.setraw(slave_fd)
+
+    threading.Thread(target=_serve, args=(master_fd, version), daemon=True).start()
+
+    return slave_fd
+
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_requests_in_flight():
+
+    slave_fd = _start_arduino()
+
+    async def run():
+        device = AsyncEmbeddedArduino(port=os.ttyname(slave_fd), timeout_s=2)
+        await device.connect()
+
+        responses = await asyncio.gather(
+            *[
+                device.make_request(Request(channel, "get_voltage", 0))
+                for channel in range(3)
+            ]
+        )
+
+        await device.disconnect()
+
+        return responses
+
+    responses = asyncio.run(run())
+    os.close(slave_fd)
+
+    assert [response.data for response in responses] == [0.0, 0.5, 1.0]
+
+
+def test_binary_framing_negotiated():
+
+    slave_fd = _start_arduino(version=bf.BINARY_FRAMING_MIN_VERSION)
+
+    async def run():
+        device = AsyncEmbeddedArduino(port=os.ttyname(slave_fd), timeout_s=2)
+        await device.connect()
+        binary_framing = device._binary_framing
+
+        # n.b. the voltage of channel 69 (34.5 V) is packed with a newline
+        responses = await asyncio.gather(
+            *[
+                device.make_request(Request(channel, "get_voltage", 0))
+                for channel in (1, 69, 3)
+            ]
+        )
+
+        await device.disconnect()
+
+        return binary_framing, responses
+
+    binary_framing, responses = asyncio.run(run())
+    os.close(slave_fd)
+
+    assert binary_framing
+    assert [response.data for response in responses] == [0.5, 34.5, 1.5]
+
+
+def test_async_smart_pump_with_fake_data(monkeypatch: pytest.MonkeyPatch):
+
+    monkeypatch.setenv(ALLOW_FAKE_DATA_KEY, "1")
+
+    async def run():
+        pump = AsyncSmartPump(
+            channel=0,
+            device=AsyncEmbeddedArduino(),
+            settings=SmartPumpSettings(),
+            auto_save_interval_s=None,
+        )
+
+        await pump.step()
+        await pump.step()
+
+        return pump.get_status_since(None)
+
+    history = asyncio.run(run())
+
+    assert len(history.rel_humidity_V) == 2
+    assert all(0 <= value <= 5 for value in history.rel_humidity_V)
+
+
+def test_concurrent_status_requests_share_a_read(monkeypatch: pytest.MonkeyPatch):
+
+    monkeypatch.setenv(ALLOW_FAKE_DATA_KEY, "1")
+
+    async def run():
+        pump = AsyncSmartPump(
+            channel=0,
+            device=AsyncEmbeddedArduino(),
+            settings=SmartPumpSettings(),
+            auto_save_interval_s=None,
+        )
+
+        await pump.get_status()
+        await pump.get_status()
+        await asyncio.gather(*[pump.get_status(max_age_s=0) for _ in range(5)])
+
+        return pump.get_status_since(None)
+
+    history = asyncio.run(run())
+
+    assert len(history.rel_humidity_V) == 2
+
+
+def test_async_smart_pump_saves_off_the_event_loop(monkeypatch: pytest.MonkeyPatch):
+
+    monkeypatch.setenv(ALLOW_FAKE_DATA_KEY, "1")
+
+    save_threads = []
+
+    async def run():
+        pump = AsyncSmartPump(
+            channel=0,
+            device=AsyncEmbeddedArduino(),
+            settings=SmartPumpSettings(),
+            auto_save_interval_s=0,  # n.b. after every sample
+            journal_batch_size=100,
+        )
+        monkeypatch.setattr(
+            pump, "save_history", lambda: save_threads.append(threading.get_ident())
+        )
+
+        pump.start()
+        await pump.step()
+        await pump.step()
+        await pump.interrupt()
+
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert len(save_threads) == 2
+    assert loop_thread not in save_threads
@@ -0,0 +1,93 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import pytest
+import waterer_backend.binary_frame as bf
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_crc16():
+    # n.b. the CRC-16/CCITT-FALSE check value (as computed by Frame.cpp)
+    assert bf.crc16(b"123456789") == 0x29B1
+
+
+def test_request_round_trip():
+
+    request = Request(channel=2, instruction="turn_on", data=30, id=9999)
+
+    frame = bf.encode_request(request)
+
+    assert len(frame) == bf.REQUEST_FRAME_SIZE
+    assert bf.decode_request(frame) == request
+
+
+def test_response_round_trip():
+
+    response = Response(
+        id=42,
+        channel=-1,
+        instruction="get_all_status",
+        success=True,
+        data=2,
+        message="",
+        values=[1.5, 1.0, 2.25, 0.0],
+    )
+
+    frame = bf.encode_response(response)
+
+    assert len(frame) == bf.response_frame_size(frame)
+    assert bf.decode_response(frame) == response
+
+
+def test_error_response():
+
+    response = Response(1, 9, "get_voltage", False, -1, "Invalid channel")
+
+    decoded = bf.decode_response(bf.encode_response(response))
+
+    assert not decoded.success
+    assert decoded.message == "Invalid channel"
+
+
+def test_corrupt_frame():
+
+    frame = bytearray(bf.encode_request(Request(0, "get_state", 0, id=3)))
+    frame[5] ^= 0x01
+
+    with pytest.raises(ValueError):
+        bf.decode_request(bytes(frame))
+
+
+def test_unframeable_request():
+
+    with pytest.raises(ValueError):
+        bf.encode_request(Request(0, "set_speed", 0, id=1))
+
+    with pytest.raises(ValueError):
+        bf.encode_request(Request(0, "get_state", 0, id=70000))
+
+
+def test_pop_message():
+
+    frame = bf.encode_response(Response(7, 0, "get_voltage", True, 34.5, ""))
+    assert b"\n" in frame
+
+    buffer = bytearray(b"Arduino ready\r\n" + frame + b'{"id": 8}\r\n')
+
+    assert bf.pop_message(buffer) == "Arduino ready\r\n"
+
+    # n.b. an incomplete frame waits for the rest
+    partial = bytearray(buffer[:5])
+    assert bf.pop_message(partial) is None
+
+    assert bf.pop_message(buffer) == frame
+    assert bf.pop_message(buffer) == '{"id": 8}\r\n'
+    assert bf.pop_message(buffer) is None
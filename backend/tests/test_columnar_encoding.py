@@ -0,0 +1,85 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import numpy as np
+from waterer_backend.columnar_encoding import (
+    COLUMNAR_CONTENT_TYPE,
+    JSON_CONTENT_TYPE,
+    decode_histories,
+    decode_records,
+    encode_histories,
+    encode_statuses,
+    negotiate_content_type,
+)
+from waterer_backend.models import SmartPumpStatus, SmartPumpStatusHistory
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_negotiate_content_type():
+
+    assert negotiate_content_type(None) == JSON_CONTENT_TYPE
+    assert negotiate_content_type("*/*") == JSON_CONTENT_TYPE
+    assert negotiate_content_type(COLUMNAR_CONTENT_TYPE) == COLUMNAR_CONTENT_TYPE
+    assert (
+        negotiate_content_type(f"{COLUMNAR_CONTENT_TYPE}, application/json;q=0.5")
+        == COLUMNAR_CONTENT_TYPE
+    )
+    assert (
+        negotiate_content_type(f"{COLUMNAR_CONTENT_TYPE};q=0.5, application/json")
+        == JSON_CONTENT_TYPE
+    )
+    assert negotiate_content_type(f"{COLUMNAR_CONTENT_TYPE};q=0") == JSON_CONTENT_TYPE
+
+
+def test_history_round_trip_shares_time_axes():
+
+    times = [100.0, 105.0, 110.0]
+    history = SmartPumpStatusHistory(
+        rel_humidity_V=[1.5, None, 2.25],
+        rel_humidity_V_epoch_time=times,
+        rel_humidity_pcnt=[50.0, None, 25.0],
+        rel_humidity_pcnt_epoch_time=times,
+        smoothed_rel_humidity_pcnt=[50.0, 45.0, 40.0],
+        smoothed_rel_humidity_pcnt_epoch_time=times,
+        pump_running=[0, 1],
+        pump_running_epoch_time=[100.0, 107.5],
+        cursor="0123abcd-42",
+    )
+
+    data = encode_histories([history, history])
+
+    (record, _) = decode_records(data)
+    assert list(record.axes) == [
+        "rel_humidity_V_epoch_time",
+        "pump_running_epoch_time",
+    ]
+    assert record.columns["rel_humidity_pcnt"][0] == "rel_humidity_V_epoch_time"
+    assert record.texts["cursor"] == "0123abcd-42"
+
+    assert decode_histories(data) == [history, history]
+
+
+def test_statuses_are_a_column_per_field():
+
+    statuses = [
+        SmartPumpStatus(
+            rel_humidity_V=1.5,
+            rel_humidity_pcnt=50.0,
+            smoothed_rel_humidity_pcnt=None,
+            pump_running=channel,
+            epoch_time=100.0 + channel,
+        )
+        for channel in range(2)
+    ]
+
+    (record,) = decode_records(encode_statuses(statuses))
+
+    np.testing.assert_array_equal(record.axes["epoch_time"], [100.0, 101.0])
+    np.testing.assert_array_equal(record.columns["pump_running"][1], [0, 1])
+    assert np.isnan(record.columns["smoothed_rel_humidity_pcnt"][1]).all()
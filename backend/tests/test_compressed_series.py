@@ -0,0 +1,90 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import numpy as np
+from waterer_backend.compressed_series import CompressedSeries
+from waterer_backend.models import FloatStatusLogSettings
+from waterer_backend.status_log import FloatStatusLog
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_round_trip_is_lossless():
+
+    rng = np.random.default_rng(0)
+
+    times = 1.6e9 + np.cumsum(rng.uniform(4.9, 5.1, 1000))
+    values = rng.integers(0, 1024, 1000) * 0.0048828125
+    values[::7] = np.nan
+    values[1] = -np.inf
+
+    series = CompressedSeries(block_size=64)
+    series.extend(times[:500], values[:500])
+    for time, value in zip(times[500:], values[500:]):
+        series.append(time, value)
+
+    assert len(series) == 1000
+    assert series.num_blocks == 15
+
+    decoded_times, decoded_values = series.snapshot().get_arrays()
+
+    assert decoded_times.view(np.int64).tolist() == times.view(np.int64).tolist()
+    assert decoded_values.view(np.int64).tolist() == values.view(np.int64).tolist()
+
+
+def test_fifo():
+
+    series = CompressedSeries(block_size=4)
+
+    for p in range(10):
+        series.append(p, 2 * p)
+
+    assert series.popleft() == (0, 0)
+    series.drop_left(4)
+
+    assert len(series) == 5
+    assert series.first() == 5
+    assert series.last(1) == 18
+
+    snapshot = series.snapshot()
+    series.drop_left(3)
+    series.append(10, 20)
+
+    assert snapshot.get_arrays()[0].tolist() == [5, 6, 7, 8, 9]
+    assert snapshot.get_arrays(5, 8)[1].tolist() == [12, 14, 16]
+    assert snapshot.get_newest() == (9, 18)
+
+    assert series.column(0).tolist() == [8, 9, 10]
+
+
+def test_compressed_float_log_matches_uncompressed():
+
+    rng = np.random.default_rng(1)
+
+    times = 1.6e9 + np.arange(3000) * 5 + rng.uniform(0, 0.1, 3000)
+    values = rng.integers(0, 1024, 3000) * 0.0048828125
+
+    settings = FloatStatusLogSettings(
+        low_res_switchover_age_s=500, low_res_interval_s=20, low_res_max_age_s=5000
+    )
+    log = FloatStatusLog(settings)
+    compressed_log = FloatStatusLog(settings.copy(update={"compress_samples": True}))
+
+    for time, value in zip(times[:2000], values[:2000]):
+        log.add_sample(time, value)
+        compressed_log.add_sample(time, value)
+
+    log.add_samples(times[2000:], values[2000:])
+    compressed_log.add_samples(times[2000:], values[2000:])
+
+    for min_time_s, max_time_s in [(None, None), (times[100], times[2900])]:
+        assert compressed_log.get_values(min_time_s, max_time_s) == log.get_values(
+            min_time_s, max_time_s
+        )
+
+    assert compressed_log.get_newest_value() == log.get_newest_value()
@@ -0,0 +1,56 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import numpy as np
+import pytest
+from waterer_backend.downsample import downsample_min_max
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_few_samples_are_unchanged():
+
+    times = np.arange(10.0)
+    values = np.arange(10.0)
+
+    sampled_times, sampled_values = downsample_min_max(times, values, 10)
+
+    assert sampled_times is times and sampled_values is values
+
+    with pytest.raises(ValueError):
+        downsample_min_max(times, values, 3)
+
+
+def test_peaks_and_ends_are_kept():
+
+    times = np.arange(100000.0)
+    values = np.sin(times / 1000)
+    values[12345] = 10
+    values[54321] = -10
+
+    sampled_times, sampled_values = downsample_min_max(times, values, 200)
+
+    assert len(sampled_times) <= 200
+    assert np.all(np.diff(sampled_times) > 0)
+    assert sampled_times[0] == 0 and sampled_times[-1] == times[-1]
+    assert 12345 in sampled_times and 54321 in sampled_times
+    assert np.array_equal(sampled_values, values[sampled_times.astype(int)])
+
+
+def test_missing_values_only_fill_empty_buckets():
+
+    times = np.arange(1000.0)
+    values = np.ones(1000)
+    values[::2] = np.nan  # n.b. e.g. while the pump ran
+    values[500:600] = np.nan
+
+    sampled_times, sampled_values = downsample_min_max(times, values, 42)
+
+    gap = (sampled_times >= 500) & (sampled_times < 600)
+    assert np.isnan(sampled_values[gap]).all() and gap.any()
+    assert not np.isnan(sampled_values[~gap][1:]).any()
@@ -0,0 +1,81 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+from waterer_backend.history_cursor import (
+    SampleSequence,
+    etag_matches,
+    history_etag,
+    seq_of_cursor,
+)
+from waterer_backend.models import SmartPumpSettings
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_sequence_numbers_resolve_to_sample_times():
+
+    sequence = SampleSequence(window=3)
+    assert sequence.latest == 0
+
+    for time_s in [10.0, 20.0, 30.0, 40.0]:
+        sequence.append(time_s)
+
+    assert sequence.latest == 4
+    assert sequence.time_of(1) is None  # n.b. outside of the window
+    assert sequence.time_of(2) == 20.0
+    assert sequence.time_of(4) == 40.0
+    assert sequence.time_of(5) is None
+
+    # n.b. the cursor of the 3rd sample
+    sequence_3 = SampleSequence()
+    for time_s in [10.0, 20.0, 30.0]:
+        sequence_3.append(time_s)
+    cursor = sequence_3.cursor
+
+    assert seq_of_cursor(cursor) == 3
+    assert sequence.earliest_time_s(None, cursor) == 30.0
+    assert sequence.earliest_time_s(35.0, cursor) == 35.0
+    assert sequence.earliest_time_s(5.0, None) == 5.0
+    assert sequence.earliest_time_s(None, cursor.replace("-3", "-1")) is None
+
+    sequence.clear()
+    assert sequence.latest == 5
+    assert sequence.time_of(4) is None
+
+
+def test_cursors_of_other_server_runs_are_unknown():
+
+    sequence = SampleSequence()
+    for time_s in [10.0, 20.0, 30.0]:
+        sequence.append(time_s)
+
+    _, _, seq = sequence.cursor.rpartition("-")
+
+    for cursor in [f"0123abcd-{seq}", seq, int(seq), "", "garbage"]:
+        assert seq_of_cursor(cursor) is None  # type: ignore
+        assert sequence.earliest_time_s(None, cursor) is None  # type: ignore
+        assert sequence.earliest_time_s(5.0, cursor) == 5.0  # type: ignore
+
+
+def test_history_etag():
+
+    settings = [SmartPumpSettings()]
+    query = {"earliest_time": None, "since_cursor": "a-3"}
+
+    etag = history_etag(["a-3"], settings, query)
+
+    assert etag == history_etag(["a-3"], settings, {**query, "since_cursor": "a-4"})
+    assert etag != history_etag(["a-4"], settings, query)
+    assert etag != history_etag(["a-3"], [SmartPumpSettings(dry_humidity_V=3)], query)
+    assert etag != history_etag(["a-3"], settings, {**query, "resolution_s": 60})
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
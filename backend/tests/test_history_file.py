@@ -0,0 +1,142 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import numpy as np
+import pytest
+from waterer_backend.history_file import (
+    FORMAT_VERSION_KEY,
+    history_arrays_from_status_data,
+    load_history_aggregates,
+    load_history_file,
+    save_history_file,
+)
+from waterer_backend.models import (
+    AggregateTierSettings,
+    BinaryStatusLogData,
+    FloatStatusLogData,
+    FloatStatusLogSettings,
+    SmartPumpStatusData,
+)
+from waterer_backend.status_log import BinaryStatusLog, FloatStatusLog
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_save_load_history(tmp_path):
+
+    humidity_log = FloatStatusLog()
+    smoothed_humidity_log = FloatStatusLog()
+    pump_status_log = BinaryStatusLog()
+
+    for p in range(100):
+        humidity_log.add_sample(p, p / 100)
+        smoothed_humidity_log.add_sample(p, None if p % 10 == 0 else p / 100)
+        pump_status_log.add_sample(p, p % 20 < 3)
+
+    filepath = tmp_path / "pump_0_history.npz"
+
+    save_history_file(
+        filepath,
+        {
+            "rel_humidity_V_log": humidity_log,
+            "smoothed_rel_humidity_V_log": smoothed_humidity_log,
+            "pump_status_log": pump_status_log,
+        },
+    )
+
+    history = load_history_file(filepath)
+
+    times, values = history["pump_status_log"]
+    assert values.dtype == np.uint8
+
+    new_log = BinaryStatusLog.from_arrays(times, values)
+    assert new_log.get_values() == pump_status_log.get_values()
+
+    new_log = FloatStatusLog.from_arrays(*history["smoothed_rel_humidity_V_log"])
+    assert new_log.get_values() == smoothed_humidity_log.get_values()
+
+    # unknown version
+
+    with np.load(filepath) as data:
+        arrays = dict(data)
+
+    arrays[FORMAT_VERSION_KEY] = np.asarray(-1)
+    np.savez(filepath, **arrays)
+
+    with pytest.raises(ValueError):
+        load_history_file(filepath)
+
+
+def test_aggregates_outlive_the_samples(tmp_path):
+
+    settings = FloatStatusLogSettings(
+        low_res_max_age_s=2 * 86400,
+        aggregate_tiers=[
+            AggregateTierSettings(interval_s=3600),
+            AggregateTierSettings(interval_s=86400, max_age_s=365 * 86400),
+        ],
+    )
+
+    humidity_log = FloatStatusLog(settings)
+    for day in range(10):
+        times = day * 86400 + np.arange(0, 86400, 600.0)
+        humidity_log.add_samples(times, np.full(len(times), float(day)))
+
+    filepath = tmp_path / "pump_0_history.npz"
+
+    save_history_file(
+        filepath,
+        {
+            "rel_humidity_V_log": humidity_log.snapshot(),
+            "smoothed_rel_humidity_V_log": FloatStatusLog(settings),
+            "pump_status_log": BinaryStatusLog(),
+        },
+    )
+
+    history = load_history_file(filepath)
+    aggregates = load_history_aggregates(filepath)
+
+    assert sorted(aggregates["rel_humidity_V_log"]) == [3600, 86400]
+    assert len(aggregates["smoothed_rel_humidity_V_log"][86400][0]) == 0
+
+    new_log = FloatStatusLog.from_arrays(
+        *history["rel_humidity_V_log"],
+        settings=settings,
+        aggregates=aggregates["rel_humidity_V_log"],
+    )
+
+    # n.b. the samples only span the last (2) days
+    assert new_log.get_values()[0][0] > 7 * 86400
+    assert new_log.get_aggregates(86400) == humidity_log.get_aggregates(86400)
+    assert len(new_log.get_aggregates(86400)[0]) == 10
+
+    # the bucket still being filled is continued
+
+    for log in (humidity_log, new_log):
+        log.add_sample(10 * 86400 - 1, 20.0)
+
+    assert new_log.get_aggregates(86400) == humidity_log.get_aggregates(86400)
+    assert new_log.get_aggregates(3600) == humidity_log.get_aggregates(3600)
+
+
+def test_convert_legacy_history():
+
+    history = SmartPumpStatusData(
+        rel_humidity_V_log=FloatStatusLogData(times=[0, 1], values=[1.0, None]),
+        smoothed_rel_humidity_V_log=FloatStatusLogData(times=[], values=[]),
+        pump_status_log=BinaryStatusLogData(times=[0, 1], values=[True, False]),
+    )
+
+    arrays = history_arrays_from_status_data(history)
+
+    times, values = arrays["rel_humidity_V_log"]
+    assert times.tolist() == [0, 1]
+    assert np.isnan(values[1])
+
+    assert arrays["pump_status_log"][1].tolist() == [1, 0]
+    assert len(arrays["smoothed_rel_humidity_V_log"][0]) == 0
@@ -0,0 +1,49 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import jsonschema
+import pytest
+from waterer_backend.protocol_codec import get_request_codec, get_response_codec
+
+###############################################################
+# Tests
+###############################################################
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"id": 1, "channel": 0, "instruction": "get_state", "data": 0},
+        {"id": 1, "channel": 0, "instruction": "get_state", "data": 0, "extra": 1},
+        {"id": 1.0, "channel": 0, "instruction": "get_state", "data": 0},
+        {"id": True, "channel": 0, "instruction": "get_state", "data": 0},
+        {"id": 1, "channel": 0, "instruction": "explode", "data": 0},
+        {"id": 1, "channel": 0, "instruction": "get_state"},
+        [],
+    ],
+)
+def test_fast_path_matches_schema(message):
+
+    codec = get_request_codec()
+    validator = jsonschema.Draft7Validator(codec.schema)
+
+    try:
+        codec.validate(message)
+        codec_valid = True
+    except jsonschema.ValidationError:
+        codec_valid = False
+
+    assert codec_valid == validator.is_valid(message)
+
+
+def test_codec_is_cached():
+
+    assert get_response_codec() is get_response_codec()
+
+    with pytest.raises(jsonschema.ValidationError):
+        get_response_codec().decode(
+            '{"id": 1, "channel": 0, "instruction": "", "success": 1, "data": 0, "message": ""}'
+        )
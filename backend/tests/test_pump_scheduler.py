@@ -0,0 +1,75 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import time
+
+from waterer_backend.pump_scheduler import PumpScheduler
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_tasks_run_at_their_intervals():
+
+    calls = []
+
+    scheduler = PumpScheduler()
+    scheduler.add_task("fast", lambda: calls.append("fast"), 0.05)
+    scheduler.add_task("slow", lambda: calls.append("slow"), 10)
+    scheduler.start()
+
+    time.sleep(0.3)
+    scheduler.wake("slow")
+    time.sleep(0.1)
+
+    scheduler.interrupt()
+    scheduler.join(timeout=1)
+
+    assert not scheduler.is_alive()
+    assert 4 <= calls.count("fast") <= 8
+    assert calls.count("slow") == 1
+
+
+def test_failing_task_does_not_stop_scheduler():
+
+    calls = []
+
+    def fail():
+        calls.append("fail")
+        raise RuntimeError("failed")
+
+    scheduler = PumpScheduler()
+    scheduler.add_task("fail", fail, 0.05, first_due_in_s=0)
+    scheduler.start()
+
+    time.sleep(0.12)
+
+    scheduler.interrupt()
+    scheduler.join(timeout=1)
+
+    assert len(calls) >= 2
+
+
+def test_task_interval_is_read_after_each_run():
+
+    calls = []
+    interval_s = [10.0]
+
+    def run():
+        calls.append(time.monotonic())
+        interval_s[0] = 0.05  # n.b. e.g. shortened by the adaptive polling
+
+    scheduler = PumpScheduler()
+    scheduler.add_task("adaptive", run, lambda: interval_s[0], first_due_in_s=0)
+    scheduler.start()
+
+    time.sleep(0.3)
+
+    scheduler.interrupt()
+    scheduler.join(timeout=1)
+
+    assert len(calls) >= 3
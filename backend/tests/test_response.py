@@ -24,3 +24,13 @@ def test_deserialize(turn_on_response_fxt: Response):
     new_response = Response.create(response_str)
 
     assert new_response == turn_on_response_fxt
+
+
+def test_all_status_round_trip():
+
+    response = Response(1, -1, "get_all_status", True, 3, "", [1.5, 1, 2.25, 0, 3.0, 1])
+
+    new_response = Response.create(response.serialize())
+
+    assert new_response == response
+    assert "values" not in Response(1, 1, "get_state", True, 1, "").serialize()
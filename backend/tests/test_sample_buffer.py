@@ -0,0 +1,116 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import numpy as np
+import pytest
+from waterer_backend.sample_buffer import SampleBuffer
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_append_popleft():
+
+    buffer = SampleBuffer(capacity=4)
+
+    for p in range(10):
+        buffer.append(p, 2 * p)
+
+    assert len(buffer) == 10
+    assert buffer.capacity >= 10
+
+    assert buffer.popleft() == (0, 0)
+    assert buffer.first() == 1
+    assert buffer.last(1) == 18
+
+    assert buffer.column(0).tolist() == list(range(1, 10))
+    assert buffer.column(1).tolist() == [2 * p for p in range(1, 10)]
+
+
+def test_sliding_window_does_not_grow():
+
+    buffer = SampleBuffer(capacity=8)
+
+    for p in range(1000):
+        buffer.append(p, p)
+        if len(buffer) > 3:
+            buffer.popleft()
+
+    assert buffer.capacity == 8
+    assert buffer.column(0).tolist() == [997, 998, 999]
+
+
+def test_capacity_shrinks_once_sparse():
+
+    buffer = SampleBuffer(capacity=8)
+
+    buffer.extend(np.arange(1000), np.arange(1000))
+    assert buffer.capacity >= 1000
+
+    buffer.drop_left(990)
+
+    assert 8 <= buffer.capacity <= 40
+    assert buffer.column(0).tolist() == list(range(990, 1000))
+
+    for p in range(1000, 2000):
+        buffer.append(p, p)
+        buffer.popleft()
+
+    assert buffer.capacity <= 40
+    assert buffer.column(1).tolist() == list(range(1990, 2000))
+
+
+def test_column_views_are_read_only_and_stable():
+
+    buffer = SampleBuffer(capacity=2)
+    buffer.append(0, 0)
+    buffer.append(1, 1)
+
+    view = buffer.column(0)
+
+    with pytest.raises(ValueError):
+        view[0] = 10
+
+    for p in range(2, 10):
+        buffer.append(p, p)
+    buffer.popleft()
+
+    assert view.tolist() == [0, 1]
+
+
+def test_snapshot_copy_on_write():
+
+    buffer = SampleBuffer(capacity=8)
+    buffer.append(0, 0)
+    buffer.append(1, 1)
+
+    times, values = buffer.snapshot()
+
+    buffer.set_last(1, 10)
+    buffer.append(2, 2)
+    buffer.set_last(1, 20)
+
+    assert times.tolist() == [0, 1]
+    assert values.tolist() == [0, 1]
+    assert buffer.column(1).tolist() == [0, 10, 20]
+
+
+def test_dtypes_and_errors():
+
+    buffer = SampleBuffer(dtypes=(np.float64, np.uint8))
+    buffer.append(1.5, True)
+
+    assert buffer.column(1).dtype == np.uint8
+
+    with pytest.raises(ValueError):
+        buffer.append(1.0)
+
+    buffer.clear()
+    assert len(buffer) == 0
+
+    with pytest.raises(IndexError):
+        buffer.popleft()
@@ -0,0 +1,100 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import numpy as np
+from waterer_backend.sample_journal import RECORD_DTYPE, SampleJournal
+from waterer_backend.status_log import BinaryStatusLog, FloatStatusLog
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_append_read(tmp_path):
+
+    journal = SampleJournal(tmp_path / "pump_0_history.journal", batch_size=3)
+
+    journal.append(0, 0.5, None, False)
+    journal.append(1, 0.6, 0.55, True)
+
+    assert journal.num_pending == 2
+    assert len(journal.read()) == 0
+
+    journal.append(2, 0.7, 0.6, False)
+
+    assert journal.num_pending == 0
+
+    records = journal.read()
+    assert records["time"].tolist() == [0, 1, 2]
+    assert np.isnan(records["smoothed_rel_humidity_V_log"][0])
+    assert records["pump_status_log"].tolist() == [0, 1, 0]
+
+    # a partially written record is ignored
+
+    with open(journal.filepath, "ab") as fh:
+        fh.write(b"\x00" * (RECORD_DTYPE.itemsize // 2))
+
+    assert len(journal.read()) == 3
+
+
+def test_append_after_torn_write(tmp_path):
+
+    journal = SampleJournal(tmp_path / "pump_0_history.journal", batch_size=1)
+
+    journal.append(0, 0.5, 0.5, False)
+
+    with open(journal.filepath, "ab") as fh:
+        fh.write(b"\xff" * (RECORD_DTYPE.itemsize // 2))
+
+    # n.b. e.g. a restart (without reading the journal)
+    journal = SampleJournal(journal.filepath, batch_size=1)
+    journal.append(1, 0.6, 0.55, True)
+
+    records = journal.read()
+    assert records["time"].tolist() == [0, 1]
+    assert records["pump_status_log"].tolist() == [0, 1]
+
+    # a torn header is discarded
+
+    with open(journal.filepath, "wb") as fh:
+        fh.write(b"WT")
+
+    journal.append(2, 0.7, 0.6, False)
+    assert journal.read()["time"].tolist() == [2]
+
+
+def test_replay_compact(tmp_path):
+
+    journal = SampleJournal(tmp_path / "pump_0_history.journal", batch_size=1)
+
+    for p in range(10):
+        journal.append(p, p / 10, p / 10, p % 4 == 0)
+
+    humidity_log = FloatStatusLog()
+    smoothed_humidity_log = FloatStatusLog()
+    pump_status_log = BinaryStatusLog()
+
+    for p in range(5):  # already captured in the snapshot
+        humidity_log.add_sample(p, p / 10)
+
+    logs = {
+        "rel_humidity_V_log": humidity_log,
+        "smoothed_rel_humidity_V_log": smoothed_humidity_log,
+        "pump_status_log": pump_status_log,
+    }
+
+    assert journal.replay_into(logs) == 10
+
+    assert humidity_log.get_values()[0] == list(range(10))
+    assert smoothed_humidity_log.get_values()[0] == list(range(10))
+    assert pump_status_log.get_newest_value() == (9, False)
+
+    saved = []
+    journal.compact(lambda: saved.append(True))
+
+    assert saved == [True]
+    assert not journal.filepath.is_file()
+    assert len(journal.read()) == 0
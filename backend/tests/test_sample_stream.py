@@ -0,0 +1,106 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import asyncio
+import json
+
+from waterer_backend.models import SmartPumpStatus
+from waterer_backend.sample_stream import (
+    PUMP_STATE_EVENT,
+    SAMPLE_EVENT,
+    SampleBroadcaster,
+)
+
+###############################################################
+# Definitions
+###############################################################
+
+
+def _status(epoch_time: float, pump_running: bool = False) -> SmartPumpStatus:
+    return SmartPumpStatus(
+        rel_humidity_V=2.0,
+        rel_humidity_pcnt=50.0,
+        smoothed_rel_humidity_pcnt=None,
+        pump_running=pump_running,
+        epoch_time=epoch_time,
+    )
+
+
+def _decode(event: bytes):
+    event_line, data_line, *_ = event.decode().split("\n")
+    return event_line[len("event: ") :], json.loads(data_line[len("data: ") :])
+
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_events_are_pushed_to_the_subscribers_of_the_channel():
+    async def run():
+        broadcaster = SampleBroadcaster()
+
+        with broadcaster.subscribe() as all_channels, broadcaster.subscribe(
+            channel=1
+        ) as channel_1:
+            broadcaster.publish(0, _status(1), pump_switched=False)
+            broadcaster.publish(1, _status(2, pump_running=True), pump_switched=True)
+
+            all_events = [_decode(await all_channels.get()) for _ in range(3)]
+            channel_1_events = [_decode(await channel_1.get()) for _ in range(2)]
+
+        assert broadcaster.num_subscribers == 0
+        return all_events, channel_1_events
+
+    all_events, channel_1_events = asyncio.run(run())
+
+    assert [event for event, _ in all_events] == [
+        SAMPLE_EVENT,
+        PUMP_STATE_EVENT,
+        SAMPLE_EVENT,
+    ]
+    assert all_events[0][1]["channel"] == 0
+    assert channel_1_events == all_events[1:]
+    assert channel_1_events[0][1] == {
+        "channel": 1,
+        "pump_running": True,
+        "epoch_time": 2,
+    }
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def run():
+        broadcaster = SampleBroadcaster()
+        subscription = broadcaster.subscribe(max_queue_size=3)
+
+        for epoch_time in range(10):
+            broadcaster.publish(0, _status(epoch_time), pump_switched=False)
+
+        num_dropped = subscription.pop_num_dropped()
+        times = [_decode(await subscription.get())[1]["epoch_time"] for _ in range(3)]
+
+        subscription.close()
+        return num_dropped, times, await subscription.get()
+
+    num_dropped, times, closed_event = asyncio.run(run())
+
+    assert num_dropped == 7
+    assert times == [7, 8, 9]
+    assert closed_event is None
+
+
+def test_close_wakes_waiting_subscriber():
+    async def run():
+        broadcaster = SampleBroadcaster()
+        subscription = broadcaster.subscribe()
+
+        waiting = asyncio.ensure_future(subscription.get())
+        await asyncio.sleep(0)
+
+        broadcaster.close()
+        return await asyncio.wait_for(waiting, timeout=1)
+
+    assert asyncio.run(run()) is None
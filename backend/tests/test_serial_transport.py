@@ -0,0 +1,241 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+import json
+import os
+import threading
+import time
+
+import pytest
+import serial
+import waterer_backend.binary_frame as bf
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+from waterer_backend.serial_transport import SerialTransport
+
+###############################################################
+# Fixtures
+###############################################################
+
+
+class _FakeSerial:
+
+    """
+    The output trickles in (a few bytes at a time) as from serial.Serial
+    """
+
+    MAX_CHUNK_SIZE = 3
+
+    def __init__(self) -> None:
+        self._output = bytearray()
+        self._condition = threading.Condition()
+
+    def _reply(self, data: bytes) -> None:
+        with self._condition:
+            self._output += data
+            self._condition.notify()
+
+    @property
+    def in_waiting(self) -> int:
+        with self._condition:
+            return min(len(self._output), self.MAX_CHUNK_SIZE)
+
+    def read(self, size: int = 1) -> bytes:
+
+        with self._condition:
+            self._condition.wait_for(lambda: self._output, timeout=0.05)
+
+            data = bytes(self._output[:size])
+            del self._output[:size]
+
+        return data
+
+
+class _ReorderingDevice(_FakeSerial):
+
+    """
+    Replies to requests in pairs in reverse order and ignores channel 99
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._held = []
+
+    def write(self, data: bytes) -> None:
+
+        request = json.loads(data.decode())
+        if request["channel"] == 99:
+            return
+
+        self._held.append(json.dumps({"id": request["id"], "data": request["data"]}))
+
+        if len(self._held) == 2:
+            for line in reversed(self._held):
+                self._reply(f"{line}\r\n".encode())
+            self._held = []
+
+
+@pytest.fixture
+def transport_fxt():
+    transport = SerialTransport(_ReorderingDevice(), window=2, timeout_s=1)
+    transport.start()
+    yield transport
+    transport.stop()
+    transport.join()
+
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_responses_matched_by_id(transport_fxt: SerialTransport):
+
+    results = {}
+
+    def make_request(request_id: int) -> None:
+        request_str = json.dumps({"id": request_id, "channel": 0, "data": request_id})
+        results[request_id] = json.loads(transport_fxt.request(request_str, request_id))
+
+    threads = [threading.Thread(target=make_request, args=(p,)) for p in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {1: {"id": 1, "data": 1}, 2: {"id": 2, "data": 2}}
+
+
+def test_requests_pipelined_once_window_widened():
+
+    transport = SerialTransport(_ReorderingDevice(), timeout_s=1)
+    transport.start()
+
+    results = {}
+
+    def make_request(request_id: int) -> None:
+        request_str = json.dumps({"id": request_id, "channel": 0, "data": request_id})
+        results[request_id] = json.loads(transport.request(request_str, request_id))
+
+    threads = [threading.Thread(target=make_request, args=(p,)) for p in (1, 2)]
+
+    try:
+        for thread in threads:
+            thread.start()
+
+        # n.b. the device only replies once both requests are sent
+        time.sleep(0.2)
+        assert transport.window == 1 and not results
+
+        transport.set_window(2)
+
+        for thread in threads:
+            thread.join()
+    finally:
+        transport.stop()
+        transport.join()
+
+    assert sorted(results) == [1, 2]
+
+
+def test_timeout(transport_fxt: SerialTransport):
+
+    with pytest.raises(TimeoutError):
+        transport_fxt.request(
+            json.dumps({"id": 3, "channel": 99, "data": 0}), 3, timeout_s=0.1
+        )
+
+
+def _voltage_response_frame(request_frame: bytes) -> bytes:
+    """
+    Response with the voltage of the channel
+    """
+
+    request = bf.decode_request(request_frame)
+    assert request.id is not None
+
+    return bf.encode_response(
+        Response(
+            request.id,
+            request.channel,
+            request.instruction,
+            True,
+            0.5 * request.channel,
+            "",
+        )
+    )
+
+
+class _FrameDevice(_FakeSerial):
+    def write(self, data: bytes) -> None:
+        self._reply(_voltage_response_frame(data))
+
+
+def test_frames_matched_by_id():
+
+    transport = SerialTransport(_FrameDevice(), window=2, timeout_s=1)
+    transport.start()
+
+    try:
+        # n.b. the voltage of channel 69 (34.5 V) is packed with a newline
+        frame = transport.request(
+            bf.encode_request(Request(69, "get_voltage", 0, id=5)), 5
+        )
+    finally:
+        transport.stop()
+        transport.join()
+
+    assert isinstance(frame, bytes)
+    assert bf.decode_response(frame).data == 34.5
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="Requires a pty")
+def test_frames_read_from_serial_port():
+    """
+    n.b. a response frame does not end with a newline (so must not wait for
+    the timeout of the port)
+    """
+
+    device_fd, port_fd = os.openpty()
+
+    def reply_to_frames():
+        try:
+            while True:
+                request_frame = b""
+                while len(request_frame) < bf.REQUEST_FRAME_SIZE:
+                    request_frame += os.read(
+                        device_fd, bf.REQUEST_FRAME_SIZE - len(request_frame)
+                    )
+                os.write(device_fd, _voltage_response_frame(request_frame))
+        except OSError:
+            pass  # n.b. closed
+
+    device = threading.Thread(target=reply_to_frames, daemon=True)
+    device.start()
+
+    port = serial.Serial(os.ttyname(port_fd), timeout=5)
+    transport = SerialTransport(port, window=1, timeout_s=2)
+    transport.start()
+
+    try:
+        start_s = time.monotonic()
+        frames = [
+            transport.request(
+                bf.encode_request(Request(channel, "get_voltage", 0, id=channel)),
+                channel,
+            )
+            for channel in (3, 69)
+        ]
+        elapsed_s = time.monotonic() - start_s
+    finally:
+        transport.stop()
+        port.close()
+        transport.join()
+        os.close(device_fd)
+        os.close(port_fd)
+
+    assert [bf.decode_response(frame).data for frame in frames] == [1.5, 34.5]
+    assert elapsed_s < 1
@@ -12,9 +12,12 @@ from typing import List
 
 import pytest
 from flask.testing import FlaskClient
+from waterer_backend.clock import VirtualClock
 from waterer_backend.config import get_pumps_config
+from waterer_backend.downsample import MIN_MAX_POINTS
 from waterer_backend.pump_manager import PumpManagerContext
 from waterer_backend.server import create_app
+from waterer_backend.simulator import PlantSimulator
 from waterer_backend.smart_pump import (
     SmartPumpSettings,
     SmartPumpStatus,
@@ -42,6 +45,23 @@ def server_client(pumps_config):
             yield client
 
 
+@pytest.fixture
+def simulated_server_client():
+    app = create_app()
+
+    clock = VirtualClock(speed=0)
+    simulator = PlantSimulator(2, clock=clock, seed=0)
+
+    with PumpManagerContext(
+        settings=SmartPumpSettings(),
+        num_pumps=2,
+        device=simulator.create_arduino(),
+        clock=clock,
+    ):
+        with app.test_client() as client:
+            yield client
+
+
 ###############################################################
 # Server
 ###############################################################
@@ -181,3 +201,19 @@ def test_set_settings(server_client: FlaskClient):
     settings = SmartPumpSettings(**json.loads(response.data.decode())["data"])
 
     assert settings == new_settings
+
+
+def test_invalid_max_points_is_a_bad_request(simulated_server_client: FlaskClient):
+
+    for route in ("/get_status_since/1", "/get_status_since"):
+
+        for max_points in (MIN_MAX_POINTS - 1, "100", 10.5):
+            response = simulated_server_client.post(
+                route, json=dict(earliest_time=None, max_points=max_points)
+            )
+            assert response.status_code == 400
+
+        response = simulated_server_client.post(
+            route, json=dict(earliest_time=None, max_points=MIN_MAX_POINTS)
+        )
+        assert response.status_code == 200
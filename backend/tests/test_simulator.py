@@ -0,0 +1,147 @@
+#!python3
+
+###############################################################
+# Imports
+###############################################################
+
+from waterer_backend.clock import VirtualClock
+from waterer_backend.models import SmartPumpSettings
+from waterer_backend.pump_manager import PumpManager
+from waterer_backend.request import Request
+from waterer_backend.simulator import PlantSimulator, SimulatedArduino, SoilParameters
+from waterer_backend.smart_pump import SmartPump
+
+###############################################################
+# Definitions
+###############################################################
+
+DAY_S = 24 * 3600
+
+###############################################################
+# Tests
+###############################################################
+
+
+def test_soil_dries_and_is_wetted():
+
+    clock = VirtualClock(speed=0)
+    simulator = PlantSimulator(
+        2, clock=clock, parameters=SoilParameters(sensor_noise_V=0), seed=0
+    )
+
+    initial_moisture = simulator.moisture(0)
+
+    clock.advance(DAY_S)
+    dry_moisture = simulator.moisture(0)
+    assert dry_moisture < initial_moisture
+
+    simulator.turn_on(0, duration_s=10)
+    assert simulator.get_state(0)
+    assert not simulator.get_state(1)
+
+    clock.advance(60)
+    assert not simulator.get_state(0)
+    assert simulator.moisture(0) > dry_moisture
+    assert simulator.moisture(1) < dry_moisture
+
+    # n.b. the sensor voltage falls as the soil is wetted
+    assert simulator.get_voltage(0) < simulator.get_voltage(1)
+
+
+def test_arduino_instructions():
+
+    device = PlantSimulator(3, seed=0).create_arduino()
+    device.connect()
+
+    response = device.make_request(Request(-1, "get_all_status", 3))
+    assert response.success
+    assert len(response.values) == 6
+
+    assert not device.make_request(Request(3, "get_voltage", 0)).success
+    assert not device.make_request(Request(0, "set_speed", 0)).success
+    assert device.get_version() == "1.2"
+
+
+class _CountingArduino(SimulatedArduino):
+    def __init__(self, simulator: PlantSimulator) -> None:
+        super().__init__(simulator)
+        self.num_turn_on = 0
+        self.num_get_all_status = 0
+
+    def make_request(self, request: Request):
+        if request.instruction == "turn_on":
+            self.num_turn_on += 1
+        elif request.instruction == "get_all_status":
+            self.num_get_all_status += 1
+        return super().make_request(request)
+
+
+def test_feedback_over_days():
+
+    clock = VirtualClock(speed=0)
+    parameters = SoilParameters()
+    simulator = PlantSimulator(1, clock=clock, parameters=parameters, seed=0)
+
+    device = _CountingArduino(simulator)
+    device.connect()
+
+    pump = SmartPump(
+        channel=0,
+        device=device,
+        settings=SmartPumpSettings(
+            dry_humidity_V=parameters.dry_V,
+            wet_humidity_V=parameters.wet_V,
+            feedback_setpoint_pcnt=60,
+            pump_on_time_s=10,
+        ),
+        status_update_interval_s=300,
+        auto_save_interval_s=None,
+        clock=clock,
+    )
+
+    num_days = 5
+    for _ in range(num_days * DAY_S // 300):
+        clock.advance(300)
+        pump.step()
+
+    # n.b. the soil dries below the setpoint within a day
+    assert device.num_turn_on >= num_days - 1
+    assert simulator.moisture(0) > 0.4
+
+    history = pump.get_status_since(None)
+    assert (
+        history.rel_humidity_V_epoch_time[-1] - history.rel_humidity_V_epoch_time[0]
+        > (num_days - 1) * DAY_S
+    )
+
+
+def test_bulk_polled_channel_status_is_refreshed():
+
+    clock = VirtualClock(speed=0)
+    simulator = PlantSimulator(2, clock=clock, seed=0)
+
+    device = _CountingArduino(simulator)
+    manager = PumpManager(
+        settings=SmartPumpSettings(),
+        num_pumps=2,
+        status_update_interval_s=300,
+        device=device,
+        clock=clock,
+    )
+    manager.start()
+
+    try:
+        num_polls = device.num_get_all_status
+
+        clock.advance(60)
+        assert manager.get_status(0).epoch_time < clock.time()
+        assert device.num_get_all_status == num_polls
+
+        assert manager.get_status(0, max_age_s=10).epoch_time == clock.time()
+        assert device.num_get_all_status == num_polls + 1
+
+        # n.b. refreshed by the same poll
+        assert manager.get_status(1, max_age_s=10).epoch_time == clock.time()
+        assert device.num_get_all_status == num_polls + 1
+    finally:
+        manager.interrupt()
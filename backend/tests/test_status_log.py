@@ -1,7 +1,11 @@
+import numpy as np
+from waterer_backend.models import AggregateTierSettings
 from waterer_backend.status_log import (
+    AggregateTier,
     BinaryStatusLog,
     FloatStatusLog,
     FloatStatusLogSettings,
+    optional_list,
 )
 
 
@@ -70,7 +74,8 @@ def test_get_all_binary_log_times_all_false():
 
     all_times, all_values = log.get_values()
 
-    assert len(all_times) == 3
+    assert all_times == [0, 4]
+    assert log.num_runs == 1
 
 
 def test_clear_all_binary_log_times():
@@ -83,7 +88,7 @@ def test_clear_all_binary_log_times():
 
     all_times, all_values = log.get_values()
 
-    assert len(all_times) == 3
+    assert len(all_times) == 2
 
     #
 
@@ -104,7 +109,8 @@ def test_get_all_binary_log_times_one_true():
 
     all_times, all_values = log.get_values()
 
-    assert len(all_times) == 5
+    assert all_times == [0, 4, 5, 6]
+    assert all_values == [0, 0, 1, 0]
 
     new_times, new_values = log.get_values(4.5)
     assert new_times == [5, 6]
@@ -123,3 +129,235 @@ def test_get_all_binary_log_times_one_true():
 
     assert old_times == new_times
     assert old_values == new_values
+
+
+def test_float_log_time_range():
+
+    settings = FloatStatusLogSettings(
+        low_res_switchover_age_s=10, low_res_interval_s=5, low_res_max_age_s=100
+    )
+    log = FloatStatusLog(settings)
+
+    for p in range(40):
+        log.add_sample(p, None if p == 35 else p)
+
+    all_times, _ = log.get_values()
+
+    # spans both the low and high res tiers
+    times, values = log.get_values(20, 35)
+    assert times == [t for t in all_times if 20 < t <= 35]
+    assert values[-1] is None
+
+    times, values = log.get_values(None, 3.5)
+    assert times == [t for t in all_times if t <= 3.5]
+
+    assert log.get_values(39) == ([], [])
+    assert log.get_values(30, 20) == ([], [])
+
+
+def test_binary_log_time_range():
+
+    log = BinaryStatusLog()
+
+    for p, val in enumerate([False, True, True, False, True, False]):
+        log.add_sample(p, val)
+
+    assert log.get_values(0.5, 3) == ([1, 2, 3], [1, 1, 0])
+    assert log.get_values(None, 0) == ([0], [0])
+    assert log.get_values(-1, -0.5) == ([], [])
+
+
+def test_float_log_bulk_add_matches_replay():
+
+    settings = FloatStatusLogSettings(
+        low_res_switchover_age_s=50, low_res_interval_s=7, low_res_max_age_s=400
+    )
+
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.uniform(0.5, 3, 1000))
+    values = [None if rng.random() < 0.1 else float(v) for v in rng.random(1000)]
+
+    replayed_log = FloatStatusLog(settings)
+    for time, value in zip(times, values):
+        replayed_log.add_sample(time, value)
+
+    bulk_log = FloatStatusLog(settings)
+    bulk_log.add_samples(times[:600], values[:600])
+    bulk_log.add_samples(times[600:], values[600:])
+
+    assert bulk_log.get_values() == replayed_log.get_values()
+
+
+def test_float_log_bulk_load_keeps_high_res_small():
+
+    settings = FloatStatusLogSettings()
+
+    times = np.arange(0, 7 * 24 * 3600, 5.0)
+
+    log = FloatStatusLog(settings)
+    log.add_samples(times, np.ones_like(times))
+
+    high_res_times = log._high_res.column(0)
+    assert high_res_times[0] >= times[-1] - settings.low_res_switchover_age_s
+    assert log._high_res.capacity <= 4 * len(high_res_times)
+    assert log.nbytes < 200_000
+
+
+def test_binary_log_bulk_add_matches_replay():
+
+    rng = np.random.default_rng(0)
+    times = np.arange(500.0)
+    values = (rng.random(500) < 0.2).tolist()
+
+    replayed_log = BinaryStatusLog()
+    for time, value in zip(times, values):
+        replayed_log.add_sample(time, value)
+
+    for split in [0, 1, 2, 3, 250]:
+        bulk_log = BinaryStatusLog()
+        bulk_log.add_samples(times[:split], values[:split])
+        bulk_log.add_samples(times[split:], values[split:])
+
+        assert bulk_log.get_values() == replayed_log.get_values()
+        assert bulk_log.get_on_time_s() == replayed_log.get_on_time_s()
+
+
+def test_binary_log_state_lookup():
+
+    log = BinaryStatusLog()
+
+    for p, val in enumerate([False, False, True, True, True, False, True]):
+        log.add_sample(10 * p, val)
+
+    assert log.num_runs == 4
+
+    assert log.get_value_at(-1) is None
+    assert log.get_value_at(5) == 0
+    assert log.get_value_at(20) == 1
+    assert log.get_value_at(49) == 1
+    assert log.get_value_at(50) == 0
+    assert log.get_value_at(60) == 1
+    assert log.get_value_at(61) is None
+
+    assert log.get_on_time_s() == 30
+    assert log.get_on_time_s(25, 55) == 25
+    assert log.get_on_time_s(None, 30) == 10
+    assert log.get_on_time_s(-10, 15) == 0
+
+
+def test_aggregate_tier():
+
+    tier = AggregateTier(AggregateTierSettings(interval_s=10, max_age_s=100))
+
+    for p in range(35):
+        tier.add_sample(p, np.nan if p == 12 else p)
+
+    times, mins, maxs, means = tier.get_values()
+
+    assert times.tolist() == [0, 10, 20, 30]
+    assert mins.tolist() == [0, 10, 20, 30]
+    assert maxs.tolist() == [9, 19, 29, 34]
+    assert means[1] == np.mean([p for p in range(10, 20) if p != 12])
+
+    times, *_ = tier.get_values(0, 20)
+    assert times.tolist() == [10, 20]
+
+    # bulk add in chunks splitting buckets matches sample by sample
+
+    bulk_tier = AggregateTier(AggregateTierSettings(interval_s=10, max_age_s=100))
+    all_times = np.arange(35.0)
+    all_values = np.where(all_times == 12, np.nan, all_times)
+    bulk_tier.add_samples(all_times[:15], all_values[:15])
+    bulk_tier.add_samples(all_times[15:], all_values[15:])
+
+    for expected, found in zip(tier.get_values(), bulk_tier.get_values()):
+        assert np.allclose(expected, found)
+
+
+def test_float_log_resolution():
+
+    settings = FloatStatusLogSettings(
+        aggregate_tiers=[
+            AggregateTierSettings(interval_s=60),
+            AggregateTierSettings(interval_s=600),
+        ]
+    )
+    log = FloatStatusLog(settings)
+
+    for p in range(0, 3600, 5):
+        log.add_sample(p, p)
+
+    raw_times, _ = log.get_values(resolution_s=30)
+    assert len(raw_times) == 720
+
+    minute_times, minute_means = log.get_values(resolution_s=300)
+    assert len(minute_times) == 60
+    assert minute_means[0] == np.mean(np.arange(0, 60, 5))
+
+    ten_minute_times, _ = log.get_values(1800, resolution_s=3600)
+    assert ten_minute_times == [2400, 3000]
+
+    times, mins, maxs, means = log.get_aggregates(600)
+    assert mins[0] == 0
+    assert maxs[0] == 595
+
+    for values, array in zip((times, mins, maxs, means), log.get_aggregate_arrays(600)):
+        assert values == array.tolist()
+
+
+def test_float_log_arrays_keep_missing_values_as_nan():
+
+    log = FloatStatusLog()
+    log.add_sample(0, 1.0)
+    log.add_sample(1, None)
+    log.add_sample(2, 3.0)
+
+    times, values = log.get_arrays()
+    assert values.dtype == np.float64
+    assert np.isnan(values[1])
+
+    assert optional_list(values) == [1.0, None, 3.0]
+    assert log.get_values() == (times.tolist(), [1.0, None, 3.0])
+
+
+def test_snapshots_are_unaffected_by_new_samples():
+
+    float_log = FloatStatusLog()
+    binary_log = BinaryStatusLog()
+
+    for p in range(5):
+        float_log.add_sample(p, p / 10)
+        binary_log.add_sample(p, True)
+
+    float_snapshot = float_log.snapshot()
+    binary_snapshot = binary_log.snapshot()
+
+    for p in range(5, 10):
+        float_log.add_sample(p, p / 10)
+        binary_log.add_sample(p, p < 7)
+
+    assert float_snapshot.get_values()[0] == list(range(5))
+    assert float_snapshot.get_newest_value() == (4, 0.4)
+    assert float_log.version == float_snapshot.version + 5
+
+    assert binary_snapshot.get_values() == ([0, 4], [1, 1])
+    assert binary_snapshot.get_on_time_s() == 4
+    assert binary_log.get_values() == ([0, 6, 7, 9], [1, 1, 0, 0])
+
+
+def test_binary_log_on_time_buckets():
+
+    log = BinaryStatusLog()
+
+    for p in range(0, 400, 5):
+        log.add_sample(p, 50 <= p < 150 or p >= 390)
+
+    times, on_times = log.get_on_time_buckets(100)
+
+    assert times.tolist() == [0, 100, 200, 300]
+    assert on_times.tolist() == [50, 50, 0, 5]
+
+    times, on_times = log.get_on_time_buckets(100, 0, 200)
+
+    assert times.tolist() == [100, 200]
+    assert on_times.tolist() == [50, 0]
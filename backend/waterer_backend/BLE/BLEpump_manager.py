@@ -3,6 +3,7 @@
 ###############################################################
 # Import
 ###############################################################
+import asyncio
 import json
 import logging
 import pathlib as pt
@@ -15,6 +16,9 @@ from bleak import BleakClient, BleakScanner
 from bleak.backends.device import BLEDevice
 from waterer_backend.BLE.BLE_ids import PUMP_NAME
 from waterer_backend.BLE.BLEsmart_pump import BLESmartPump
+from waterer_backend.clock import SYSTEM_CLOCK, Clock
+from waterer_backend.sample_stream import SampleBroadcaster
+from waterer_backend.simulator import PlantSimulator
 
 ###############################################################
 # Definitions
@@ -40,7 +44,11 @@ class BLEPumpManager:
         clients: List[BleakClient] = [],
         pump_devices: List[BLEDevice] = [],
         allow_load_history: bool = True,
+        clock: Clock = SYSTEM_CLOCK,
     ) -> None:
+        """
+        clock: of the pumps (e.g. the virtual clock of a simulated device)
+        """
 
         self._status_update_interval_s = status_update_interval_s
         self._clients = clients
@@ -49,6 +57,7 @@ class BLEPumpManager:
             raise ValueError("Inconsistent lengths of clients and devices")
 
         self._allow_load_history = allow_load_history
+        self._samples = SampleBroadcaster()
 
         #
 
@@ -61,6 +70,8 @@ class BLEPumpManager:
                     pump_device=pump_devices[channel],
                     status_update_interval_s=self._status_update_interval_s,
                     allow_load_history=self._allow_load_history,
+                    clock=clock,
+                    sample_callback=self._samples.publish,
                 )
             )
 
@@ -71,6 +82,13 @@ class BLEPumpManager:
             info.append(f"pump {idx}: {pump.info}")
         return info
 
+    @property
+    def samples(self) -> SampleBroadcaster:
+        """
+        Push of the statuses as they are logged
+        """
+        return self._samples
+
     @property
     def num_pumps(self) -> int:
         return len(self._pumps)
@@ -113,21 +131,96 @@ class BLEPumpManager:
         for pump in self._pumps:
             pump.save_history()
 
-        return str(cfg.get_pump_history_filepath())
+        return str(cfg.get_history_dir())
 
-    async def get_status(self, channel: int) -> sp.SmartPumpStatus:
+    async def get_status(
+        self, channel: int, max_age_s: Optional[float] = None
+    ) -> sp.SmartPumpStatus:
         self._check_channel(channel)
-        return await self._pumps[channel].status
+        return await self._pumps[channel].get_status(max_age_s)
+
+    async def get_all_status(
+        self, max_age_s: Optional[float] = None
+    ) -> List[sp.SmartPumpStatus]:
+        """
+        As get_status for all channels (n.b. the pumps are read concurrently)
+        """
+        return list(
+            await asyncio.gather(*(pump.get_status(max_age_s) for pump in self._pumps))
+        )
 
     def clear_status_logs(self, channel: int) -> None:
         self._check_channel(channel)
         return self._pumps[channel].clear_status_logs()
 
     def get_status_since(
-        self, channel: int, earliest_epoch_time_s: Optional[float]
+        self,
+        channel: int,
+        earliest_epoch_time_s: Optional[float],
+        latest_epoch_time_s: Optional[float] = None,
+        resolution_s: Optional[float] = None,
+        since_cursor: Optional[str] = None,
+        max_points: Optional[int] = None,
     ) -> sp.SmartPumpStatusHistory:
         self._check_channel(channel)
-        return self._pumps[channel].get_status_since(earliest_epoch_time_s)
+        return self._pumps[channel].get_status_since(
+            earliest_epoch_time_s,
+            latest_epoch_time_s,
+            resolution_s,
+            since_cursor,
+            max_points,
+        )
+
+    def get_cursor(self, channel: int) -> str:
+        """
+        of the latest sample logged by the pump (see history_cursor)
+        """
+        self._check_channel(channel)
+        return self._pumps[channel].cursor
+
+    def get_all_status_since(
+        self,
+        earliest_epoch_time_s: Optional[float],
+        latest_epoch_time_s: Optional[float] = None,
+        resolution_s: Optional[float] = None,
+        since_cursors: Optional[List[Optional[str]]] = None,
+        max_points: Optional[int] = None,
+    ) -> List[sp.SmartPumpStatusHistory]:
+        """
+        As get_status_since for all channels
+
+        since_cursors: cursor of each channel
+        """
+
+        if since_cursors is None:
+            since_cursors = [None for _ in self._pumps]
+        elif len(since_cursors) != len(self._pumps):
+            raise ValueError(
+                f"Length of since_cursors ({len(since_cursors)}) does not match the number of pumps ({len(self._pumps)})"
+            )
+
+        return [
+            pump.get_status_since(
+                earliest_epoch_time_s,
+                latest_epoch_time_s,
+                resolution_s,
+                since_cursor,
+                max_points,
+            )
+            for pump, since_cursor in zip(self._pumps, since_cursors)
+        ]
+
+    def get_aggregates(
+        self,
+        channel: int,
+        resolution_s: float,
+        earliest_epoch_time_s: Optional[float] = None,
+        latest_epoch_time_s: Optional[float] = None,
+    ) -> sp.SmartPumpAggregates:
+        self._check_channel(channel)
+        return self._pumps[channel].get_aggregates(
+            resolution_s, earliest_epoch_time_s, latest_epoch_time_s
+        )
 
     def start(self):
         for pump in self._pumps:
@@ -147,11 +240,16 @@ class PumpManagerContext:
         status_update_interval_s: int = 5,
         allow_load_history: bool = False,
         scan_duration_s: float = SCAN_DURATION_S,
+        simulator: Optional[PlantSimulator] = None,
     ) -> None:
+        """
+        simulator: serve its simulated pumps (rather than scanning for pumps)
+        """
 
         self._status_update_interval_s = status_update_interval_s
         self._allow_load_history = allow_load_history
         self._scan_duration_s = scan_duration_s
+        self._simulator = simulator
 
         #
 
@@ -161,6 +259,20 @@ class PumpManagerContext:
 
     async def __aenter__(self) -> BLEPumpManager:
 
+        if self._simulator is not None:
+            logger.info(f"Simulating {self._simulator.num_channels} pump(s)")
+
+            self._clients = self._simulator.create_ble_clients()  # type: ignore
+            self._pump_manager = BLEPumpManager(
+                clients=self._clients,
+                pump_devices=self._simulator.create_ble_devices(),  # type: ignore
+                status_update_interval_s=self._status_update_interval_s,
+                allow_load_history=self._allow_load_history,
+                clock=self._simulator.clock,
+            )
+
+            return self._pump_manager
+
         logger.info(f"Scanning for devices for {self._scan_duration_s}s ... ")
         devices = await BleakScanner.discover(timeout=self._scan_duration_s)
 
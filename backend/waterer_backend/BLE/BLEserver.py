@@ -7,11 +7,22 @@
 
 import asyncio
 import logging
+import typing as ty
 
 import aiohttp_cors
 from aiohttp import web
 from waterer_backend import __version__
+from waterer_backend.async_pump_manager import AsyncPumpManager
 from waterer_backend.BLE.BLEpump_manager import BLEPumpManager
+from waterer_backend.columnar_encoding import (
+    COLUMNAR_CONTENT_TYPE,
+    encode_histories,
+    encode_statuses,
+    negotiate_content_type,
+)
+from waterer_backend.downsample import check_max_points
+from waterer_backend.history_cursor import etag_matches, history_etag
+from waterer_backend.sample_stream import DROPPED_EVENT, encode_event
 from waterer_backend.service_logs import get_service_logs
 from waterer_backend.smart_pump import SmartPumpSettings
 
@@ -22,23 +33,94 @@ from waterer_backend.smart_pump import SmartPumpSettings
 logger = logging.getLogger(__name__)
 PUMP_MANAGER_KEY = "pump_manager"
 
+STREAM_HEARTBEAT_INTERVAL_S = 15  # n.b. detects closed connections
+
+# n.b. the (wired) AsyncPumpManager has the interface of the BLEPumpManager
+pump_manager_type = ty.Union[BLEPumpManager, AsyncPumpManager]
+
 ###############################################################
 # Functions
 ###############################################################
 
 
-def get_pump_manager(request: web.Request) -> BLEPumpManager:
+def get_pump_manager(request: web.Request) -> pump_manager_type:
 
     manager = request.app[PUMP_MANAGER_KEY]
-    assert isinstance(manager, BLEPumpManager)
+    assert isinstance(manager, (BLEPumpManager, AsyncPumpManager))
 
     return manager
 
 
+def _history_etag(
+    request: web.Request,
+    channels: ty.List[int],
+    cursors: ty.List[str],
+    query: ty.Dict[str, ty.Any],
+) -> str:
+    settings = [get_pump_manager(request).get_settings(channel) for channel in channels]
+    return history_etag(
+        cursors,
+        settings,
+        query,
+        negotiate_content_type(request.headers.get("Accept")),
+    )
+
+
+def _unmodified_history_etag(
+    request: web.Request, channels: ty.List[int], query: ty.Dict[str, ty.Any]
+) -> ty.Optional[str]:
+    """
+    ETag of the history if the client already has it (n.b. checked before
+    the response is built)
+    """
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is None:
+        return None
+
+    cursors = [get_pump_manager(request).get_cursor(channel) for channel in channels]
+    etag = _history_etag(request, channels, cursors, query)
+
+    return etag if etag_matches(if_none_match, etag) else None
+
+
+def _max_points(request_dict: ty.Dict[str, ty.Any]) -> ty.Optional[int]:
+    """
+    n.b. raises a bad request if invalid
+    """
+
+    try:
+        return check_max_points(request_dict.get("max_points"))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+
+
+def _negotiated_response(
+    request: web.Request,
+    get_json_data: ty.Callable[[], ty.Any],
+    get_columnar_data: ty.Callable[[], bytes],
+    headers: ty.Optional[ty.Dict[str, str]] = None,
+) -> web.Response:
+    """
+    Json (as {"data": ...}) or columnar (see columnar_encoding) as accepted
+    """
+
+    headers = {**(headers or {}), "Vary": "Accept"}
+
+    if negotiate_content_type(request.headers.get("Accept")) == COLUMNAR_CONTENT_TYPE:
+        return web.Response(
+            body=get_columnar_data(),
+            content_type=COLUMNAR_CONTENT_TYPE,
+            headers=headers,
+        )
+
+    return web.json_response({"data": get_json_data()}, headers=headers)
+
+
 ###############################################################
 
 
-def create_app(manager: BLEPumpManager) -> web.Application:
+def create_app(manager: pump_manager_type) -> web.Application:
 
     app = web.Application()
     app[PUMP_MANAGER_KEY] = manager
@@ -49,7 +131,6 @@ def create_app(manager: BLEPumpManager) -> web.Application:
     async def default_route(request: web.Request):
 
         manager = request.app[PUMP_MANAGER_KEY]
-        assert isinstance(get_pump_manager(request), BLEPumpManager)
 
         return web.json_response(
             {
@@ -95,9 +176,25 @@ def create_app(manager: BLEPumpManager) -> web.Application:
     @routes.get("/status/{channel}")
     async def get_pump_status(request: web.Request):
         channel = request.match_info["channel"]
-        status = await get_pump_manager(request).get_status(channel=int(channel))
+        max_age_s = request.query.get("max_age_s")
+        status = await get_pump_manager(request).get_status(
+            channel=int(channel),
+            max_age_s=None if max_age_s is None else float(max_age_s),
+        )
         return web.json_response({"data": status.dict()})
 
+    @routes.get("/status")
+    async def get_all_pump_status(request: web.Request):
+        max_age_s = request.query.get("max_age_s")
+        statuses = await get_pump_manager(request).get_all_status(
+            max_age_s=None if max_age_s is None else float(max_age_s),
+        )
+        return _negotiated_response(
+            request,
+            lambda: [status.dict() for status in statuses],
+            lambda: encode_statuses(statuses),
+        )
+
     @routes.get("/clear_status/{channel}")
     async def clear_status(request: web.Request):
         channel = request.match_info["channel"]
@@ -110,13 +207,138 @@ def create_app(manager: BLEPumpManager) -> web.Application:
         channel = request.match_info["channel"]
 
         request_dict = await request.json()
+        channels = [int(channel)]
+        max_points = _max_points(request_dict)
+
+        unmodified_etag = _unmodified_history_etag(request, channels, request_dict)
+        if unmodified_etag is not None:
+            return web.Response(
+                status=304, headers={"ETag": unmodified_etag, "Vary": "Accept"}
+            )
 
-        earliest_time = request_dict["earliest_time"]  # type: ignore
+        earliest_time = request_dict.get("earliest_time")  # type: ignore
+        latest_time = request_dict.get("latest_time")  # type: ignore
+        resolution_s = request_dict.get("resolution_s")  # type: ignore
+        since_cursor = request_dict.get("since_cursor")  # type: ignore
 
         status_history = get_pump_manager(request).get_status_since(
-            channel=int(channel), earliest_epoch_time_s=earliest_time
+            channel=int(channel),
+            earliest_epoch_time_s=earliest_time,
+            latest_epoch_time_s=latest_time,
+            resolution_s=resolution_s,
+            since_cursor=since_cursor,
+            max_points=max_points,
+        )
+
+        etag = _history_etag(request, channels, [status_history.cursor], request_dict)
+        return _negotiated_response(
+            request,
+            status_history.dict,
+            lambda: encode_histories([status_history]),
+            headers={"ETag": etag},
         )
-        return web.json_response({"data": status_history.dict()})
+
+    @routes.get("/get_status_since")
+    @routes.post("/get_status_since")
+    async def get_all_status_since(request: web.Request):
+
+        request_dict = await request.json()
+        channels = list(range(get_pump_manager(request).num_pumps))
+        max_points = _max_points(request_dict)
+
+        unmodified_etag = _unmodified_history_etag(request, channels, request_dict)
+        if unmodified_etag is not None:
+            return web.Response(
+                status=304, headers={"ETag": unmodified_etag, "Vary": "Accept"}
+            )
+
+        earliest_time = request_dict.get("earliest_time")  # type: ignore
+        latest_time = request_dict.get("latest_time")  # type: ignore
+        resolution_s = request_dict.get("resolution_s")  # type: ignore
+        since_cursors = request_dict.get("since_cursors")  # n.b. a cursor per channel
+
+        status_histories = get_pump_manager(request).get_all_status_since(
+            earliest_epoch_time_s=earliest_time,
+            latest_epoch_time_s=latest_time,
+            resolution_s=resolution_s,
+            since_cursors=since_cursors,
+            max_points=max_points,
+        )
+
+        etag = _history_etag(
+            request,
+            channels,
+            [history.cursor for history in status_histories],
+            request_dict,
+        )
+        return _negotiated_response(
+            request,
+            lambda: [history.dict() for history in status_histories],
+            lambda: encode_histories(status_histories),
+            headers={"ETag": etag},
+        )
+
+    @routes.get("/stream")
+    async def stream(request: web.Request):
+        """
+        Server-sent events of the statuses (of all channels or that of the
+        channel query parameter) as they are logged
+        """
+
+        channel = request.query.get("channel")
+
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+            }
+        )
+        await response.prepare(request)
+
+        with get_pump_manager(request).samples.subscribe(
+            channel=None if channel is None else int(channel)
+        ) as subscription:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), timeout=STREAM_HEARTBEAT_INTERVAL_S
+                    )
+                except asyncio.TimeoutError:
+                    await response.write(b": heartbeat\n\n")
+                    continue
+
+                if event is None:
+                    break
+
+                num_dropped = subscription.pop_num_dropped()
+                if num_dropped:
+                    await response.write(
+                        encode_event(DROPPED_EVENT, {"num_dropped": num_dropped})
+                    )
+
+                # n.b. waits for a slow client (while its queue fills)
+                await response.write(event)
+
+        return response
+
+    @routes.get("/aggregates/{channel}")
+    @routes.post("/aggregates/{channel}")
+    async def get_aggregates(request: web.Request):
+        channel = request.match_info["channel"]
+
+        request_dict = await request.json()
+
+        resolution_s = request_dict["resolution_s"]  # type: ignore
+        earliest_time = request_dict.get("earliest_time")  # type: ignore
+        latest_time = request_dict.get("latest_time")  # type: ignore
+
+        aggregates = get_pump_manager(request).get_aggregates(
+            channel=int(channel),
+            resolution_s=resolution_s,
+            earliest_epoch_time_s=earliest_time,
+            latest_epoch_time_s=latest_time,
+        )
+        return web.json_response({"data": aggregates.dict()})
 
     @routes.get("/save_settings")
     async def save_settings(request: web.Request):
@@ -176,6 +398,11 @@ def create_app(manager: BLEPumpManager) -> web.Application:
 
     app.add_routes(routes)
 
+    async def close_streams(app: web.Application) -> None:
+        app[PUMP_MANAGER_KEY].samples.close()
+
+    app.on_shutdown.append(close_streams)
+
     # Configure default CORS settings.
     cors = aiohttp_cors.setup(
         app,
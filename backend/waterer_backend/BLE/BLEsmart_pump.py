@@ -7,30 +7,26 @@
 import asyncio
 import json
 import logging
-import os
+import pathlib as pt
 import struct
 import traceback as tb
 import typing as ty
-from datetime import datetime
-from time import time
 
 import bleak
-import numpy as np
 import waterer_backend.config as cfg
 import waterer_backend.utils as ut
 from bleak.backends.device import BLEDevice
+from waterer_backend.async_smart_pump import AbstractAsyncSmartPump
 from waterer_backend.BLE.BLE_ids import (
     HUMIDITY_ATTR_ID,
     PUMP_ATTR_ID,
     PUMP_STATUS_ATTR_ID,
 )
-from waterer_backend.models import (
-    SmartPumpSettings,
-    SmartPumpStatus,
-    SmartPumpStatusData,
-    SmartPumpStatusHistory,
-)
-from waterer_backend.status_log import BinaryStatusLog, FloatStatusLog
+from waterer_backend.clock import SYSTEM_CLOCK, Clock
+from waterer_backend.history_file import HistoryArrays, history_arrays_from_status_data
+from waterer_backend.models import SmartPumpSettings, SmartPumpStatusData
+from waterer_backend.request import Request
+from waterer_backend.sample_stream import sample_callback_type
 
 ###############################################################
 # Logging
@@ -44,7 +40,13 @@ _LOGGER = logging.getLogger(__name__)
 ###############################################################
 
 
-class BLESmartPump:
+class BLESmartPump(AbstractAsyncSmartPump):
+
+    """
+    n.b. the history files are keyed by the address of the device (rather
+    than the channel)
+    """
+
     def __init__(
         self,
         channel: int,
@@ -53,7 +55,13 @@ class BLESmartPump:
         status_update_interval_s: float = 5,
         allow_load_history: bool = False,
         auto_save_interval_s: ty.Optional[int] = 3600,
+        journal_batch_size: int = 12,
+        clock: Clock = SYSTEM_CLOCK,
+        sample_callback: ty.Optional[sample_callback_type] = None,
     ) -> None:
+        """
+        n.b. see AbstractSmartPump for the other arguments
+        """
 
         self._client = client
         if client is None:
@@ -63,29 +71,24 @@ class BLESmartPump:
         if pump_device is None:
             _LOGGER.warning("Pump created without valid device")
 
-        self._task: ty.Optional[asyncio.Task] = None
-
         self._channel = channel
 
-        self._settings = self._load_settings()
-
-        self._abort_running = False
-
-        self._status_update_interval_s = status_update_interval_s
-        self._auto_save_interval_s = auto_save_interval_s
-
-        if allow_load_history:
-            self.load_history()
-        else:
-            self._init_logs()
+        super().__init__(
+            channel=channel,
+            settings=self._load_settings(),
+            status_update_interval_s=status_update_interval_s,
+            allow_load_history=allow_load_history,
+            auto_save_interval_s=auto_save_interval_s,
+            journal_batch_size=journal_batch_size,
+            clock=clock,
+            sample_callback=sample_callback,
+        )
 
-        self._last_feedback_update_time: ty.Optional[datetime] = None
-        self._last_auto_save_time: float = time()
+    def _history_archive_filepath(self) -> pt.Path:
+        return cfg.get_pump_history_archive_filepath(self.address)
 
-    def _init_logs(self):
-        self._rel_humidity_V_log = FloatStatusLog()
-        self._smoothed_rel_humidity_V_log = FloatStatusLog()
-        self._pump_status_log = BinaryStatusLog()
+    def _history_journal_filepath(self) -> pt.Path:
+        return cfg.get_pump_history_journal_filepath(self.address)
 
     def _load_settings(self) -> SmartPumpSettings:
 
@@ -140,65 +143,34 @@ class BLESmartPump:
 
         return str(cfg.get_user_config_filepath())
 
-    def save_history(self) -> str:
-
-        pump_history_filepath = cfg.get_pump_history_filepath()
-        if pump_history_filepath.is_file():
-            with open(pump_history_filepath, "r") as fh:
-                pump_history = json.load(fh)
-        else:
-            pump_history = {}
-
-        pump_history[self.address] = self.history.dict()
-
-        with open(pump_history_filepath, "w") as fh:
-            json.dump(pump_history, fh)
-
-        _LOGGER.info(f"{self._channel}: Saved history to: {pump_history_filepath}")
-
-        return str(cfg.get_pump_history_filepath())
-
     @property
     def info(self) -> str:
         assert self._client is not None
         assert self._pump_device is not None
         return f"{self._client.address}, signal strength: {self._pump_device.rssi} dBm"
 
-    @property
-    def channel(self) -> int:
-        return self._channel
-
     @property
     def address(self) -> str:
         assert self._client and self._client.address is not None
         return self._client.address
 
-    @property
-    def settings(self) -> SmartPumpSettings:
-        return self._settings
-
-    @settings.setter
-    def settings(self, value: SmartPumpSettings) -> None:
-        self._settings = value
-        _LOGGER.info(f"{self._channel}: New settings: {self._settings}")
-
     @property
     def history(self) -> SmartPumpStatusData:
-        return SmartPumpStatusData(
-            rel_humidity_V_log=self._rel_humidity_V_log.to_data(),
-            smoothed_rel_humidity_V_log=self._smoothed_rel_humidity_V_log.to_data(),
-            pump_status_log=self._pump_status_log.to_data(),
-        )
+        with self._logs_lock:
+            return SmartPumpStatusData(
+                rel_humidity_V_log=self._rel_humidity_V_log.to_data(),
+                smoothed_rel_humidity_V_log=self._smoothed_rel_humidity_V_log.to_data(),
+                pump_status_log=self._pump_status_log.to_data(),
+            )
 
-    def load_history(self) -> None:
+    def _load_legacy_history(self) -> ty.Optional[HistoryArrays]:
         filepath = cfg.get_pump_history_filepath()
 
         if not filepath.is_file():
             _LOGGER.info(
                 f"{self._channel}: Failed to find history file for: {filepath}"
             )
-            self._init_logs()
-            return
+            return None
 
         with open(filepath, "r") as fh:
             history_dict = json.load(fh)
@@ -207,8 +179,7 @@ class BLESmartPump:
             _LOGGER.info(
                 f"{self._channel}: Failed to find entry in history for: {self.address}"
             )
-            self._init_logs()
-            return
+            return None
 
         try:
             history = SmartPumpStatusData(**history_dict[self.address])
@@ -216,60 +187,11 @@ class BLESmartPump:
             _LOGGER.error(
                 f"{self._channel}: Failed to parse history file: {filepath} with exception{e}"
             )
-            self._init_logs()
-            return
-
-        _LOGGER.info(f"{self._channel}: Loaded history from {filepath}")
-
-        self._rel_humidity_V_log = FloatStatusLog.from_data(history.rel_humidity_V_log)
-        self._smoothed_rel_humidity_V_log = FloatStatusLog.from_data(
-            history.smoothed_rel_humidity_V_log
-        )
-        self._pump_status_log = BinaryStatusLog.from_data(history.pump_status_log)
-
-    def _pcnt_from_V_humidity(
-        self, rel_humidity_V: ty.Union[None, float, ty.List[ty.Optional[float]]]
-    ) -> ty.Union[None, float, ty.List[float]]:
-
-        if rel_humidity_V is None:
-            return None
-
-        if isinstance(rel_humidity_V, list):
-
-            arr = np.asarray(rel_humidity_V)
-            none_vals = arr == None
-            arr[none_vals] = 0
-
-            scaled_arr = (
-                (self._settings.dry_humidity_V - arr)
-                / (self._settings.dry_humidity_V - self._settings.wet_humidity_V)
-                * 100
-            )
-
-            scaled_optional_arr = scaled_arr
-            scaled_optional_arr[none_vals] = None
-            return scaled_optional_arr.tolist()
-
-        else:
-            return (
-                (self._settings.dry_humidity_V - rel_humidity_V)
-                / (self._settings.dry_humidity_V - self._settings.wet_humidity_V)
-                * 100
-            )
-
-    def _smoothed_humidity(self, rel_humidity_V: float) -> ty.Optional[float]:
-        alpha = 1.0 / self._settings.num_smoothing_samples
-        _, last_value = self._smoothed_rel_humidity_V_log.get_newest_value()
-        _, last_status = self._pump_status_log.get_newest_value()
-
-        if last_status:
-            # value not reliable while pump is running
             return None
 
-        if last_value is None:
-            return rel_humidity_V
+        _LOGGER.info(f"{self._channel}: Migrating history from {filepath}")
 
-        return alpha * rel_humidity_V + (1 - alpha) * last_value
+        return history_arrays_from_status_data(history)
 
     async def check_client(self) -> bool:
 
@@ -295,6 +217,7 @@ class BLESmartPump:
         )
 
         await self._client.write_gatt_char(PUMP_ATTR_ID, on_code_bytes)
+        self._on_pump_switched()
 
     async def turn_off(self):
 
@@ -312,6 +235,7 @@ class BLESmartPump:
         )
 
         await self._client.write_gatt_char(PUMP_ATTR_ID, off_code_bytes)
+        self._on_pump_switched()
 
     ###############################################################
     # Access Data
@@ -351,164 +275,43 @@ class BLESmartPump:
         _LOGGER.debug(f"Collecting status of pump: {self._channel}")
 
         rel_humidity_V = await self.get_humidity_V()
-        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
-        smoothed_rel_humidity_V = self._smoothed_humidity(rel_humidity_V)
-
         pump_status = await self.get_pump_status()
-        status_time = time()
-
-        # log
-
-        self._pump_status_log.add_sample(status_time, pump_status)
-        self._rel_humidity_V_log.add_sample(status_time, rel_humidity_V)
-        self._smoothed_rel_humidity_V_log.add_sample(
-            status_time, smoothed_rel_humidity_V
-        )
-
-        # save
 
-        if self._auto_save_interval_s is not None and (
-            (time() - self._last_auto_save_time) > self._auto_save_interval_s
-        ):
-            self.save_history()
-            self._last_auto_save_time = time()
+        self.add_status(rel_humidity_V, bool(pump_status), self._clock.time())
 
         return True
 
-    @property
-    async def status(self) -> SmartPumpStatus:
-
-        await self._update_status()
-
-        status_time, pump_status = self._pump_status_log.get_newest_value()
-        assert status_time is not None
-        assert pump_status is not None
-
-        _, rel_humidity_V = self._rel_humidity_V_log.get_newest_value()
-        assert rel_humidity_V is not None
-
-        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
-        assert isinstance(rel_humidity_pcnt, float)
-
-        (
-            _,
-            smoothed_rel_humidity_V,
-        ) = self._smoothed_rel_humidity_V_log.get_newest_value()
-
-        smoothed_rel_humidity_pcnt = self._pcnt_from_V_humidity(smoothed_rel_humidity_V)
-        assert isinstance(smoothed_rel_humidity_pcnt, float)
-
-        return SmartPumpStatus(
-            rel_humidity_V=rel_humidity_V,
-            rel_humidity_pcnt=rel_humidity_pcnt,
-            smoothed_rel_humidity_pcnt=smoothed_rel_humidity_pcnt,
-            pump_running=pump_status,
-            epoch_time=status_time,
-        )
-
-    def clear_status_logs(self):
-        self._rel_humidity_V_log.clear()
-        self._smoothed_rel_humidity_V_log.clear()
-        self._pump_status_log.clear()
-
-    def get_status_since(
-        self, earliest_epoch_time_s: ty.Optional[float]
-    ) -> SmartPumpStatusHistory:
+    def _feedback_request(self) -> ty.Optional[Request]:
         """
-        if earliest time is None all samples are returned
+        Returns:
+            request to turn on the pump if a feedback event is due (None
+            otherwise)
         """
-        rel_humidity_V_epoch_time, rel_humidity_V = self._rel_humidity_V_log.get_values(
-            earliest_epoch_time_s
-        )
-
-        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
-        assert isinstance(rel_humidity_pcnt, list)
-
-        (
-            smoothed_rel_humidity_V_epoch_time,
-            smoothed_rel_humidity_V,
-        ) = self._smoothed_rel_humidity_V_log.get_values(earliest_epoch_time_s)
 
-        smoothed_rel_humidity_pcnt = self._pcnt_from_V_humidity(smoothed_rel_humidity_V)
-        assert isinstance(smoothed_rel_humidity_pcnt, list)
+        with self._settings_lock:
 
-        pump_running_epoch_time, pump_running = self._pump_status_log.get_values(
-            earliest_epoch_time_s
-        )
-
-        return SmartPumpStatusHistory(
-            rel_humidity_V=rel_humidity_V,
-            rel_humidity_V_epoch_time=rel_humidity_V_epoch_time,
-            rel_humidity_pcnt=rel_humidity_pcnt,
-            rel_humidity_pcnt_epoch_time=rel_humidity_V_epoch_time,
-            smoothed_rel_humidity_pcnt=smoothed_rel_humidity_pcnt,
-            smoothed_rel_humidity_pcnt_epoch_time=smoothed_rel_humidity_V_epoch_time,
-            pump_running_epoch_time=pump_running_epoch_time,
-            pump_running=pump_running,
-        )
-
-    async def _should_activate(self) -> bool:
+            if not self._feedback_due():
+                return None
 
-        next_update_time = datetime.now()
-
-        should_activate = (
-            self._last_feedback_update_time is not None
-            and ut.update_spans_activation_time(
-                self._last_feedback_update_time,
-                next_update_time,
-                self._settings.pump_activation_time_as_date,
+            _LOGGER.info(
+                f"{self.channel}: Update interval spans activation time - performing feedback"
             )
-        )
-        self._last_feedback_update_time = next_update_time
-
-        if not should_activate:
-            return False
-
-        #
-
-        _LOGGER.info(
-            f"{self.channel}: Update interval spans activation time - performing feedback"
-        )
 
-        years_day = ut.day_of_the_year()
+            years_day = ut.day_of_the_year(self._clock.now())
 
-        _LOGGER.info(
-            f"{self.channel}: Checking period: Day of the year: {years_day}, period: {self._settings.pump_activation_period_days} day(s)"
-        )
-
-        should_activate = years_day % self._settings.pump_activation_period_days == 0
-        if not should_activate:
-            _LOGGER.info(f"{self.channel}: Skipping today ... ")
-            return False
-
-        #
-
-        if not self._settings.feedback_active:
-            _LOGGER.info(f"Feedback inactive so not performing")
-            return False
-
-        #
-
-        (
-            _,
-            current_humidity_V,
-        ) = self._smoothed_rel_humidity_V_log.get_newest_value()
-        current_humidity_pcnt = self._pcnt_from_V_humidity(current_humidity_V)
-
-        _LOGGER.info(
-            f"{self.channel}: Humidity: Current: {current_humidity_pcnt} %, Target: {self._settings.feedback_setpoint_pcnt} %"
-        )
-
-        if (
-            isinstance(current_humidity_pcnt, float)
-            and self._settings.feedback_setpoint_pcnt <= current_humidity_pcnt
-        ):
             _LOGGER.info(
-                f"{self.channel}: Humidity greater than target skipping feedback"
+                f"{self.channel}: Checking period: Day of the year: {years_day}, period: {self._settings.pump_activation_period_days} day(s)"
             )
-            return False
 
-        return True
+            if years_day % self._settings.pump_activation_period_days != 0:
+                _LOGGER.info(f"{self.channel}: Skipping today ... ")
+                return None
+
+            if not self._settings.feedback_active:
+                _LOGGER.info(f"Feedback inactive so not performing")
+                return None
+
+            return self._closed_loop_request()
 
     async def _do_loop_iteration(self):
 
@@ -516,20 +319,29 @@ class BLESmartPump:
         if not ok:
             return
 
-        if await self._should_activate():
-
-            _LOGGER.info(
-                f"{self.channel}: Activating pump for {self._settings.pump_on_time_s} s"
-            )
-
-            await self.turn_on(duration_ms=self._settings.pump_on_time_s * 1000)
+        turn_on_request = self._feedback_request()
+        if turn_on_request is not None:
+            await self.turn_on(duration_ms=turn_on_request.data * 1000)
 
     async def run(self):
 
+        assert self._wakeup is not None
+
         while not self._abort_running:
             try:
                 await self._do_loop_iteration()
-                await asyncio.sleep(self._status_update_interval_s)
+
+                # n.b. woken early when the pump is switched
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=self._clock.real_interval_s(
+                            self._status_update_interval_s
+                        ),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
             except asyncio.CancelledError:
                 _LOGGER.info(f"{self._channel}: run cancelled, stopping ...")
                 break
@@ -539,13 +351,3 @@ class BLESmartPump:
                 )
 
         _LOGGER.info(f"{self.channel}: run() finished")
-
-    def start(self):
-        self._task = asyncio.get_event_loop().create_task(self.run())
-
-    # Stops the feedback loop
-    async def interrupt(self):
-
-        if self._task is not None and not self._task.done():
-            self._task.cancel()
-            await self._task
@@ -4,15 +4,19 @@
 # Imports
 ###############################################################
 
+import argparse
 import asyncio
 import logging
 from typing import Optional
 
 import debugpy
 from aiohttp import web
+from waterer_backend.async_pump_manager import AsyncPumpManagerContext
 from waterer_backend.BLE.BLEpump_manager import PumpManagerContext
 from waterer_backend.BLE.BLEserver import create_app
+from waterer_backend.clock import VirtualClock
 from waterer_backend.config import get_pumps_config
+from waterer_backend.simulator import PlantSimulator
 
 ###############################################################
 # Definitions
@@ -81,12 +85,41 @@ async def run_site(app: web.Application) -> None:
 ###############################################################
 
 
-async def main():
+def create_pump_manager_context(
+    wired: bool, num_simulated_pumps: Optional[int] = None, speed: float = 1.0
+):
+    """
+    wired: serve the pumps of an arduino on a serial port (rather than BLE)
+    num_simulated_pumps: serve simulated pumps (rather than BLE)
+    speed: of the clock of the simulated pumps
+    """
+
+    if num_simulated_pumps is not None:
+        simulator = PlantSimulator(num_simulated_pumps, clock=VirtualClock(speed))
+        return PumpManagerContext(simulator=simulator)
+
+    if wired:
+        pumps_config = get_pumps_config()
+        return AsyncPumpManagerContext(
+            settings=pumps_config,
+            num_pumps=len(pumps_config),
+            allow_load_history=True,
+        )
+
+    return PumpManagerContext(scan_duration_s=10, allow_load_history=True)
+
+
+###############################################################
+
+
+async def main(
+    wired: bool = False, num_simulated_pumps: Optional[int] = None, speed: float = 1.0
+):
     init_logging()
     init_debugging()
 
-    async with PumpManagerContext(
-        scan_duration_s=10, allow_load_history=True
+    async with create_pump_manager_context(
+        wired, num_simulated_pumps, speed
     ) as manager:
 
         manager.start()
@@ -124,7 +157,29 @@ async def main():
 ###############################################################
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--wired",
+        action="store_true",
+        help="Serve the pumps of an arduino on a serial port (rather than BLE)",
+    )
+    parser.add_argument(
+        "--simulate",
+        type=int,
+        metavar="NUM_PUMPS",
+        help="Serve simulated pumps (rather than BLE)",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Clock speed of the simulated pumps (e.g. 3600 for an hour per second)",
+    )
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main())
+        asyncio.run(
+            main(wired=args.wired, num_simulated_pumps=args.simulate, speed=args.speed)
+        )
     except KeyboardInterrupt:
         logger.info("User requested stop")
@@ -0,0 +1,70 @@
+#!python3
+
+"""
+Adaptive interval between the status updates of a pump
+
+The interval drops to its minimum around pump activations (while the
+status changes quickly), is halved when the humidity changes by more than
+the threshold between samples and grows (by half) while the change is below
+a quarter of the threshold (i.e. the signal is flat) within the bounds of
+the pump settings.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import typing as ty
+
+from waterer_backend.models import SmartPumpSettings
+
+###############################################################
+# Definitions
+###############################################################
+
+SPEED_UP_FACTOR = 0.5
+BACK_OFF_FACTOR = 1.5
+FLAT_FRACTION = 0.25  # of the threshold
+
+###############################################################
+# Functions
+###############################################################
+
+
+def clamp_status_update_interval_s(
+    interval_s: float, settings: SmartPumpSettings
+) -> float:
+    return min(
+        max(interval_s, settings.min_status_update_interval_s),
+        settings.max_status_update_interval_s,
+    )
+
+
+def next_status_update_interval_s(
+    interval_s: float,
+    settings: SmartPumpSettings,
+    pump_running: bool,
+    pump_switched: bool,
+    humidity_change_V: ty.Optional[float],
+) -> float:
+    """
+    interval_s: the current interval
+    pump_switched: the pump state changed since the previous sample
+    humidity_change_V: since the previous sample (None if there is none)
+
+    Returns:
+        the interval to the next status update
+    """
+
+    if pump_running or pump_switched:
+        return settings.min_status_update_interval_s
+
+    if humidity_change_V is not None:
+        change_V = abs(humidity_change_V)
+
+        if change_V >= settings.polling_change_threshold_V:
+            interval_s *= SPEED_UP_FACTOR
+        elif change_V < FLAT_FRACTION * settings.polling_change_threshold_V:
+            interval_s *= BACK_OFF_FACTOR
+
+    return clamp_status_update_interval_s(interval_s, settings)
@@ -0,0 +1,406 @@
+# python3
+
+"""
+Asyncio implementation of the arduino embedded device (for running the
+wired pumps in the same event loop as the aiohttp server)
+
+The serial port is read (without blocking) when the event loop reports it
+readable and responses are matched to the requests in flight by their id
+(as by the SerialTransport of the blocking implementation).
+
+n.b. requires a serial port with a file descriptor (i.e. a posix system)
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import asyncio
+import json
+import logging
+import os
+import pathlib as pt
+import typing as ty
+from dataclasses import replace
+
+import serial
+import waterer_backend.binary_frame as bf
+from waterer_backend.embedded_arduino import (
+    ALLOW_FAKE_DATA_KEY,
+    BAUD_RATE_CONFIG_KEY,
+    BINARY_FRAMING_CONFIG_KEY,
+    REQUEST_WINDOW_CONFIG_KEY,
+    STARTUP_MESSAGE,
+    generate_fake_response,
+    load_device_config,
+    scan_for_ports,
+)
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+from waterer_backend.serial_transport import (
+    DEFAULT_TIMEOUT_S,
+    DEFAULT_WINDOW,
+    JSON_WINDOW,
+)
+
+###############################################################
+# Definitions
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+###############################################################
+# Class
+###############################################################
+
+
+class AsyncEmbeddedArduino:
+    def __init__(
+        self,
+        *,
+        port: ty.Optional[str] = None,
+        config_filepath: ty.Optional[pt.Path] = None,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+    ) -> None:
+
+        self._port = port
+        self._config_filepath = config_filepath
+        self._timeout_s = timeout_s
+
+        self._device: ty.Optional[serial.Serial] = None
+        self._loop: ty.Optional[asyncio.AbstractEventLoop] = None
+
+        self._window = JSON_WINDOW
+        self._request_window = DEFAULT_WINDOW
+        self._slots: ty.Optional[asyncio.Semaphore] = None
+        self._exclusive_lock: ty.Optional[asyncio.Lock] = None
+
+        self._buffer = bytearray()
+        self._pending: ty.Dict[int, asyncio.Future] = dict()
+        self._raw_pending: ty.Optional[asyncio.Future] = None
+
+        self._allow_binary_framing = True
+        self._binary_framing = False
+
+        self._tx_idx = 0
+        self._next_id = 0
+
+    @property
+    def port(self) -> ty.Optional[str]:
+        return self._port
+
+    @property
+    def connected(self) -> bool:
+        return self._device is not None and self._device.is_open
+
+    async def connection_info(self) -> str:
+
+        if self._device is None:
+            return "Not connected"
+
+        version_str = await self.get_version()
+
+        return f"Device on port: {self._port}, Embedded S/W Version: {version_str}"
+
+    ###############################################################
+    # Connection
+    ###############################################################
+
+    async def connect(self) -> None:
+
+        config = load_device_config(self._config_filepath)
+        self._request_window = config.get(REQUEST_WINDOW_CONFIG_KEY, DEFAULT_WINDOW)
+        self._allow_binary_framing = config.get(BINARY_FRAMING_CONFIG_KEY, True)
+
+        self._loop = asyncio.get_running_loop()
+        # n.b. pipelined once binary framing is negotiated
+        self._set_window(JSON_WINDOW)
+        self._exclusive_lock = asyncio.Lock()
+
+        try:
+            if self._port is None:
+                self._port = scan_for_ports()
+
+            _LOGGER.info(f"Opening serial port: {self._port}")
+
+            # n.b. non-blocking reads (only made when data is available)
+            self._device = serial.Serial(
+                port=self._port, baudrate=config[BAUD_RATE_CONFIG_KEY], timeout=0
+            )
+            self._loop.add_reader(self._device.fileno(), self._on_readable)
+
+            _LOGGER.info(f"Starting to wait for startup message")
+
+            startup_message = await self._next_line()
+
+            _LOGGER.info(f"Recieved: {startup_message}")
+
+            if STARTUP_MESSAGE not in startup_message:
+                _LOGGER.warning(f"Unexpected startup message: {startup_message}")
+
+        except Exception as e:
+            self._close_device()
+
+            if ALLOW_FAKE_DATA_KEY in os.environ:
+                _LOGGER.warning(
+                    f"Encountered {e} during connect, ignoring as found {ALLOW_FAKE_DATA_KEY} in environment variables"
+                )
+            else:
+                raise e
+
+        version_str = await self.get_version()
+        _LOGGER.info(f"Embedded version: {version_str}")
+
+        self._negotiate_framing(version_str)
+
+    def _negotiate_framing(self, version_str: str) -> None:
+        """
+        As EmbeddedArduino._negotiate_framing
+        """
+
+        try:
+            version = float(version_str)
+        except ValueError:
+            version = 0
+
+        self._binary_framing = (
+            self._allow_binary_framing
+            and self._device is not None
+            and bf.supports_binary_framing(version)
+        )
+
+        _LOGGER.info(f"Using {'binary' if self._binary_framing else 'json'} framing")
+
+        self._set_window(self._request_window if self._binary_framing else JSON_WINDOW)
+
+    def _set_window(self, window: int) -> None:
+        """
+        n.b. only while connecting (i.e. without requests in flight)
+        """
+
+        if window < 1:
+            raise ValueError(f"Window must be at least one (got: {window})")
+
+        self._window = window
+        self._slots = asyncio.Semaphore(window)
+
+    def _close_device(self) -> None:
+
+        if self._device is None:
+            return
+
+        if self._loop is not None and self._device.is_open:
+            self._loop.remove_reader(self._device.fileno())
+
+        self._device.close()
+        self._device = None
+        self._binary_framing = False
+
+        self._fail_pending(RuntimeError("Device disconnected"))
+
+    async def disconnect(self) -> None:
+
+        if self._device is None:
+            _LOGGER.warning("No device to disconnect")
+            return
+
+        self._close_device()
+
+        _LOGGER.info("Closed device")
+
+    ###############################################################
+    # Responses
+    ###############################################################
+
+    def _fail_pending(self, error: Exception) -> None:
+
+        futures = list(self._pending.values())
+        if self._raw_pending is not None:
+            futures.append(self._raw_pending)
+
+        self._pending.clear()
+        self._raw_pending = None
+
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def _on_readable(self) -> None:
+
+        assert self._device is not None
+
+        try:
+            self._buffer += self._device.read(self._device.in_waiting or 1)
+        except Exception as e:
+            _LOGGER.error(f"Failed to read from device: {repr(e)}")
+            self._close_device()
+            return
+
+        message = bf.pop_message(self._buffer)
+        while message is not None:
+            self._dispatch(message)
+            message = bf.pop_message(self._buffer)
+
+    def _dispatch(self, message: bf.message_type) -> None:
+
+        if self._raw_pending is not None:
+            future = self._raw_pending
+            self._raw_pending = None
+        else:
+            try:
+                if isinstance(message, bytes):
+                    response_id = bf.response_id(message)
+                else:
+                    response_id = json.loads(message)["id"]
+            except Exception:
+                _LOGGER.warning(f"Discarding unparseable response: {message!r}")
+                return
+
+            future = self._pending.pop(response_id, None)
+
+            if future is None:
+                # e.g. the response to a request which timed out
+                _LOGGER.warning(f"Discarding unexpected response: {message!r}")
+                return
+
+        if not future.done():
+            future.set_result(message)
+
+    async def _next_line(self) -> str:
+
+        assert self._loop is not None
+
+        future = self._loop.create_future()
+        self._raw_pending = future
+
+        try:
+            message = await asyncio.wait_for(future, timeout=self._timeout_s)
+        finally:
+            if self._raw_pending is future:
+                self._raw_pending = None
+
+        # n.b. only json requests (or the startup message) are awaited this way
+        if not isinstance(message, str):
+            raise RuntimeError(f"Unexpected frame: {message.hex()}")
+
+        return message
+
+    def _write(self, message: bf.message_type) -> None:
+
+        if not self.connected:
+            raise RuntimeError("Device not open")
+
+        assert self._device is not None
+
+        if isinstance(message, bytes):
+            self._device.write(message)
+        else:
+            self._device.write(f"{message}\r\n".encode())
+
+    ###############################################################
+    # Requests
+    ###############################################################
+
+    def _is_faking(self) -> bool:
+
+        if self._device is not None:
+            return False
+
+        if ALLOW_FAKE_DATA_KEY in os.environ:
+            return True
+
+        raise RuntimeError("Device not initialized")
+
+    async def send_str(self, request_str: str) -> str:
+        """
+        returns response_str (the next response whatever its id e.g. for
+        malformed requests)
+        """
+
+        if self._is_faking():
+            return generate_fake_response(request_str)
+
+        assert self._exclusive_lock is not None and self._slots is not None
+
+        async with self._exclusive_lock:
+
+            num_acquired = 0
+            try:
+                # n.b. wait for the requests in flight
+                for _ in range(self._window):
+                    await asyncio.wait_for(
+                        self._slots.acquire(), timeout=self._timeout_s
+                    )
+                    num_acquired += 1
+
+                # n.b. the response is only read once awaiting
+                self._write(request_str)
+
+                return await self._next_line()
+
+            finally:
+                for _ in range(num_acquired):
+                    self._slots.release()
+
+    async def _request(self, request: Request) -> bf.message_type:
+
+        assert self._loop is not None and self._slots is not None
+        assert request.id is not None
+
+        await asyncio.wait_for(self._slots.acquire(), timeout=self._timeout_s)
+
+        try:
+            future = self._loop.create_future()
+            self._pending[request.id] = future
+
+            try:
+                # n.b. instructions without an opcode are sent as json
+                if self._binary_framing and request.instruction in bf.INSTRUCTIONS:
+                    self._write(bf.encode_request(request))
+                else:
+                    self._write(request.serialize())
+                return await asyncio.wait_for(future, timeout=self._timeout_s)
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"No response to request {request.id} within {self._timeout_s} s"
+                ) from None
+            finally:
+                self._pending.pop(request.id, None)
+
+        finally:
+            self._slots.release()
+
+    async def make_request(self, request: Request) -> Response:
+
+        response_message: bf.message_type
+
+        if self._is_faking():
+            response_message = generate_fake_response(request.serialize())
+        else:
+            # n.b. request ids are reassigned so that those in flight are distinct
+            request = replace(request, id=self._next_id)
+            self._next_id = (self._next_id + 1) % 10000
+
+            response_message = await self._request(request)
+
+        tx_info = f"{self._tx_idx} <{request.serialize()}>: {response_message!r}"
+        _LOGGER.debug(tx_info)
+        self._tx_idx += 1
+
+        response = bf.response_from_message(response_message)
+
+        if not response.id == request.id:
+            raise RuntimeError(
+                f"Request ({request.id})/Reponse ({response.id}) id's do not match\n{tx_info}"
+            )
+
+        return response
+
+    async def get_version(self) -> str:
+
+        response = await self.make_request(Request(0, "get_version", 0))
+        if response.success:
+            return f"{response.data:.1f}"
+        else:
+            _LOGGER.error(f"Failed to check version: {response.message}")
+            return "UNKNOWN"
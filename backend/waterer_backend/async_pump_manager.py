@@ -0,0 +1,277 @@
+#!python3
+
+"""
+Pump manager for the (wired) arduino pumps running in an asyncio event
+loop (with the same interface as the BLEPumpManager so that either can be
+served by the aiohttp server)
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import asyncio
+import logging
+import math
+import pathlib as pt
+from typing import List, Optional
+
+import waterer_backend.smart_pump as sp
+from waterer_backend.async_embedded_arduino import AsyncEmbeddedArduino
+from waterer_backend.async_smart_pump import AsyncSmartPump
+from waterer_backend.config import get_history_dir, save_user_pumps_config
+from waterer_backend.pump_manager import pump_manager_settings_type
+from waterer_backend.sample_stream import SampleBroadcaster
+
+###############################################################
+# Logging
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+###############################################################
+# Class
+###############################################################
+
+
+class AsyncPumpManager:
+    def __init__(
+        self,
+        device: Optional[AsyncEmbeddedArduino],
+        settings: pump_manager_settings_type,
+        num_pumps: int,
+        status_update_interval_s: int = 5,
+        allow_load_history: bool = False,
+    ) -> None:
+
+        if isinstance(settings, sp.SmartPumpSettings):
+            init_settings = [settings for _ in range(num_pumps)]
+        elif isinstance(settings, list):
+            if len(settings) != num_pumps:
+                raise ValueError(
+                    f"Length of settings list ({len(settings)}) does not match num_pumps ({num_pumps})"
+                )
+            init_settings = settings
+        else:
+            raise ValueError(f"Unexpected type for settings argument {type(settings)}")
+
+        self._device = device
+        self._samples = SampleBroadcaster()
+
+        self._pumps: List[AsyncSmartPump] = []
+        for channel in range(num_pumps):
+            self._pumps.append(
+                AsyncSmartPump(
+                    channel=channel,
+                    device=device,
+                    settings=init_settings[channel],
+                    status_update_interval_s=status_update_interval_s,
+                    allow_load_history=allow_load_history,
+                    sample_callback=self._samples.publish,
+                )
+            )
+
+    @property
+    def device_info(self) -> List[str]:
+        port = "not connected" if self._device is None else self._device.port
+        return [f"pump {pump.channel}: {port}" for pump in self._pumps]
+
+    @property
+    def samples(self) -> SampleBroadcaster:
+        """
+        Push of the statuses as they are logged
+        """
+        return self._samples
+
+    @property
+    def num_pumps(self) -> int:
+        return len(self._pumps)
+
+    def _check_channel(self, channel: int) -> None:
+        if channel < 0:
+            raise ValueError(f"Channel ({channel}) cannot be negative")
+
+        if channel >= self.num_pumps:
+            raise ValueError(
+                f"Channel ({channel}) cannot be greater than or equal to {self.num_pumps}"
+            )
+
+    async def turn_on(self, channel: int, duration_ms: int = 0) -> None:
+        """
+        duration_ms: n.b. rounded up to whole seconds (<= 0 for indefinitely)
+        """
+        self._check_channel(channel)
+        duration_s = math.ceil(duration_ms / 1000) if duration_ms > 0 else 0
+        await self._pumps[channel].turn_on(duration_s=duration_s)
+
+    async def turn_off(self, channel: int) -> None:
+        self._check_channel(channel)
+        await self._pumps[channel].turn_off()
+
+    def set_settings(self, channel: int, settings: sp.SmartPumpSettings) -> None:
+        self._check_channel(channel)
+        self._pumps[channel].settings = settings
+        self.save_settings()
+
+    def get_settings(self, channel: int) -> sp.SmartPumpSettings:
+        self._check_channel(channel)
+        return self._pumps[channel].settings
+
+    def save_settings(self) -> str:
+        return save_user_pumps_config([pump.settings for pump in self._pumps])
+
+    def save_history(self) -> str:
+
+        for pump in self._pumps:
+            pump.save_history()
+
+        return str(get_history_dir())
+
+    async def get_status(
+        self, channel: int, max_age_s: Optional[float] = None
+    ) -> sp.SmartPumpStatus:
+        self._check_channel(channel)
+        return await self._pumps[channel].get_status(max_age_s)
+
+    async def get_all_status(
+        self, max_age_s: Optional[float] = None
+    ) -> List[sp.SmartPumpStatus]:
+        """
+        As get_status for all channels (n.b. the pumps are read concurrently)
+        """
+        return list(
+            await asyncio.gather(*(pump.get_status(max_age_s) for pump in self._pumps))
+        )
+
+    def clear_status_logs(self, channel: int) -> None:
+        self._check_channel(channel)
+        return self._pumps[channel].clear_status_logs()
+
+    def get_status_since(
+        self,
+        channel: int,
+        earliest_epoch_time_s: Optional[float],
+        latest_epoch_time_s: Optional[float] = None,
+        resolution_s: Optional[float] = None,
+        since_cursor: Optional[str] = None,
+        max_points: Optional[int] = None,
+    ) -> sp.SmartPumpStatusHistory:
+        self._check_channel(channel)
+        return self._pumps[channel].get_status_since(
+            earliest_epoch_time_s,
+            latest_epoch_time_s,
+            resolution_s,
+            since_cursor,
+            max_points,
+        )
+
+    def get_cursor(self, channel: int) -> str:
+        """
+        of the latest sample logged by the pump (see history_cursor)
+        """
+        self._check_channel(channel)
+        return self._pumps[channel].cursor
+
+    def get_all_status_since(
+        self,
+        earliest_epoch_time_s: Optional[float],
+        latest_epoch_time_s: Optional[float] = None,
+        resolution_s: Optional[float] = None,
+        since_cursors: Optional[List[Optional[str]]] = None,
+        max_points: Optional[int] = None,
+    ) -> List[sp.SmartPumpStatusHistory]:
+        """
+        As get_status_since for all channels
+
+        since_cursors: cursor of each channel
+        """
+
+        if since_cursors is None:
+            since_cursors = [None for _ in self._pumps]
+        elif len(since_cursors) != len(self._pumps):
+            raise ValueError(
+                f"Length of since_cursors ({len(since_cursors)}) does not match the number of pumps ({len(self._pumps)})"
+            )
+
+        return [
+            pump.get_status_since(
+                earliest_epoch_time_s,
+                latest_epoch_time_s,
+                resolution_s,
+                since_cursor,
+                max_points,
+            )
+            for pump, since_cursor in zip(self._pumps, since_cursors)
+        ]
+
+    def get_aggregates(
+        self,
+        channel: int,
+        resolution_s: float,
+        earliest_epoch_time_s: Optional[float] = None,
+        latest_epoch_time_s: Optional[float] = None,
+    ) -> sp.SmartPumpAggregates:
+        self._check_channel(channel)
+        return self._pumps[channel].get_aggregates(
+            resolution_s, earliest_epoch_time_s, latest_epoch_time_s
+        )
+
+    def start(self):
+        for pump in self._pumps:
+            pump.start()
+
+    async def interrupt(self):
+        for pump in self._pumps:
+            _LOGGER.info(f"interrupting: {pump.channel}")
+            await pump.interrupt()
+
+        self.save_history()
+
+
+class AsyncPumpManagerContext:
+    def __init__(
+        self,
+        settings: pump_manager_settings_type,
+        num_pumps: int,
+        status_update_interval_s: int = 5,
+        port: Optional[str] = None,
+        config_filepath: Optional[pt.Path] = None,
+        allow_load_history: bool = False,
+    ) -> None:
+
+        self._settings = settings
+        self._num_pumps = num_pumps
+        self._status_update_interval_s = status_update_interval_s
+        self._allow_load_history = allow_load_history
+
+        self._device = AsyncEmbeddedArduino(port=port, config_filepath=config_filepath)
+        self._pump_manager: Optional[AsyncPumpManager] = None
+
+    async def __aenter__(self) -> AsyncPumpManager:
+
+        _LOGGER.info("Connecting device")
+
+        try:
+            await self._device.connect()
+        except Exception as e:
+            _LOGGER.error(f"Failed to connect device: {repr(e)}")
+
+        self._pump_manager = AsyncPumpManager(
+            device=self._device,
+            settings=self._settings,
+            num_pumps=self._num_pumps,
+            status_update_interval_s=self._status_update_interval_s,
+            allow_load_history=self._allow_load_history,
+        )
+
+        return self._pump_manager
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+
+        _LOGGER.info("Pump manager context shutting down ... ")
+        if self._pump_manager:
+            await self._pump_manager.interrupt()
+
+        await self._device.disconnect()
+
+        _LOGGER.info("Pump manager completed shut down ... ")
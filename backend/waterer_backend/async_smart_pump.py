@@ -0,0 +1,318 @@
+#!python3
+
+"""
+Pumps run as asyncio tasks (e.g. on an AsyncEmbeddedArduino) rather than as
+threads (see SmartPump)
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import asyncio
+import logging
+import traceback as tb
+import typing as ty
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from waterer_backend.async_embedded_arduino import AsyncEmbeddedArduino
+from waterer_backend.clock import SYSTEM_CLOCK, Clock
+from waterer_backend.models import SmartPumpSettings, SmartPumpStatus
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+from waterer_backend.sample_stream import sample_callback_type
+from waterer_backend.smart_pump import AbstractSmartPump
+
+###############################################################
+# Logging
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+###############################################################
+# Classes
+###############################################################
+
+
+class AbstractAsyncSmartPump(AbstractSmartPump):
+
+    """
+    Pump run as an asyncio task (see AsyncSmartPump and BLESmartPump)
+
+    n.b. the locks of the logs are only briefly held (and never across an
+    await) but the device requests are awaited and the history files are
+    written by a worker thread
+    """
+
+    def __init__(
+        self,
+        channel: int,
+        settings: SmartPumpSettings,
+        status_update_interval_s: float = 5,
+        allow_load_history: bool = False,
+        auto_save_interval_s: ty.Optional[int] = 3600,
+        journal_batch_size: int = 12,
+        clock: Clock = SYSTEM_CLOCK,
+        sample_callback: ty.Optional[sample_callback_type] = None,
+    ) -> None:
+
+        self._wakeup: ty.Optional[asyncio.Event] = None
+        self._refresh: ty.Optional[asyncio.Future] = None
+        self._task: ty.Optional[asyncio.Task] = None
+
+        # n.b. a single worker so that the writes are made in order
+        self._io_executor: ty.Optional[ThreadPoolExecutor] = None
+        self._last_io: ty.Optional[asyncio.Future] = None
+
+        super().__init__(
+            channel=channel,
+            settings=settings,
+            status_update_interval_s=status_update_interval_s,
+            allow_load_history=allow_load_history,
+            auto_save_interval_s=auto_save_interval_s,
+            journal_batch_size=journal_batch_size,
+            clock=clock,
+            sample_callback=sample_callback,
+        )
+
+    def _wake_run_loop(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _run_io(self, io: ty.Callable[[], None]) -> None:
+
+        # n.b. e.g. stepped without being started
+        if self._io_executor is None:
+            io()
+            return
+
+        self._last_io = asyncio.get_event_loop().run_in_executor(self._io_executor, io)
+        self._last_io.add_done_callback(self._on_io_done)
+
+    def _on_io_done(self, future: asyncio.Future) -> None:
+
+        if future.cancelled() or future.exception() is None:
+            return
+
+        _LOGGER.error(
+            f"{self.channel}: Failed to write the history: {repr(future.exception())}"
+        )
+
+    @abstractmethod
+    async def _update_status(self) -> bool:
+        """
+        Read the status from the device and log it
+
+        Returns:
+            ok
+        """
+        ...
+
+    @abstractmethod
+    async def run(self):
+        """
+        Step the pump until interrupted
+        """
+        ...
+
+    @property
+    async def status(self) -> SmartPumpStatus:
+        return await self.get_status()
+
+    async def get_status(self, max_age_s: ty.Optional[float] = None) -> SmartPumpStatus:
+        """
+        As SmartPump.get_status
+        """
+
+        if self.status_is_stale(max_age_s):
+            if self._refresh is None or self._refresh.done():
+                self._refresh = asyncio.ensure_future(self._update_status())
+
+            # n.b. a cancelled caller does not cancel the read of the others
+            await asyncio.shield(self._refresh)
+
+        return self._newest_status()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"pump-{self.channel}-io"
+        )
+        self._task = asyncio.get_event_loop().create_task(self.run())
+
+    # Stops the feedback loop
+    async def interrupt(self):
+
+        self._abort_running = True
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+            # n.b. raised if cancelled before the task started
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        # n.b. the last write is made after the others
+        if self._last_io is not None:
+            await asyncio.gather(self._last_io, return_exceptions=True)
+            self._last_io = None
+
+        if self._io_executor is not None:
+            self._io_executor.shutdown()
+            self._io_executor = None
+
+
+class AsyncSmartPump(AbstractAsyncSmartPump):
+    def __init__(
+        self,
+        channel: int,
+        device: ty.Optional[AsyncEmbeddedArduino],
+        settings: SmartPumpSettings,
+        status_update_interval_s: float = 5,
+        allow_load_history: bool = False,
+        auto_save_interval_s: ty.Optional[int] = 3600,
+        journal_batch_size: int = 12,
+        clock: Clock = SYSTEM_CLOCK,
+        sample_callback: ty.Optional[sample_callback_type] = None,
+    ) -> None:
+
+        self._device = device
+        if device is None:
+            _LOGGER.warning("Pump created without valid device")
+
+        super().__init__(
+            channel=channel,
+            settings=settings,
+            status_update_interval_s=status_update_interval_s,
+            allow_load_history=allow_load_history,
+            auto_save_interval_s=auto_save_interval_s,
+            journal_batch_size=journal_batch_size,
+            clock=clock,
+            sample_callback=sample_callback,
+        )
+
+    async def _make_request_safe_async(
+        self, request: Request
+    ) -> ty.Tuple[bool, ty.Optional[Response]]:
+        """
+        As _make_request_safe
+        """
+
+        task_desc = f"{request.instruction} on channel {self.channel}"
+
+        assert self._device is not None
+
+        try:
+            response = await self._device.make_request(request)
+        except Exception as e:
+            _LOGGER.error(
+                f"Encountered exception {e} at {tb.format_exc()} \nwhile trying: {task_desc}"
+            )
+            return False, None
+
+        if not response.success:
+            _LOGGER.error(f"Failed to: {task_desc}")
+            return False, None
+
+        return True, response
+
+    async def turn_on(self, duration_s: int = 0):
+
+        if self._device is None:
+            _LOGGER.warning("No device connected")
+            return
+
+        response = await self._device.make_request(
+            Request(channel=self.channel, instruction="turn_on", data=duration_s)
+        )
+        self._check_response("turn_on", response)
+        self._on_pump_switched()
+
+    async def turn_off(self):
+
+        if self._device is None:
+            _LOGGER.warning("No device connected")
+            return
+
+        response = await self._device.make_request(
+            Request(channel=self.channel, instruction="turn_off", data=0)
+        )
+        self._check_response("turn_off", response)
+        self._on_pump_switched()
+
+    async def _update_status(self) -> bool:
+
+        if self._device is None:
+            _LOGGER.warning("No device connected")
+            return False
+
+        _LOGGER.debug(f"Collecting status of pump: {self._channel}")
+
+        # n.b. both requests are in flight at once
+        (ok_V, response_V), (ok_state, response_state) = await asyncio.gather(
+            self._make_request_safe_async(
+                Request(channel=self.channel, instruction="get_voltage", data=0)
+            ),
+            self._make_request_safe_async(
+                Request(channel=self.channel, instruction="get_state", data=0)
+            ),
+        )
+        if not (ok_V and ok_state):
+            return False
+
+        assert response_V is not None and response_state is not None
+
+        self.add_status(response_V.data, bool(response_state.data), self._clock.time())
+
+        return True
+
+    async def step(self):
+        """
+        Update the status and perform any due feedback event
+        """
+
+        ok = await self._update_status()
+        if not ok:
+            return
+
+        with self._settings_lock:
+            turn_on_request = (
+                self._closed_loop_request() if self._feedback_due() else None
+            )
+
+        if turn_on_request is not None:
+            _LOGGER.info(f"{self.channel}: Performing feedback event: ")
+            ok, _ = await self._make_request_safe_async(turn_on_request)
+            if ok:
+                self._on_pump_switched()
+
+    async def run(self):
+
+        assert self._wakeup is not None
+
+        while not self._abort_running:
+            try:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=self._clock.real_interval_s(
+                            self._status_update_interval_s
+                        ),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                await self.step()
+            except asyncio.CancelledError:
+                _LOGGER.info(f"{self._channel}: run cancelled, stopping ...")
+                break
+            except Exception:
+                _LOGGER.error(
+                    f"{self.channel}: Encountered exception in run loop:\n\n{tb.format_exc()}"
+                )
+
+        _LOGGER.info(f"Smart pump for channel: {self._channel} finished")
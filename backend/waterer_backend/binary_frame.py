@@ -0,0 +1,272 @@
+#!python3
+
+"""
+Compact binary framing of the requests/responses exchanged with the
+embedded device (an alternative to the json lines, see embedded/Frame.h)
+
+request (REQUEST_FRAME_SIZE bytes):
+    sync, opcode, id (u16), channel (i8), data (i32), crc (u16)
+
+response (RESPONSE_HEADER_SIZE + 4 * num_values + CRC_SIZE bytes):
+    sync, opcode, id (u16), channel (i8), status, data (f32), num_values,
+    values (f32 x num_values), crc (u16)
+
+n.b. little endian, crc: CRC-16/CCITT-FALSE of all of the preceding bytes.
+The device replies in the format of the request so json remains available
+(e.g. for older firmware, the fake data and debugging).
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import binascii
+import struct
+import typing as ty
+
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+
+###############################################################
+# Definitions
+###############################################################
+
+REQUEST_SYNC = 0xA5
+RESPONSE_SYNC = 0x5A
+
+BINARY_FRAMING_MIN_VERSION = 1.2  # embedded version first supporting frames
+
+# n.b. the index is the opcode (must stay in sync with Frame.cpp)
+INSTRUCTIONS = (
+    "get_state",
+    "turn_on",
+    "turn_off",
+    "get_voltage",
+    "get_version",
+    "get_all_status",
+)
+UNKNOWN_OPCODE = 0xFF
+
+STATUS_OK = 0
+ERROR_INVALID_CHANNEL = 1
+ERROR_UNRECOGNIZED_INSTRUCTION = 2
+ERROR_BAD_FRAME = 3
+
+ERROR_MESSAGES = {
+    ERROR_INVALID_CHANNEL: "Invalid channel",
+    ERROR_UNRECOGNIZED_INSTRUCTION: "Error: Unrecognized instruction",
+    ERROR_BAD_FRAME: "Bad frame",
+}
+
+_REQUEST = struct.Struct("<BBHbi")
+_RESPONSE_HEADER = struct.Struct("<BBHbBfB")
+_VALUE = struct.Struct("<f")
+_CRC = struct.Struct("<H")
+
+REQUEST_FRAME_SIZE = _REQUEST.size + _CRC.size
+RESPONSE_HEADER_SIZE = _RESPONSE_HEADER.size
+CRC_SIZE = _CRC.size
+
+message_type = ty.Union[str, bytes]  # json line or frame
+
+###############################################################
+# Functions
+###############################################################
+
+
+def crc16(data: bytes) -> int:
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def _append_crc(frame: bytes) -> bytes:
+    return frame + _CRC.pack(crc16(frame))
+
+
+def _check_crc(frame: bytes) -> None:
+
+    (crc,) = _CRC.unpack_from(frame, len(frame) - CRC_SIZE)
+
+    if crc != crc16(frame[:-CRC_SIZE]):
+        raise ValueError(f"Frame CRC mismatch: {frame.hex()}")
+
+
+###############################################################
+
+
+def supports_binary_framing(version: float) -> bool:
+    # n.b. the device reports its version as a float
+    return round(version, 1) >= BINARY_FRAMING_MIN_VERSION
+
+
+def encode_request(request: Request) -> bytes:
+
+    if request.instruction not in INSTRUCTIONS:
+        raise ValueError(f"No opcode for instruction: {request.instruction}")
+
+    try:
+        frame = _REQUEST.pack(
+            REQUEST_SYNC,
+            INSTRUCTIONS.index(request.instruction),
+            request.id,
+            request.channel,
+            request.data,
+        )
+    except struct.error as e:
+        raise ValueError(f"Cannot frame request {request}: {e}") from None
+
+    return _append_crc(frame)
+
+
+def decode_request(frame: bytes) -> Request:
+
+    if len(frame) != REQUEST_FRAME_SIZE or frame[0] != REQUEST_SYNC:
+        raise ValueError(f"Not a request frame: {frame.hex()}")
+
+    _check_crc(frame)
+
+    _, opcode, request_id, channel, data = _REQUEST.unpack_from(frame)
+
+    instruction = INSTRUCTIONS[opcode] if opcode < len(INSTRUCTIONS) else ""
+
+    return Request(channel=channel, instruction=instruction, data=data, id=request_id)
+
+
+def encode_response(response: Response) -> bytes:
+    """
+    n.b. the message is not sent (it is implied by the status)
+    """
+
+    if response.success:
+        status = STATUS_OK
+    else:
+        status = next(
+            (
+                code
+                for code, message in ERROR_MESSAGES.items()
+                if response.message.startswith(message)
+            ),
+            ERROR_BAD_FRAME,
+        )
+
+    opcode = (
+        INSTRUCTIONS.index(response.instruction)
+        if response.instruction in INSTRUCTIONS
+        else UNKNOWN_OPCODE
+    )
+
+    frame = _RESPONSE_HEADER.pack(
+        RESPONSE_SYNC,
+        opcode,
+        response.id,
+        response.channel,
+        status,
+        response.data,
+        len(response.values),
+    ) + b"".join(_VALUE.pack(value) for value in response.values)
+
+    return _append_crc(frame)
+
+
+def response_frame_size(header: bytes) -> int:
+    """
+    header: at least the first RESPONSE_HEADER_SIZE bytes of the frame
+    """
+    return (
+        RESPONSE_HEADER_SIZE + _VALUE.size * header[RESPONSE_HEADER_SIZE - 1] + CRC_SIZE
+    )
+
+
+def response_id(frame: bytes) -> int:
+    return _RESPONSE_HEADER.unpack_from(frame)[2]
+
+
+def decode_response(frame: bytes) -> Response:
+
+    if (
+        len(frame) < RESPONSE_HEADER_SIZE
+        or frame[0] != RESPONSE_SYNC
+        or len(frame) != response_frame_size(frame)
+    ):
+        raise ValueError(f"Not a response frame: {frame.hex()}")
+
+    _check_crc(frame)
+
+    (
+        _,
+        opcode,
+        frame_id,
+        channel,
+        status,
+        data,
+        num_values,
+    ) = _RESPONSE_HEADER.unpack_from(frame)
+    values = [
+        value
+        for (value,) in _VALUE.iter_unpack(
+            frame[
+                RESPONSE_HEADER_SIZE : RESPONSE_HEADER_SIZE + _VALUE.size * num_values
+            ]
+        )
+    ]
+
+    return Response(
+        id=frame_id,
+        channel=channel,
+        instruction=INSTRUCTIONS[opcode] if opcode < len(INSTRUCTIONS) else "",
+        success=status == STATUS_OK,
+        data=data,
+        message=ERROR_MESSAGES.get(status, f"Error code: {status}")
+        if status != STATUS_OK
+        else "",
+        values=values,
+    )
+
+
+def response_from_message(message: message_type) -> Response:
+    """
+    message: json line or frame
+    """
+
+    if isinstance(message, bytes):
+        return decode_response(message)
+
+    return Response.create(response_str=message)
+
+
+###############################################################
+
+
+def pop_message(buffer: bytearray) -> ty.Optional[message_type]:
+    """
+    Remove the first complete message (a response frame or a decoded json
+    line) from the buffer of bytes read from the device
+
+    Returns:
+        None if the buffer does not (yet) hold a complete message
+    """
+
+    while buffer:
+
+        if buffer[0] == RESPONSE_SYNC:
+            if len(buffer) < RESPONSE_HEADER_SIZE:
+                return None
+
+            frame_size = response_frame_size(buffer)
+            if len(buffer) < frame_size:
+                return None
+
+            frame = bytes(buffer[:frame_size])
+            del buffer[:frame_size]
+            return frame
+
+        end = buffer.find(b"\n")
+        if end < 0:
+            return None
+
+        line = buffer[: end + 1].decode(errors="replace")
+        del buffer[: end + 1]
+
+        if line.strip():
+            return line
+
+    return None
@@ -0,0 +1,103 @@
+#!python3
+
+"""
+Clocks timing the status samples and feedback of the pumps
+
+The system clock is used with real hardware. A virtual clock runs faster
+than real time (or is only moved by advance) so that e.g. days of operation
+of a simulated device can be run in seconds.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import typing as ty
+from datetime import datetime
+from threading import Lock
+from time import monotonic, time
+
+###############################################################
+# Classes
+###############################################################
+
+
+class Clock:
+
+    """
+    The system clock
+    """
+
+    def time(self) -> float:
+        """
+        epoch time (s)
+        """
+        return time()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def real_interval_s(self, interval_s: float) -> float:
+        """
+        Real time to wait for interval_s to pass on the clock
+        """
+        return interval_s
+
+
+SYSTEM_CLOCK = Clock()
+
+###############################################################
+
+
+class VirtualClock(Clock):
+    def __init__(
+        self, speed: float = 1.0, start_epoch_time_s: ty.Optional[float] = None
+    ) -> None:
+        """
+        speed: clock seconds per real second (0 for a clock only moved by
+            advance)
+        start_epoch_time_s: defaults to now
+        """
+
+        if speed < 0:
+            raise ValueError(f"Clock speed cannot be negative (got: {speed})")
+
+        self._speed = speed
+        self._start_epoch_time_s = (
+            time() if start_epoch_time_s is None else start_epoch_time_s
+        )
+        self._start_monotonic_s = monotonic()
+        self._offset_s = 0.0
+
+        self._lock = Lock()
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    def time(self) -> float:
+
+        with self._lock:
+            return (
+                self._start_epoch_time_s
+                + self._offset_s
+                + self._speed * (monotonic() - self._start_monotonic_s)
+            )
+
+    def advance(self, interval_s: float) -> None:
+
+        if interval_s < 0:
+            raise ValueError(f"Cannot move the clock backwards (got: {interval_s} s)")
+
+        with self._lock:
+            self._offset_s += interval_s
+
+    def real_interval_s(self, interval_s: float) -> float:
+        """
+        n.b. unscaled for a clock only moved by advance
+        """
+
+        if self._speed == 0:
+            return interval_s
+
+        return interval_s / self._speed
@@ -0,0 +1,309 @@
+#!python3
+
+"""
+Compact binary (columnar) encoding of the history and bulk status responses,
+an alternative to json negotiated by the Accept header
+
+    header: magic, version (u8), num_records (u16)
+    record: num_texts (u8), num_axes (u8), num_columns (u8),
+        texts: name, text (e.g. the cursor)
+        axes: name, length (u32), times (f8 x length)
+        columns: name, axis (u8), dtype (2 chars, e.g. f4), values
+
+where name/text: length (u8), ascii. Each column has a value per time of its
+axis: the time axes which are the same (e.g. those of rel_humidity_V and
+rel_humidity_pcnt) are only sent once. Missing values are NaN.
+
+n.b. little endian, the humidity values are sent as f4 (the times as f8)
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import struct
+import typing as ty
+
+import numpy as np
+from waterer_backend.models import SmartPumpStatus, SmartPumpStatusHistory
+
+###############################################################
+# Definitions
+###############################################################
+
+JSON_CONTENT_TYPE = "application/json"
+COLUMNAR_CONTENT_TYPE = "application/vnd.waterer.columnar"
+
+MAGIC = b"WCOL"
+FORMAT_VERSION = 2  # n.b. 1 had (f8) scalars in place of the texts
+
+_HEADER = struct.Struct("<4sBH")
+_RECORD_HEADER = struct.Struct("<BBB")
+_AXIS_LENGTH = struct.Struct("<I")
+_COLUMN_HEADER = struct.Struct("<B2s")
+
+_TIME_DTYPE = np.dtype("<f8")
+_VALUE_DTYPE = np.dtype("<f4")
+_COLUMN_DTYPES = {"pump_running": np.dtype("u1")}
+
+_EPOCH_TIME_SUFFIX = "_epoch_time"
+
+
+###############################################################
+# Classes
+###############################################################
+
+
+class ColumnarRecord(ty.NamedTuple):
+    texts: ty.Dict[str, str]
+    axes: ty.Dict[str, np.ndarray]
+    columns: ty.Dict[str, ty.Tuple[str, np.ndarray]]  # name: axis, values
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self._data = memoryview(data)
+        self._offset = 0
+
+    def unpack(self, fmt: struct.Struct) -> ty.Tuple[ty.Any, ...]:
+        values = fmt.unpack_from(self._data, self._offset)
+        self._offset += fmt.size
+        return values
+
+    def text(self) -> str:
+        (length,) = struct.unpack_from("<B", self._data, self._offset)
+        self._offset += 1 + length
+        return bytes(self._data[self._offset - length : self._offset]).decode("ascii")
+
+    def array(self, dtype: np.dtype, length: int) -> np.ndarray:
+        values = np.frombuffer(
+            self._data, dtype=dtype, count=length, offset=self._offset
+        )
+        self._offset += values.nbytes
+        return values
+
+
+###############################################################
+# Functions
+###############################################################
+
+
+def _media_ranges(accept: str) -> ty.Iterator[ty.Tuple[str, float]]:
+    """
+    Returns:
+        media range, quality of each entry of an Accept header
+    """
+
+    for entry in accept.split(","):
+        media_range, *params = [part.strip() for part in entry.split(";")]
+
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        yield media_range.lower(), quality
+
+
+def negotiate_content_type(accept: ty.Optional[str]) -> str:
+    """
+    accept: value of the Accept header (if any)
+
+    Returns:
+        COLUMNAR_CONTENT_TYPE if explicitly preferred (at least as much as
+        json), JSON_CONTENT_TYPE otherwise
+
+    n.b. wildcards only match json (so existing clients are unaffected)
+    """
+
+    if accept is None:
+        return JSON_CONTENT_TYPE
+
+    json_quality = 0.0
+    columnar_quality = 0.0
+
+    for media_range, quality in _media_ranges(accept):
+        if media_range == COLUMNAR_CONTENT_TYPE:
+            columnar_quality = max(columnar_quality, quality)
+        elif media_range in (JSON_CONTENT_TYPE, "application/*", "*/*"):
+            json_quality = max(json_quality, quality)
+
+    if columnar_quality > 0 and columnar_quality >= json_quality:
+        return COLUMNAR_CONTENT_TYPE
+
+    return JSON_CONTENT_TYPE
+
+
+def _pack_text(text: str) -> bytes:
+    encoded = text.encode("ascii")
+    return struct.pack("<B", len(encoded)) + encoded
+
+
+def _encode_record(
+    texts: ty.Dict[str, str],
+    axes: ty.List[ty.Tuple[str, np.ndarray]],
+    columns: ty.List[ty.Tuple[str, int, np.ndarray]],
+) -> bytes:
+    """
+    columns: name, index of the axis, values
+    """
+
+    parts = [_RECORD_HEADER.pack(len(texts), len(axes), len(columns))]
+
+    for name, text in texts.items():
+        parts += [_pack_text(name), _pack_text(text)]
+
+    for name, times in axes:
+        parts += [
+            _pack_text(name),
+            _AXIS_LENGTH.pack(len(times)),
+            times.astype(_TIME_DTYPE, copy=False).tobytes(),
+        ]
+
+    for name, axis, values in columns:
+        dtype = _COLUMN_DTYPES.get(name, _VALUE_DTYPE)
+        parts += [
+            _pack_text(name),
+            _COLUMN_HEADER.pack(axis, dtype.str[1:].encode("ascii")),
+            values.astype(dtype, copy=False).tobytes(),
+        ]
+
+    return b"".join(parts)
+
+
+def _encode_records(records: ty.List[bytes]) -> bytes:
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, len(records)) + b"".join(records)
+
+
+def _encode_history(history: SmartPumpStatusHistory) -> bytes:
+
+    axes: ty.List[ty.Tuple[str, np.ndarray]] = []
+    columns: ty.List[ty.Tuple[str, int, np.ndarray]] = []
+
+    # n.b. the fields are read (rather than copied by dict)
+    field_names = history.__fields__
+
+    for name in field_names:
+        times_name = f"{name}{_EPOCH_TIME_SUFFIX}"
+        if times_name not in field_names:
+            continue
+
+        times = np.asarray(getattr(history, times_name), dtype=float)
+
+        # n.b. shares the axis of a previous column with the same times
+        axis = next(
+            (
+                index
+                for index, (_, axis_times) in enumerate(axes)
+                if np.array_equal(axis_times, times)
+            ),
+            None,
+        )
+        if axis is None:
+            axis = len(axes)
+            axes.append((times_name, times))
+
+        columns.append((name, axis, np.asarray(getattr(history, name), dtype=float)))
+
+    return _encode_record({"cursor": history.cursor}, axes, columns)
+
+
+def encode_histories(histories: ty.Sequence[SmartPumpStatusHistory]) -> bytes:
+    """
+    A record per history
+    """
+    return _encode_records([_encode_history(history) for history in histories])
+
+
+def encode_statuses(statuses: ty.Sequence[SmartPumpStatus]) -> bytes:
+    """
+    A single record with a value per status (i.e. channel) in each column
+    """
+
+    times = np.array([status.epoch_time for status in statuses], dtype=float)
+
+    columns = [
+        (
+            name,
+            0,
+            np.array([getattr(status, name) for status in statuses], dtype=float),
+        )
+        for name in SmartPumpStatus.__fields__
+        if name != "epoch_time"
+    ]
+
+    return _encode_records([_encode_record({}, [("epoch_time", times)], columns)])
+
+
+###############################################################
+
+
+def decode_records(data: bytes) -> ty.List[ColumnarRecord]:
+    """
+    Inverse of encode_histories/encode_statuses (e.g. for a python client)
+    """
+
+    reader = _Reader(data)
+
+    magic, version, num_records = reader.unpack(_HEADER)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar data: {magic!r} (version: {version})")
+
+    records = []
+
+    for _ in range(num_records):
+        num_texts, num_axes, num_columns = reader.unpack(_RECORD_HEADER)
+
+        texts = {}
+        for _ in range(num_texts):
+            name = reader.text()
+            texts[name] = reader.text()
+
+        axes: ty.List[ty.Tuple[str, np.ndarray]] = []
+        for _ in range(num_axes):
+            name = reader.text()
+            (length,) = reader.unpack(_AXIS_LENGTH)
+            axes.append((name, reader.array(_TIME_DTYPE, length)))
+
+        columns = {}
+        for _ in range(num_columns):
+            name = reader.text()
+            axis, dtype = reader.unpack(_COLUMN_HEADER)
+            axis_name, times = axes[axis]
+            columns[name] = (
+                axis_name,
+                reader.array(np.dtype(f"<{dtype.decode('ascii')}"), len(times)),
+            )
+
+        records.append(ColumnarRecord(texts, dict(axes), columns))
+
+    return records
+
+
+def decode_histories(data: bytes) -> ty.List[SmartPumpStatusHistory]:
+    """
+    Inverse of encode_histories
+
+    n.b. the humidity values were sent as f4
+    """
+
+    histories = []
+
+    for record in decode_records(data):
+        history_dict: ty.Dict[str, ty.Any] = {"cursor": record.texts["cursor"]}
+
+        for name, (axis_name, values) in record.columns.items():
+            history_dict[name] = [
+                None if np.isnan(value) else value for value in values.tolist()
+            ]
+            history_dict[f"{name}{_EPOCH_TIME_SUFFIX}"] = record.axes[
+                axis_name
+            ].tolist()
+
+        histories.append(SmartPumpStatusHistory(**history_dict))
+
+    return histories
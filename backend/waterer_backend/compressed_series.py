@@ -0,0 +1,423 @@
+#!python3
+
+"""
+Compressed in-memory storage of (time, value) series
+
+Rows are appended to a small raw tail which, once block_size rows have
+accumulated, is sealed into an immutable compressed block (after
+Pelkonen et al., "Gorilla: A Fast, Scalable, In-Memory Time Series
+Database"):
+
+- times are stored as the delta-of-deltas of their (IEEE 754) integer
+  representation so that regularly sampled times need a few bytes each.
+  This is lossless (unlike quantizing the times).
+- values are stored as the XOR with the preceding value so that slowly
+  changing values have zero high (sign/exponent) and, for quantized
+  measurements, low (mantissa) order bytes.
+
+Rather than the bit level encoding of Gorilla the zero high and low order
+bytes of each word are stripped (noting their counts in a one byte tag)
+so that blocks are encoded and decoded with vectorized numpy operations.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import typing as ty
+from collections import deque
+
+import numpy as np
+from waterer_backend.sample_buffer import SampleBuffer
+
+###############################################################
+# Definitions
+###############################################################
+
+DEFAULT_BLOCK_SIZE = 1024
+
+_BYTE_INDICES = np.arange(8)
+
+###############################################################
+# Functions
+###############################################################
+
+
+def _pack_words(words: np.ndarray) -> ty.Tuple[np.ndarray, np.ndarray]:
+    """
+    Strip the zero high and low order bytes of each (uint64) word
+
+    Returns:
+        tags (number of stripped low order bytes << 4 | number of retained
+        bytes), retained bytes
+    """
+
+    trailing = np.zeros(len(words), dtype=np.uint8)
+    for num_bytes in range(1, 8):
+        trailing += (words & np.uint64((1 << (8 * num_bytes)) - 1)) == 0
+    trailing[words == 0] = 0
+
+    shifted = words >> (trailing.astype(np.uint64) * np.uint64(8))
+
+    width = np.zeros(len(words), dtype=np.uint8)
+    for num_bytes in range(8):
+        width += shifted >= np.uint64(1 << (8 * num_bytes))
+
+    retained = _BYTE_INDICES < width[:, np.newaxis]
+    payload = shifted.astype("<u8").view(np.uint8).reshape(-1, 8)[retained]
+
+    return (trailing << 4) | width, payload
+
+
+def _unpack_words(tags: np.ndarray, payload: np.ndarray) -> np.ndarray:
+    """
+    Inverse of _pack_words
+    """
+
+    retained = _BYTE_INDICES < (tags & 0x0F)[:, np.newaxis]
+
+    data = np.zeros((len(tags), 8), dtype=np.uint8)
+    data[retained] = payload
+
+    return data.view("<u8").ravel() << ((tags >> 4).astype(np.uint64) * np.uint64(8))
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(words: np.ndarray) -> np.ndarray:
+    return (words >> np.uint64(1)).view(np.int64) ^ -(words & np.uint64(1)).view(
+        np.int64
+    )
+
+
+def _encode_times(times: np.ndarray) -> ty.Tuple[np.ndarray, np.ndarray]:
+
+    bits = np.ascontiguousarray(times, dtype=np.float64).view(np.int64)
+
+    # first time, first delta then the delta-of-deltas (n.b. int64
+    # overflow wraps around and so is undone by the decoding)
+    with np.errstate(over="ignore"):
+        encoded = np.concatenate((bits[:1], np.diff(bits[:2]), np.diff(bits, 2)))
+
+    return _pack_words(_zigzag(encoded))
+
+
+def _decode_times(tags: np.ndarray, payload: np.ndarray) -> np.ndarray:
+
+    encoded = _unzigzag(_unpack_words(tags, payload))
+
+    with np.errstate(over="ignore"):
+        deltas = np.cumsum(encoded[1:])
+        bits = encoded[0] + np.concatenate(([0], np.cumsum(deltas)))
+
+    return bits.astype(np.int64).view(np.float64)
+
+
+def _encode_values(values: np.ndarray) -> ty.Tuple[np.ndarray, np.ndarray]:
+
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+
+    return _pack_words(bits ^ np.concatenate(([np.uint64(0)], bits[:-1])))
+
+
+def _decode_values(tags: np.ndarray, payload: np.ndarray) -> np.ndarray:
+    return np.bitwise_xor.accumulate(_unpack_words(tags, payload)).view(np.float64)
+
+
+###############################################################
+# Classes
+###############################################################
+
+
+class _Block(ty.NamedTuple):
+
+    num_rows: int
+    first_time: float
+    last_time: float
+    last_value: float
+
+    # time tags, value tags, time payload, value payload
+    num_time_bytes: int
+    data: np.ndarray
+
+    @staticmethod
+    def encode(times: np.ndarray, values: np.ndarray) -> "_Block":
+
+        time_tags, time_payload = _encode_times(times)
+        value_tags, value_payload = _encode_values(values)
+
+        return _Block(
+            num_rows=len(times),
+            first_time=float(times[0]),
+            last_time=float(times[-1]),
+            last_value=float(values[-1]),
+            num_time_bytes=len(time_payload),
+            data=np.concatenate((time_tags, value_tags, time_payload, value_payload)),
+        )
+
+    def decode(self) -> ty.Tuple[np.ndarray, np.ndarray]:
+
+        num_rows = self.num_rows
+        time_tags = self.data[:num_rows]
+        value_tags = self.data[num_rows : 2 * num_rows]
+        time_payload = self.data[2 * num_rows : 2 * num_rows + self.num_time_bytes]
+        value_payload = self.data[2 * num_rows + self.num_time_bytes :]
+
+        return (
+            _decode_times(time_tags, time_payload),
+            _decode_values(value_tags, value_payload),
+        )
+
+
+class CompressedSeries:
+
+    """
+    FIFO of (time, value) rows (compatible with a two column SampleBuffer)
+    in which all but the newest rows are held in compressed blocks
+
+    Blocks are decoded on query, apart from the oldest which is decoded
+    (once) as rows are dropped from the front.
+    """
+
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+
+        if block_size < 2:
+            raise ValueError(f"Block size must be at least 2 (got: {block_size})")
+
+        self._block_size = block_size
+
+        self.clear()
+
+    def clear(self) -> None:
+
+        self._blocks: ty.Deque[_Block] = deque()
+        self._num_sealed = 0  # rows in blocks (including those dropped)
+
+        # decoded rows of the oldest block of which the first head_offset
+        # have been dropped
+        self._head: ty.Optional[ty.Tuple[np.ndarray, np.ndarray]] = None
+        self._head_offset = 0
+
+        self._tail = SampleBuffer(capacity=2 * self._block_size)
+
+    def __len__(self) -> int:
+        return self._num_sealed - self._head_offset + len(self._tail)
+
+    @property
+    def num_blocks(self) -> int:
+        return len(self._blocks)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the stored rows
+        """
+
+        num_bytes = sum(block.data.nbytes for block in self._blocks)
+        num_bytes += 16 * self._tail.capacity
+
+        if self._head is not None:
+            num_bytes += sum(column.nbytes for column in self._head)
+
+        return num_bytes
+
+    def _seal(self) -> None:
+
+        while len(self._tail) >= self._block_size:
+
+            self._blocks.append(
+                _Block.encode(
+                    self._tail.column(0)[: self._block_size],
+                    self._tail.column(1)[: self._block_size],
+                )
+            )
+            self._num_sealed += self._block_size
+
+            self._tail.drop_left(self._block_size)
+
+    def append(self, new_time: float, new_value: float) -> None:
+
+        self._tail.append(new_time, new_value)
+        self._seal()
+
+    def extend(self, new_times: np.ndarray, new_values: np.ndarray) -> None:
+
+        # n.b. a block at a time so that the tail does not grow
+
+        start = 0
+        while start < len(new_times):
+
+            stop = start + min(
+                self._block_size - len(self._tail), len(new_times) - start
+            )
+
+            self._tail.extend(new_times[start:stop], new_values[start:stop])
+            self._seal()
+
+            start = stop
+
+    def _decoded_head(self) -> ty.Tuple[np.ndarray, np.ndarray]:
+
+        if self._head is None:
+            self._head = self._blocks[0].decode()
+
+        return self._head
+
+    def popleft(self) -> ty.Tuple[float, float]:
+
+        if len(self._blocks) == 0:
+            return self._tail.popleft()
+
+        times, values = self._decoded_head()
+        row = (times[self._head_offset], values[self._head_offset])
+
+        self.drop_left(1)
+
+        return row
+
+    def drop_left(self, num_rows: int) -> None:
+
+        num_rows = min(max(num_rows, 0), len(self))
+
+        while num_rows > 0 and len(self._blocks) > 0:
+
+            num_head_rows = self._blocks[0].num_rows - self._head_offset
+
+            if num_rows < num_head_rows:
+                self._head_offset += num_rows
+                return
+
+            self._blocks.popleft()
+            self._num_sealed -= self._head_offset + num_head_rows
+            self._head = None
+            self._head_offset = 0
+
+            num_rows -= num_head_rows
+
+        self._tail.drop_left(num_rows)
+
+    def first(self, column: int = 0) -> float:
+
+        if len(self._blocks) == 0:
+            return self._tail.first(column)
+
+        return self._decoded_head()[column][self._head_offset]
+
+    def last(self, column: int = 0) -> float:
+
+        if len(self._tail) > 0:
+            return self._tail.last(column)
+
+        if len(self._blocks) == 0:
+            raise IndexError("CompressedSeries is empty")
+
+        block = self._blocks[-1]
+        return block.last_time if column == 0 else block.last_value
+
+    def column(self, column: int) -> np.ndarray:
+        """
+        Read-only (decoded) copy of the rows of a column
+        """
+
+        return self.snapshot().get_arrays()[column]
+
+    def snapshot(self) -> "SeriesSnapshot":
+        """
+        View which is not affected by later changes to the series
+
+        n.b. sealed blocks are immutable and so are shared
+        """
+
+        return SeriesSnapshot(
+            tuple(self._blocks), self._head_offset, self._tail.snapshot()
+        )
+
+
+class SeriesSnapshot:
+
+    """
+    Immutable view of (time, value) rows held in compressed blocks (of which
+    the first head_offset rows are excluded) followed by raw (tail) arrays
+    """
+
+    def __init__(
+        self,
+        blocks: ty.Sequence[_Block],
+        head_offset: int,
+        tail: ty.Sequence[np.ndarray],
+    ) -> None:
+
+        self._blocks = blocks
+        self._head_offset = head_offset
+        self._tail_times, self._tail_values = tail
+
+    @staticmethod
+    def from_arrays(times: np.ndarray, values: np.ndarray) -> "SeriesSnapshot":
+        return SeriesSnapshot((), 0, (times, values))
+
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows with: min_time_s < time <= max_time_s (None for no bound)
+
+        n.b. only the blocks overlapping the range are decoded
+        """
+
+        segments = []
+
+        for index, block in enumerate(self._blocks):
+
+            if (min_time_s is not None and block.last_time <= min_time_s) or (
+                max_time_s is not None and block.first_time > max_time_s
+            ):
+                continue
+
+            block_times, block_values = block.decode()
+
+            if index == 0:
+                block_times = block_times[self._head_offset :]
+                block_values = block_values[self._head_offset :]
+
+            segments.append((block_times, block_values))
+
+        segments.append((self._tail_times, self._tail_values))
+
+        times = []
+        values = []
+
+        for segment_times, segment_values in segments:
+            start = (
+                0
+                if min_time_s is None
+                else np.searchsorted(segment_times, min_time_s, "right")
+            )
+            stop = (
+                len(segment_times)
+                if max_time_s is None
+                else np.searchsorted(segment_times, max_time_s, "right")
+            )
+            index = slice(int(start), max(int(start), int(stop)))
+
+            times.append(segment_times[index])
+            values.append(segment_values[index])
+
+        return np.concatenate(times), np.concatenate(values)
+
+    def get_newest(self) -> ty.Optional[ty.Tuple[float, float]]:
+        """
+        Returns:
+            time, value of the newest row (None if there are no rows)
+        """
+
+        if len(self._tail_times) > 0:
+            return float(self._tail_times[-1]), float(self._tail_values[-1])
+
+        if len(self._blocks) == 0:
+            return None
+
+        return self._blocks[-1].last_time, self._blocks[-1].last_value
@@ -36,15 +36,41 @@ def get_history_dir() -> pt.Path:
 
 
 def get_pump_history_filepath() -> pt.Path:
+    """
+    n.b. legacy (json) history format
+    """
 
     return get_history_dir() / "pump_history.json"
 
 
 def get_history_filepath(channel: int) -> pt.Path:
+    """
+    n.b. legacy (json) history format
+    """
 
     return get_history_dir() / f"pump_{channel}_history.json"
 
 
+def get_history_archive_filepath(channel: int) -> pt.Path:
+
+    return get_history_dir() / f"pump_{channel}_history.npz"
+
+
+def get_pump_history_archive_filepath(address: str) -> pt.Path:
+
+    return get_history_dir() / f"pump_{address.replace(':', '-')}_history.npz"
+
+
+def get_history_journal_filepath(channel: int) -> pt.Path:
+
+    return get_history_dir() / f"pump_{channel}_history.journal"
+
+
+def get_pump_history_journal_filepath(address: str) -> pt.Path:
+
+    return get_history_dir() / f"pump_{address.replace(':', '-')}_history.journal"
+
+
 def get_user_config_filepath() -> pt.Path:
 
     return get_config_dir() / "user_pump_config.json"
@@ -0,0 +1,136 @@
+#!python3
+
+"""
+Shape preserving downsampling of the logged series for charts
+
+The time range is split into equal buckets and the minimum and maximum of
+each bucket (in time order) are kept along with the first and last samples
+so that peaks (e.g. watering) survive. Missing values (NaN) are only kept for
+buckets without any value so that gaps remain visible.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import typing as ty
+
+import numpy as np
+
+###############################################################
+# Definitions
+###############################################################
+
+MIN_MAX_POINTS = 4  # n.b. the first and last samples and a bucket
+
+###############################################################
+# Functions
+###############################################################
+
+
+def check_max_points(max_points: ty.Any) -> ty.Optional[int]:
+    """
+    max_points: as requested (e.g. parsed from json)
+
+    Returns:
+        max_points (None if not requested)
+
+    Raises:
+        ValueError: if not an integer of at least MIN_MAX_POINTS
+    """
+
+    if max_points is None:
+        return None
+
+    if (
+        isinstance(max_points, bool)
+        or not isinstance(max_points, int)
+        or max_points < MIN_MAX_POINTS
+    ):
+        raise ValueError(
+            f"max_points must be an integer of at least {MIN_MAX_POINTS} (got: {max_points!r})"
+        )
+
+    return max_points
+
+
+def _is_first(sorted_keys: np.ndarray) -> np.ndarray:
+    is_first = np.ones(len(sorted_keys), dtype=bool)
+    is_first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return is_first
+
+
+def _first_minimum_of_each_bucket(
+    buckets: np.ndarray, starts: np.ndarray, values: np.ndarray
+) -> np.ndarray:
+    """
+    buckets: of the samples (sorted)
+    starts: index of the first sample of each non-empty bucket
+    values: n.b. without NaN's
+
+    Returns:
+        index of the (first) minimum of each non-empty bucket
+    """
+
+    minima = np.minimum.reduceat(values, starts)
+    counts = np.diff(np.append(starts, len(values)))
+
+    candidates = np.flatnonzero(values == np.repeat(minima, counts))
+
+    return candidates[_is_first(buckets[candidates])]
+
+
+def downsample_min_max(
+    times: np.ndarray, values: np.ndarray, max_points: int
+) -> ty.Tuple[np.ndarray, np.ndarray]:
+    """
+    times: sorted
+    max_points: at most this many samples are returned
+
+    Returns:
+        times, values (the samples unchanged if there are no more than
+        max_points)
+    """
+
+    if max_points < MIN_MAX_POINTS:
+        raise ValueError(
+            f"max_points must be at least {MIN_MAX_POINTS} (got: {max_points})"
+        )
+
+    num_samples = len(times)
+    if num_samples <= max_points:
+        return times, values
+
+    num_buckets = (max_points - 2) // 2
+
+    span_s = times[-1] - times[0]
+    buckets = (
+        np.zeros(num_samples, dtype=np.int_)
+        if span_s <= 0
+        else np.minimum(
+            ((times - times[0]) / span_s * num_buckets).astype(np.int_),
+            num_buckets - 1,
+        )
+    )
+
+    # n.b. the buckets are contiguous (as the times are sorted)
+    starts = np.flatnonzero(_is_first(buckets))
+
+    # n.b. NaN's (as infinity) are only chosen for buckets without values
+    missing = np.isnan(values)
+
+    keep = np.unique(
+        np.concatenate(
+            (
+                [0, num_samples - 1],
+                _first_minimum_of_each_bucket(
+                    buckets, starts, np.where(missing, np.inf, values)
+                ),
+                _first_minimum_of_each_bucket(
+                    buckets, starts, np.where(missing, np.inf, -values)
+                ),
+            )
+        )
+    )
+
+    return times[keep], values[keep]
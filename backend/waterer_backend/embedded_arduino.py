@@ -14,14 +14,21 @@ import logging
 import os
 import pathlib as pt
 import typing as ty
+from dataclasses import replace
 from random import random
 from threading import Lock
 
 import pkg_resources as rc
 import serial
 import serial.tools.list_ports
+import waterer_backend.binary_frame as bf
 from waterer_backend.request import Request
 from waterer_backend.response import Response
+from waterer_backend.serial_transport import (
+    DEFAULT_WINDOW,
+    JSON_WINDOW,
+    SerialTransport,
+)
 
 ###############################################################
 # Definitions
@@ -31,10 +38,88 @@ from waterer_backend.response import Response
 _LOGGER = logging.getLogger(__name__)
 ARDUINO_DESCRIPTION = "Arduino"
 BAUD_RATE_CONFIG_KEY = "baud_rate"
+# optional: max requests in flight with binary framing (n.b. json requests are
+# sent one at a time)
+REQUEST_WINDOW_CONFIG_KEY = "request_window"
+BINARY_FRAMING_CONFIG_KEY = "binary_framing"  # optional: False to only use json
 STARTUP_MESSAGE = "Arduino ready"
 
 ALLOW_FAKE_DATA_KEY = "WATERER_FAKE_DATA"
 
+###############################################################
+# Functions
+###############################################################
+
+
+def load_device_config(config_filepath: ty.Optional[pt.Path]) -> ty.Dict[str, ty.Any]:
+    """
+    config_filepath: None for the packaged config
+    """
+
+    if config_filepath is None:
+        config_filepath = pt.Path(
+            rc.resource_filename(
+                "waterer_backend", str(pt.Path("config") / "device_config.json")
+            )
+        )
+
+    if not config_filepath.is_file():
+        raise ValueError(f"Config filepath does not exist: {config_filepath}")
+
+    with open(config_filepath, "r") as fh:
+        config = json.load(fh)
+
+    # TODO: Validate against schema
+
+    if BAUD_RATE_CONFIG_KEY not in config:
+        raise ValueError(f"Missing key in config: {BAUD_RATE_CONFIG_KEY}")
+
+    return config
+
+
+def scan_for_ports() -> str:
+
+    arduino_ports = [
+        p.device
+        for p in serial.tools.list_ports.comports()
+        if (
+            (ARDUINO_DESCRIPTION in str(p.description))
+            or (p.description.startswith("ttyACM"))  # type: ignore
+        )
+    ]
+    if not arduino_ports:
+        raise IOError("No Arduino found")
+    if len(arduino_ports) > 1:
+        _LOGGER.warning("Multiple Arduinos found - using the first")
+
+    return arduino_ports[0]
+
+
+def generate_fake_response(request_str: str) -> str:
+
+    _LOGGER.warning(f"Faking response to request: {request_str}")
+
+    request = Request.create(request_str)
+    assert request.id is not None
+
+    response = Response(
+        request.id, request.channel, request.instruction, True, 0, "fake"
+    )
+
+    if request.instruction == "get_voltage":
+        response.data = 5 * random()
+    elif request.instruction == "get_state":
+        a = datetime.datetime.now()
+        response.data = float(a.second < 30)
+    elif request.instruction == "get_all_status":
+        a = datetime.datetime.now()
+        response.data = request.data
+        for _ in range(request.data):
+            response.values += [round(5 * random(), 3), float(a.second < 30)]
+
+    return response.serialize()
+
+
 ###############################################################
 # Class
 ###############################################################
@@ -51,9 +136,15 @@ class EmbeddedArduino:
         self._port = port
         self._config_filepath = config_filepath
         self._device = None
+        self._transport: ty.Optional[SerialTransport] = None
         self._lock = Lock()
 
+        self._allow_binary_framing = True
+        self._binary_framing = False
+        self._request_window = DEFAULT_WINDOW
+
         self._tx_idx = 0
+        self._next_id = 0
 
     @property
     def connection_info(self) -> str:
@@ -65,49 +156,16 @@ class EmbeddedArduino:
 
         return f"Device on port: {self._port}, Embedded S/W Version: {version_str}"
 
-    def _scan_for_ports(self) -> str:
-
-        arduino_ports = [
-            p.device
-            for p in serial.tools.list_ports.comports()
-            if (
-                (ARDUINO_DESCRIPTION in str(p.description))
-                or (p.description.startswith("ttyACM"))  # type: ignore
-            )
-        ]
-        if not arduino_ports:
-            raise IOError("No Arduino found")
-        if len(arduino_ports) > 1:
-            _LOGGER.warning("Multiple Arduinos found - using the first")
-
-        return arduino_ports[0]
-
     def _open_serial_port(self):
 
         with self._lock:
-            if self._config_filepath is None:
-                self._config_filepath = pt.Path(
-                    rc.resource_filename(
-                        "waterer_backend", str(pt.Path("config") / "device_config.json")
-                    )
-                )
-
-            if not self._config_filepath.is_file():
-                raise ValueError(
-                    f"Config filepath does not exist: {self._config_filepath}"
-                )
-
-            with open(self._config_filepath, "r") as fh:
-                config = json.load(fh)
-
-            # TODO: Validate against schema
-
-            if BAUD_RATE_CONFIG_KEY not in config:
-                raise ValueError(f"Missing key in config: {BAUD_RATE_CONFIG_KEY}")
+            config = load_device_config(self._config_filepath)
+            self._allow_binary_framing = config.get(BINARY_FRAMING_CONFIG_KEY, True)
+            self._request_window = config.get(REQUEST_WINDOW_CONFIG_KEY, DEFAULT_WINDOW)
 
             try:
                 if self._port is None:
-                    self._port = self._scan_for_ports()
+                    self._port = scan_for_ports()
 
                 _LOGGER.info(f"Opening serial port: {self._port}")
 
@@ -121,6 +179,12 @@ class EmbeddedArduino:
 
                 _LOGGER.info(f"Recieved: {startup_message}")
 
+                # n.b. pipelined once binary framing is negotiated
+                self._transport = SerialTransport(
+                    self._device, window=JSON_WINDOW, timeout_s=self._device.timeout
+                )
+                self._transport.start()
+
             except Exception as e:
                 if ALLOW_FAKE_DATA_KEY in os.environ:
                     self._device = None
@@ -145,82 +209,138 @@ class EmbeddedArduino:
 
         _LOGGER.info(f"Embedded version: {version_str}")
 
+    def _negotiate_framing(self, version_str: str) -> None:
+        """
+        Use binary frames if the device supports them (n.b. falls back to
+        json e.g. for older firmware or fake data)
+        """
+
+        try:
+            version = float(version_str)
+        except ValueError:
+            version = 0
+
+        self._binary_framing = (
+            self._allow_binary_framing
+            and self._device is not None
+            and bf.supports_binary_framing(version)
+        )
+
+        _LOGGER.info(f"Using {'binary' if self._binary_framing else 'json'} framing")
+
+        if self._transport is not None:
+            self._transport.set_window(
+                self._request_window if self._binary_framing else JSON_WINDOW
+            )
+
     def connect(self):
 
         self._open_serial_port()
 
-        self.log_version()
+        version_str = self.get_version()
+        _LOGGER.info(f"Embedded version: {version_str}")
+
+        self._negotiate_framing(version_str)
 
     def disconnect(self):
 
         with self._lock:
 
+            self._binary_framing = False
+
             if self._device is None:
                 _LOGGER.warning("No device to disconnect")
                 return
 
+            if self._transport is not None:
+                self._transport.stop()
+
             if not self._device.is_open:
                 _LOGGER.warning("Device not open - no need to disconnect")
 
             self._device.close()
 
+            if self._transport is not None:
+                self._transport.join()
+                self._transport = None
+
             _LOGGER.info("Closed device")
 
-    def _generate_fake_data(self, request_str: str) -> str:
+    def _get_transport(self) -> ty.Optional[SerialTransport]:
+        """
+        Returns:
+            None if faking data
+        """
 
-        _LOGGER.warning(f"Faking response to request: {request_str}")
+        with self._lock:
 
-        request = Request.create(request_str)
-        assert request.id is not None
+            if self._device is None:
 
-        response = Response(
-            request.id, request.channel, request.instruction, True, 0, "fake"
-        )
+                if ALLOW_FAKE_DATA_KEY in os.environ:
+                    return None
 
-        if request.instruction == "get_voltage":
-            response.data = 5 * random()
-        elif request.instruction == "get_state":
-            a = datetime.datetime.now()
-            response.data = float(a.second < 30)
+                raise RuntimeError("Device not initialized")
 
-        return response.serialize()
+            if not self._device.is_open or self._transport is None:
+                raise RuntimeError("Device not open")
+
+            return self._transport
 
     def send_str(self, request_str) -> str:
         """
-        returns response_str
+        returns response_str (the next response whatever its id e.g. for
+        malformed requests)
         """
 
-        with self._lock:
-
-            if self._device is None:
+        transport = self._get_transport()
 
-                if ALLOW_FAKE_DATA_KEY in os.environ:
-                    return self._generate_fake_data(request_str)
+        if transport is None:
+            return generate_fake_response(request_str)
 
-                raise RuntimeError("Device not initialized")
+        response = transport.exchange(request_str)
 
-            if not self._device.is_open:
-                raise RuntimeError("Device not open")
+        # n.b. a json request is answered by a json line
+        if not isinstance(response, str):
+            raise RuntimeError(f"Unexpected frame in response: {response.hex()}")
 
-            # n.b. best effort (won't work if device is busy creating output at time of request)
-            self._device.flushInput()
-            self._device.flushOutput()
+        return response
 
-            self._device.write(f"{request_str}\r\n".encode())
+    def _unique_id(self) -> int:
+        """
+        n.b. request ids are reassigned so that those in flight are distinct
+        """
 
-            response_str = self._device.readline().decode()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id = (self._next_id + 1) % 10000
 
-            return response_str
+        return request_id
 
     def make_request(self, request: Request) -> Response:
 
-        response_str = self.send_str(request_str=request.serialize())
+        transport = self._get_transport()
+
+        response_message: bf.message_type
+
+        if transport is None:
+            response_message = generate_fake_response(request.serialize())
+        else:
+            request = replace(request, id=self._unique_id())
+            assert request.id is not None
+
+            # n.b. instructions without an opcode are sent as json
+            if self._binary_framing and request.instruction in bf.INSTRUCTIONS:
+                response_message = transport.request(
+                    bf.encode_request(request), request.id
+                )
+            else:
+                response_message = transport.request(request.serialize(), request.id)
 
-        tx_info = f"{self._tx_idx} <{request.serialize()}>: {response_str}"
+        tx_info = f"{self._tx_idx} <{request.serialize()}>: {response_message!r}"
         _LOGGER.debug(tx_info)
         self._tx_idx += 1
 
-        response = Response.create(response_str=response_str)
+        response = bf.response_from_message(response_message)
 
         if not response.id == request.id:
             raise RuntimeError(
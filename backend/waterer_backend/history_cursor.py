@@ -0,0 +1,202 @@
+#!python3
+
+"""
+Sequence numbers of the logged samples (cursors for polling the history
+of a pump) and the ETags of the history responses
+
+Each logged sample (of a pump) gets the next sequence number so that a
+client can ask for the samples logged after the last one it received
+(since_cursor) independently of its clock. A history response is determined
+by the latest cursors, the settings (converting the humidity) and the query
+so that its ETag is known without building the response.
+
+n.b. the sequence numbers restart with the server so the (opaque) cursors
+include the id of the server run: a cursor of another run, or which is no
+longer known (e.g. outside of the window), selects the full history.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import hashlib
+import json
+import typing as ty
+from collections import deque
+from uuid import uuid4
+
+from waterer_backend.models import SmartPumpSettings
+
+###############################################################
+# Definitions
+###############################################################
+
+SEQUENCE_WINDOW = 10000  # samples whose time is kept (per pump)
+
+CURSOR_KEYS = ("since_cursor", "since_cursors")  # of the query
+
+# n.b. distinguishes the cursors (and ETags) of each server run
+_SERVER_RUN_ID = uuid4().hex[:8]
+
+###############################################################
+# Classes
+###############################################################
+
+
+class SampleSequence:
+    def __init__(self, window: int = SEQUENCE_WINDOW) -> None:
+        """
+        window: number of (the latest) samples whose time is kept
+        """
+
+        self._latest = 0  # n.b. of the latest sample (0 for none)
+        self._times: ty.Deque[float] = deque(maxlen=window)
+
+    @property
+    def latest(self) -> int:
+        return self._latest
+
+    @property
+    def cursor(self) -> str:
+        """
+        Of the latest sample (e.g. the since_cursor of the next poll)
+        """
+        return f"{_SERVER_RUN_ID}-{self._latest}"
+
+    def append(self, time_s: float) -> int:
+        """
+        Number a newly logged sample
+
+        Returns:
+            its sequence number
+        """
+
+        self._latest += 1
+        self._times.append(time_s)
+
+        return self._latest
+
+    def clear(self) -> None:
+        """
+        n.b. the logs were cleared (so cursors are invalidated but the
+        sequence numbers still increase)
+        """
+
+        self._latest += 1
+        self._times.clear()
+
+    def time_of(self, seq: int) -> ty.Optional[float]:
+        """
+        Time of the sample numbered seq (None if unknown)
+        """
+
+        first_known = self._latest - len(self._times) + 1
+
+        if seq < first_known or seq > self._latest:
+            return None
+
+        return self._times[seq - first_known]
+
+    def earliest_time_s(
+        self,
+        earliest_epoch_time_s: ty.Optional[float],
+        since_cursor: ty.Optional[str],
+    ) -> ty.Optional[float]:
+        """
+        Time after which samples are selected by the time and/or cursor
+        (the later of the two)
+        """
+
+        since_seq = seq_of_cursor(since_cursor)
+        if since_seq is None:
+            return earliest_epoch_time_s
+
+        since_time_s = self.time_of(since_seq)
+
+        if since_time_s is None:
+            return earliest_epoch_time_s
+
+        if earliest_epoch_time_s is None:
+            return since_time_s
+
+        return max(earliest_epoch_time_s, since_time_s)
+
+
+###############################################################
+# Functions
+###############################################################
+
+
+def seq_of_cursor(cursor: ty.Optional[str]) -> ty.Optional[int]:
+    """
+    Returns:
+        the sequence number of a cursor of this server run (None otherwise,
+        e.g. from a previous run or malformed)
+    """
+
+    if not isinstance(cursor, str):
+        return None
+
+    run_id, _, seq = cursor.rpartition("-")
+    if run_id != _SERVER_RUN_ID or not seq.isdigit():
+        return None
+
+    return int(seq)
+
+
+def history_etag(
+    cursors: ty.Sequence[str],
+    settings: ty.Sequence[SmartPumpSettings],
+    query: ty.Dict[str, ty.Any],
+    content_type: str = "application/json",
+) -> str:
+    """
+    cursors: of the latest sample of the pump(s) in the response
+    settings: of the pump(s) in the response
+    query: parameters of the request (e.g. its json)
+    content_type: of the (negotiated) response
+
+    n.b. the cursors of the request (CURSOR_KEYS) are excluded from the
+    query: a client polling with the cursor and ETag of its previous response
+    gets a 304 until a new sample is logged
+    """
+
+    query = {key: value for key, value in query.items() if key not in CURSOR_KEYS}
+
+    digest = hashlib.sha1(
+        json.dumps(
+            [
+                list(cursors),
+                [pump_settings.json() for pump_settings in settings],
+                query,
+                content_type,
+            ],
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()[:16]
+
+    return f'"{_SERVER_RUN_ID}-{digest}"'
+
+
+def etag_matches(if_none_match: ty.Optional[str], etag: str) -> bool:
+    """
+    if_none_match: value of the If-None-Match header (if any)
+    """
+
+    if if_none_match is None:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+
+        if candidate == "*":
+            return True
+
+        # n.b. weak comparison
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+
+        if candidate == etag:
+            return True
+
+    return False
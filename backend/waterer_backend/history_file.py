@@ -0,0 +1,155 @@
+#!python3
+
+"""
+Columnar on-disk format for pump histories
+
+Each status log is stored as a pair of typed arrays (float64 times and
+float64/uint8 values) in an uncompressed .npz archive alongside a format
+version, so that loading creates no per-sample Python objects.
+
+The aggregate tiers of the float logs (which may span further back than the
+samples) are stored as an array of rows per tier (see
+AggregateTierSnapshot.to_rows). n.b. these are optional (so older files
+remain readable).
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import logging
+import os
+import pathlib as pt
+import typing as ty
+
+import numpy as np
+from waterer_backend.models import SmartPumpStatusData
+from waterer_backend.status_log import AbstractStatusLog, AbstractStatusLogSnapshot
+
+###############################################################
+# Definitions
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+FORMAT_VERSION_KEY = "format_version"
+
+# n.b. match the fields of SmartPumpStatusData
+FLOAT_LOG_NAMES = ("rel_humidity_V_log", "smoothed_rel_humidity_V_log")
+BINARY_LOG_NAMES = ("pump_status_log",)
+
+HistoryArrays = ty.Dict[str, ty.Tuple[np.ndarray, np.ndarray]]
+HistoryAggregates = ty.Dict[str, ty.Dict[float, np.ndarray]]  # by interval
+
+_AGGREGATES_INFIX = "_aggregates_"
+
+###############################################################
+# Functions
+###############################################################
+
+
+def save_history_file(
+    filepath: pt.Path,
+    logs: ty.Mapping[str, ty.Union[AbstractStatusLog, AbstractStatusLogSnapshot]],
+) -> None:
+    """
+    Write (atomically) the samples of each log to filepath
+    """
+
+    arrays: ty.Dict[str, np.ndarray] = {
+        FORMAT_VERSION_KEY: np.asarray(FORMAT_VERSION, dtype=np.int64)
+    }
+
+    for name, log in logs.items():
+        times, values = log.to_arrays()
+
+        arrays[f"{name}_times"] = times.astype(np.float64)
+        arrays[f"{name}_values"] = values.astype(
+            np.uint8 if name in BINARY_LOG_NAMES else np.float64
+        )
+
+        for interval_s, rows in log.to_aggregate_arrays().items():
+            arrays[f"{name}{_AGGREGATES_INFIX}{interval_s!r}"] = rows.astype(np.float64)
+
+    os.makedirs(filepath.parent, exist_ok=True)
+
+    tmp_filepath = filepath.with_name(f"{filepath.name}.tmp")
+    with open(tmp_filepath, "wb") as fh:
+        np.savez(fh, **arrays)
+
+    os.replace(tmp_filepath, filepath)
+
+
+def load_history_file(filepath: pt.Path) -> HistoryArrays:
+    """
+    Returns:
+        (times, values) for each log in the file
+    """
+
+    history: HistoryArrays = dict()
+
+    with np.load(filepath, allow_pickle=False) as data:
+
+        _check_format_version(data, filepath)
+
+        for name in FLOAT_LOG_NAMES + BINARY_LOG_NAMES:
+            history[name] = (data[f"{name}_times"], data[f"{name}_values"])
+
+    return history
+
+
+def load_history_aggregates(filepath: pt.Path) -> HistoryAggregates:
+    """
+    Returns:
+        rows of each (stored) aggregate tier by interval for each float log
+    """
+
+    aggregates: HistoryAggregates = {name: dict() for name in FLOAT_LOG_NAMES}
+
+    with np.load(filepath, allow_pickle=False) as data:
+
+        _check_format_version(data, filepath)
+
+        for key in data.files:
+            name, infix, interval_s = key.partition(_AGGREGATES_INFIX)
+            if infix and name in aggregates:
+                aggregates[name][float(interval_s)] = data[key]
+
+    return aggregates
+
+
+def _check_format_version(data: ty.Any, filepath: pt.Path) -> None:
+
+    if FORMAT_VERSION_KEY not in data:
+        raise ValueError(f"Missing format version in history file: {filepath}")
+
+    format_version = int(data[FORMAT_VERSION_KEY])
+    if format_version != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported history file version {format_version} (expected {FORMAT_VERSION}) in {filepath}"
+        )
+
+
+def history_arrays_from_status_data(history: SmartPumpStatusData) -> HistoryArrays:
+    """
+    Convert a legacy (json) history
+    """
+
+    arrays: HistoryArrays = dict()
+
+    for name in FLOAT_LOG_NAMES:
+        log_data = getattr(history, name)
+        arrays[name] = (
+            np.asarray(log_data.times, dtype=np.float64),
+            np.asarray(log_data.values, dtype=np.float64),  # n.b. None -> NaN
+        )
+
+    for name in BINARY_LOG_NAMES:
+        log_data = getattr(history, name)
+        arrays[name] = (
+            np.asarray(log_data.times, dtype=np.float64),
+            np.asarray(log_data.values, dtype=np.uint8),
+        )
+
+    return arrays
@@ -9,7 +9,7 @@ import typing as ty
 # from pydantic.dataclasses import dataclass
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 
 ###############################################################
 # Definitions
@@ -37,9 +37,41 @@ class SmartPumpSettings(BaseModel):
     num_smoothing_samples: float = 10
     name: str = "Unamed pump"
 
+    # n.b. if adaptive the status update interval is shortened around pump
+    # activations and rapid humidity changes and lengthened while flat (off
+    # by default so that existing configs keep their fixed interval)
+    adaptive_polling: bool = False
+    min_status_update_interval_s: float = 1
+    max_status_update_interval_s: float = 60
+    polling_change_threshold_V: float = 0.05
+
     def __post_init__(self):
         self.validate()
 
+    @root_validator(skip_on_failure=True)
+    def _check_polling(cls, values: ty.Dict[str, ty.Any]) -> ty.Dict[str, ty.Any]:
+
+        min_interval_s = values["min_status_update_interval_s"]
+        max_interval_s = values["max_status_update_interval_s"]
+        change_threshold_V = values["polling_change_threshold_V"]
+
+        if min_interval_s <= 0:
+            raise ValueError(
+                f"min_status_update_interval_s: {min_interval_s} s must be positive"
+            )
+
+        if max_interval_s < min_interval_s:
+            raise ValueError(
+                f"max_status_update_interval_s: {max_interval_s} s cannot be less than the minimum: {min_interval_s} s"
+            )
+
+        if change_threshold_V <= 0:
+            raise ValueError(
+                f"polling_change_threshold_V: {change_threshold_V} V must be positive"
+            )
+
+        return values
+
     @property
     def pump_activation_time_as_date(self) -> datetime:
         return datetime(
@@ -75,10 +107,23 @@ class FloatStatusLogData(BaseModel):
     times: ty.List[float]
 
 
+class AggregateTierSettings(BaseModel):
+    interval_s: float
+    max_age_s: float = 3600 * 24 * 7
+
+
 class FloatStatusLogSettings(BaseModel):
     low_res_switchover_age_s: float = 3600
     low_res_interval_s: float = 300
     low_res_max_age_s: float = 3600 * 24 * 7
+    compress_samples: bool = False
+    # n.b. saved with the history (so may span further back than the samples)
+    aggregate_tiers: ty.List[AggregateTierSettings] = [
+        AggregateTierSettings(interval_s=60),
+        AggregateTierSettings(interval_s=300),
+        AggregateTierSettings(interval_s=3600),
+        AggregateTierSettings(interval_s=3600 * 24, max_age_s=3600 * 24 * 365),
+    ]
 
 
 class BinaryStatusLogData(BaseModel):
@@ -116,3 +161,22 @@ class SmartPumpStatusHistory(BaseModel):
 
     pump_running: ty.List[int]
     pump_running_epoch_time: ty.List[float]
+
+    cursor: str = ""  # of the latest logged sample (the since_cursor of the next poll)
+
+
+class SmartPumpAggregates(BaseModel):
+    resolution_s: float
+
+    epoch_time: ty.List[float]  # bucket start times
+
+    rel_humidity_V_min: ty.List[float]
+    rel_humidity_V_max: ty.List[float]
+    rel_humidity_V_mean: ty.List[float]
+
+    rel_humidity_pcnt_min: ty.List[float]
+    rel_humidity_pcnt_max: ty.List[float]
+    rel_humidity_pcnt_mean: ty.List[float]
+
+    pump_on_time_epoch_time: ty.List[float]
+    pump_on_time_s: ty.List[float]
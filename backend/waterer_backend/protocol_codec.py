@@ -0,0 +1,184 @@
+#!python3
+
+"""
+Encoding, decoding and validation of the messages exchanged with the
+embedded device
+
+The schemas are loaded and compiled once. Messages are checked with a
+fast path derived from the schema (plain type/enum checks of the fixed
+message shapes) and only those which it cannot vouch for are passed to the
+full jsonschema validator (which raises the usual ValidationError).
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import json
+import pathlib as pt
+import typing as ty
+from functools import lru_cache
+
+import jsonschema
+import pkg_resources as rc
+
+###############################################################
+# Definitions
+###############################################################
+
+REQUEST_SCHEMA_FILENAME = "request_schema.json"
+RESPONSE_SCHEMA_FILENAME = "response_schema.json"
+
+# n.b. bool is a subclass of int but not a json integer/number
+_TYPE_CHECKS: ty.Dict[str, ty.Callable[[ty.Any], bool]] = {
+    "integer": lambda value: type(value) is int,
+    "number": lambda value: type(value) in (int, float),
+    "boolean": lambda value: type(value) is bool,
+    "string": lambda value: type(value) is str,
+}
+
+_ENCODER = json.JSONEncoder()
+_DECODER = json.JSONDecoder()
+
+###############################################################
+# Functions
+###############################################################
+
+
+def _compile_property(schema: ty.Mapping) -> ty.Optional[ty.Callable[[ty.Any], bool]]:
+    """
+    Returns:
+        check of a value against the (property) schema (None if the schema
+        is not supported by the fast path)
+    """
+
+    unsupported_keys = set(schema) - {"type", "enum", "items", "description"}
+    if unsupported_keys:
+        return None
+
+    if schema.get("type") == "array":
+        if "enum" in schema:
+            return None
+
+        item_check = _compile_property(schema.get("items", {}))
+        if item_check is None:
+            return None
+
+        return lambda value: type(value) is list and all(map(item_check, value))
+
+    type_check = _TYPE_CHECKS.get(schema.get("type", ""))
+    if type_check is None:
+        return None
+
+    if "enum" not in schema:
+        return type_check
+
+    enum = frozenset(schema["enum"])
+
+    return lambda value: type_check(value) and value in enum
+
+
+###############################################################
+# Classes
+###############################################################
+
+
+class MessageCodec:
+    def __init__(self, schema: ty.Mapping) -> None:
+
+        self._schema = schema
+        self._validator = jsonschema.Draft7Validator(schema=schema)
+
+        self._required = frozenset(schema.get("required", ()))
+        self._property_checks: ty.Optional[
+            ty.Dict[str, ty.Callable[[ty.Any], bool]]
+        ] = None
+
+        if schema.get("type") == "object" and set(schema) <= {
+            "type",
+            "version",
+            "properties",
+            "required",
+        }:
+            property_checks = {
+                key: _compile_property(property_schema)
+                for key, property_schema in schema.get("properties", {}).items()
+            }
+            if all(check is not None for check in property_checks.values()):
+                self._property_checks = property_checks  # type: ignore
+
+    @property
+    def schema(self) -> ty.Mapping:
+        return self._schema
+
+    def _is_valid_fast(self, message: ty.Any) -> bool:
+        """
+        n.b. False if the message may still be valid (e.g. 1.0 for an integer)
+        """
+
+        if self._property_checks is None or type(message) is not dict:
+            return False
+
+        if not self._required.issubset(message):
+            return False
+
+        for key, value in message.items():
+            check = self._property_checks.get(key)
+            if check is None or not check(value):
+                return False
+
+        return True
+
+    def validate(self, message: ty.Any) -> None:
+        """
+        Raises:
+            jsonschema.ValidationError if the message does not match the schema
+        """
+
+        if self._is_valid_fast(message):
+            return
+
+        self._validator.validate(message)
+
+    def encode(self, message: ty.Mapping) -> str:
+
+        self.validate(message)
+
+        return _ENCODER.encode(message)
+
+    def decode(self, message_str: str) -> ty.Dict[str, ty.Any]:
+
+        message = _DECODER.decode(message_str)
+
+        self.validate(message)
+
+        return message
+
+
+@lru_cache(maxsize=None)
+def get_codec(schema_filename: str) -> MessageCodec:
+    """
+    n.b. the schema is loaded (and compiled) once per process
+    """
+
+    schema_filepath = pt.Path(
+        rc.resource_filename(
+            "waterer_backend", str(pt.Path("config") / schema_filename)
+        )
+    )
+
+    if not schema_filepath.is_file():
+        raise RuntimeError(f"Missing: {schema_filepath}")
+
+    with open(schema_filepath, "r") as fh:
+        schema = json.load(fh)
+
+    return MessageCodec(schema)
+
+
+def get_request_codec() -> MessageCodec:
+    return get_codec(REQUEST_SCHEMA_FILENAME)
+
+
+def get_response_codec() -> MessageCodec:
+    return get_codec(RESPONSE_SCHEMA_FILENAME)
@@ -7,11 +7,16 @@
 
 import logging
 import pathlib as pt
+from threading import Event, Lock, Thread
 from typing import Dict, List, Optional, Union
 
 import waterer_backend.smart_pump as sp
+from waterer_backend.clock import SYSTEM_CLOCK, Clock
 from waterer_backend.config import get_history_dir, save_user_pumps_config
 from waterer_backend.embedded_arduino import EmbeddedArduino
+from waterer_backend.pump_scheduler import PumpScheduler
+from waterer_backend.request import ALL_CHANNELS, Request
+from waterer_backend.response import Response
 
 ###############################################################
 # Logging
@@ -20,6 +25,7 @@ from waterer_backend.embedded_arduino import EmbeddedArduino
 _LOGGER = logging.getLogger(__name__)
 
 NUM_PUMPS = 3
+BULK_POLL_TASK_KEY = "all_status"
 
 
 global _GLOBAL_pump_manager
@@ -52,9 +58,21 @@ class PumpManager:
         port: Optional[str] = None,
         config_filepath: Optional[pt.Path] = None,
         allow_load_history: bool = False,
+        use_scheduler: bool = False,
+        device: Optional[EmbeddedArduino] = None,
+        clock: Clock = SYSTEM_CLOCK,
     ) -> None:
+        """
+        use_scheduler: drive all of the pumps from a single scheduler thread
+            (rather than a thread per pump)
+        device: used in place of an arduino on port (e.g. a SimulatedArduino)
+        clock: of the pumps (e.g. the virtual clock of a simulated device)
+        """
+
         self._num_pumps = num_pumps
         self._status_update_interval_s = status_update_interval_s
+        self._use_scheduler = use_scheduler
+        self._clock = clock
 
         if isinstance(settings, sp.SmartPumpSettings):
             self._init_settings = [settings for _ in range(num_pumps)]
@@ -71,8 +89,18 @@ class PumpManager:
         self._config_filepath = config_filepath
         self._allow_load_history = allow_load_history
 
+        self._init_device = device
         self._device: Optional[EmbeddedArduino] = None
 
+        # status of all pumps polled with one request (if supported)
+        self._bulk_poll = False
+        self._bulk_poll_thread: Optional[Thread] = None
+        self._bulk_poll_wakeup = Event()
+        self._bulk_refresh_lock = Lock()
+        self._stop_event = Event()
+
+        self._scheduler: Optional[PumpScheduler] = None
+
     @property
     def num_pumps(self) -> int:
         return self._num_pumps
@@ -125,19 +153,219 @@ class PumpManager:
 
         return str(get_history_dir())
 
-    def get_status(self, channel: int) -> sp.SmartPumpStatus:
+    def get_status(
+        self, channel: int, max_age_s: Optional[float] = None
+    ) -> sp.SmartPumpStatus:
+        """
+        max_age_s: read the status from the device if the latest logged status
+            is older (by default the latest logged status is returned)
+        """
         self._check_channel(channel)
-        return self._pumps[channel].status
+        return self._pumps[channel].get_status(max_age_s)
+
+    def get_all_status(
+        self, max_age_s: Optional[float] = None
+    ) -> List[sp.SmartPumpStatus]:
+        """
+        As get_status for all channels
+
+        n.b. if polled in bulk any stale statuses are refreshed with a single
+        request for the status of all pumps
+        """
+
+        return [pump.get_status(max_age_s) for pump in self._pumps]
 
     def clear_status_logs(self, channel: int) -> None:
         self._check_channel(channel)
         return self._pumps[channel].clear_status_logs()
 
     def get_status_since(
-        self, channel: int, earliest_epoch_time_s: Optional[float]
+        self,
+        channel: int,
+        earliest_epoch_time_s: Optional[float],
+        latest_epoch_time_s: Optional[float] = None,
+        resolution_s: Optional[float] = None,
+        since_cursor: Optional[str] = None,
+        max_points: Optional[int] = None,
     ) -> sp.SmartPumpStatusHistory:
         self._check_channel(channel)
-        return self._pumps[channel].get_status_since(earliest_epoch_time_s)
+        return self._pumps[channel].get_status_since(
+            earliest_epoch_time_s,
+            latest_epoch_time_s,
+            resolution_s,
+            since_cursor,
+            max_points,
+        )
+
+    def get_cursor(self, channel: int) -> str:
+        """
+        of the latest sample logged by the pump (see history_cursor)
+        """
+        self._check_channel(channel)
+        return self._pumps[channel].cursor
+
+    def get_all_status_since(
+        self,
+        earliest_epoch_time_s: Optional[float],
+        latest_epoch_time_s: Optional[float] = None,
+        resolution_s: Optional[float] = None,
+        since_cursors: Optional[List[Optional[str]]] = None,
+        max_points: Optional[int] = None,
+    ) -> List[sp.SmartPumpStatusHistory]:
+        """
+        As get_status_since for all channels
+
+        since_cursors: cursor of each channel
+        """
+
+        if since_cursors is None:
+            since_cursors = [None for _ in self._pumps]
+        elif len(since_cursors) != len(self._pumps):
+            raise ValueError(
+                f"Length of since_cursors ({len(since_cursors)}) does not match the number of pumps ({len(self._pumps)})"
+            )
+
+        return [
+            pump.get_status_since(
+                earliest_epoch_time_s,
+                latest_epoch_time_s,
+                resolution_s,
+                since_cursor,
+                max_points,
+            )
+            for pump, since_cursor in zip(self._pumps, since_cursors)
+        ]
+
+    def get_aggregates(
+        self,
+        channel: int,
+        resolution_s: float,
+        earliest_epoch_time_s: Optional[float] = None,
+        latest_epoch_time_s: Optional[float] = None,
+    ) -> sp.SmartPumpAggregates:
+        self._check_channel(channel)
+        return self._pumps[channel].get_aggregates(
+            resolution_s, earliest_epoch_time_s, latest_epoch_time_s
+        )
+
+    def _request_all_status(self) -> Optional[Response]:
+
+        if self._device is None:
+            return None
+
+        try:
+            response = self._device.make_request(
+                Request(
+                    channel=ALL_CHANNELS,
+                    instruction="get_all_status",
+                    data=self._num_pumps,
+                )
+            )
+        except Exception as e:
+            _LOGGER.error(f"Failed to request status of all pumps: {repr(e)}")
+            return None
+
+        if not response.success or len(response.values) < 2 * self._num_pumps:
+            _LOGGER.warning(
+                f"Bulk status request failed: {response.message} ({len(response.values)} values)"
+            )
+            return None
+
+        return response
+
+    def _supports_bulk_poll(self) -> bool:
+        """
+        Older firmware rejects get_all_status (leaving each pump to poll its status)
+        """
+
+        return self._request_all_status() is not None
+
+    def _poll_all_status(self) -> None:
+        """
+        Request the status of all pumps at once and log it to each pump
+        """
+
+        response = self._request_all_status()
+        if response is None:
+            return
+
+        status_time = self._clock.time()
+
+        for channel, pump in enumerate(self._pumps):
+            pump.add_status(
+                rel_humidity_V=response.values[2 * channel],
+                pump_status=bool(response.values[2 * channel + 1]),
+                status_time=status_time,
+            )
+
+    def _refresh_all_status(self, max_age_s: Optional[float]) -> None:
+        """
+        Refresh the status of all pumps if any is stale (the status_refresher
+        of the pumps if polled in bulk)
+
+        n.b. concurrent callers (e.g. for different channels) share a single poll
+        """
+
+        with self._bulk_refresh_lock:
+            # n.b. may have been polled while waiting for the lock
+            if any(pump.status_is_stale(max_age_s) for pump in self._pumps):
+                self._poll_all_status()
+
+    def _bulk_poll_interval_s(self) -> float:
+        """
+        n.b. that of the pump which currently updates its status most often
+        (the pumps adapt their intervals to the statuses polled)
+        """
+
+        return self._clock.real_interval_s(
+            min(pump.status_update_interval_s for pump in self._pumps)
+        )
+
+    def _run_bulk_poll(self) -> None:
+
+        while not self._stop_event.is_set():
+            self._bulk_poll_wakeup.wait(timeout=self._bulk_poll_interval_s())
+            self._bulk_poll_wakeup.clear()
+
+            if self._stop_event.is_set():
+                break
+
+            self._poll_all_status()
+
+    def _wake(self, channel: int) -> None:
+        """
+        Called by a pump when its settings or pump state change
+        """
+
+        if self._scheduler is not None:
+            self._scheduler.wake(channel)
+
+        if self._bulk_poll:
+            if self._scheduler is not None:
+                self._scheduler.wake(BULK_POLL_TASK_KEY)
+            else:
+                self._bulk_poll_wakeup.set()
+
+    def _start_scheduler(self, scheduler: PumpScheduler) -> None:
+
+        _LOGGER.info(f"Scheduling {self._num_pumps} pumps")
+
+        # n.b. added first so that the status is polled before the pumps step
+        if self._bulk_poll:
+            scheduler.add_task(
+                BULK_POLL_TASK_KEY, self._poll_all_status, self._bulk_poll_interval_s
+            )
+
+        for pump in self._pumps:
+            scheduler.add_task(
+                pump.channel,
+                pump.step,
+                lambda pump=pump: self._clock.real_interval_s(
+                    pump.status_update_interval_s
+                ),
+            )
+
+        scheduler.start()
 
     def start(self):
 
@@ -149,15 +377,24 @@ class PumpManager:
             )
 
         try:
-            self._device = EmbeddedArduino(
-                port=self._port, config_filepath=self._config_filepath
-            )
+            if self._init_device is not None:
+                self._device = self._init_device
+            else:
+                self._device = EmbeddedArduino(
+                    port=self._port, config_filepath=self._config_filepath
+                )
             self._device.connect()
         except Exception as e:
             _LOGGER.error(f"Failed to create device: {repr(e)}")
 
+        self._bulk_poll = self._supports_bulk_poll()
+        _LOGGER.info(f"Bulk status polling: {self._bulk_poll}")
+
         _LOGGER.info(f"Creating {self._num_pumps} pumps")
 
+        if self._use_scheduler:
+            self._scheduler = PumpScheduler()
+
         self._pumps = list()  # type: List[sp.SmartPump]
         for channel in range(self._num_pumps):
             self._pumps.append(
@@ -167,9 +404,25 @@ class PumpManager:
                     settings=self._init_settings[channel],
                     status_update_interval_s=self._status_update_interval_s,
                     allow_load_history=self._allow_load_history,
+                    poll_status=not self._bulk_poll,
+                    wakeup_callback=self._wake,
+                    clock=self._clock,
+                    status_refresher=self._refresh_all_status,
                 )
             )
 
+        if self._bulk_poll:
+            self._poll_all_status()
+
+        if self._scheduler is not None:
+            self._start_scheduler(self._scheduler)
+            return
+
+        if self._bulk_poll:
+            self._stop_event.clear()
+            self._bulk_poll_thread = Thread(target=self._run_bulk_poll, daemon=True)
+            self._bulk_poll_thread.start()
+
         _LOGGER.info(f"Starting {self._num_pumps} pumps")
         for pump in self._pumps:
             pump.start()
@@ -178,6 +431,17 @@ class PumpManager:
 
         _LOGGER.info(f"Interrupting {self._num_pumps} pumps")
 
+        if self._bulk_poll_thread is not None:
+            self._stop_event.set()
+            self._bulk_poll_wakeup.set()
+            self._bulk_poll_thread.join()
+            self._bulk_poll_thread = None
+
+        if self._scheduler is not None:
+            self._scheduler.interrupt()
+            self._scheduler.join()
+            self._scheduler = None
+
         for pump in self._pumps:
             pump.interrupt()
 
@@ -208,6 +472,9 @@ def init_pump_manager(
     port: Optional[str] = None,
     config_filepath: Optional[pt.Path] = None,
     allow_load_history: bool = False,
+    use_scheduler: bool = False,
+    device: Optional[EmbeddedArduino] = None,
+    clock: Clock = SYSTEM_CLOCK,
 ) -> PumpManager:
 
     global _GLOBAL_pump_manager
@@ -218,6 +485,9 @@ def init_pump_manager(
         config_filepath=config_filepath,
         status_update_interval_s=status_update_interval_s,
         allow_load_history=allow_load_history,
+        use_scheduler=use_scheduler,
+        device=device,
+        clock=clock,
     )
 
     _GLOBAL_pump_manager.start()
@@ -241,6 +511,9 @@ class PumpManagerContext:
         port: Optional[str] = None,
         config_filepath: Optional[pt.Path] = None,
         allow_load_history: bool = False,
+        use_scheduler: bool = False,
+        device: Optional[EmbeddedArduino] = None,
+        clock: Clock = SYSTEM_CLOCK,
     ) -> None:
         self._num_pumps = num_pumps
         self._status_update_interval_s = status_update_interval_s
@@ -248,6 +521,9 @@ class PumpManagerContext:
         self._port = port
         self._config_filepath = config_filepath
         self._allow_load_history = allow_load_history
+        self._use_scheduler = use_scheduler
+        self._device = device
+        self._clock = clock
 
     def __enter__(self) -> PumpManager:
 
@@ -258,6 +534,9 @@ class PumpManagerContext:
             port=self._port,
             config_filepath=self._config_filepath,
             allow_load_history=self._allow_load_history,
+            use_scheduler=self._use_scheduler,
+            device=self._device,
+            clock=self._clock,
         )
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
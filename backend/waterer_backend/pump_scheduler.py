@@ -0,0 +1,187 @@
+#!python3
+
+"""
+Single thread driving the periodic tasks (e.g. stepping each pump) of a
+pump manager
+
+Tasks are held in a heap keyed by their next due time. All of the tasks
+which are due are run back-to-back (so that their device requests are not
+interleaved with those of other threads) before sleeping until the next is
+due or a task is woken (e.g. by a change of settings). A task is rescheduled
+after it runs so that its interval may change (e.g. adaptive polling).
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import heapq
+import logging
+import traceback as tb
+import typing as ty
+from threading import Condition, Thread
+from time import monotonic
+
+###############################################################
+# Logging
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+###############################################################
+# Classes
+###############################################################
+
+
+interval_type = ty.Union[float, ty.Callable[[], float]]
+
+
+class _Task(ty.NamedTuple):
+    callback: ty.Callable[[], None]
+    interval_s: interval_type
+
+    def get_interval_s(self) -> float:
+        if callable(self.interval_s):
+            return self.interval_s()
+        return self.interval_s
+
+
+class PumpScheduler(Thread):
+    def __init__(self) -> None:
+
+        Thread.__init__(self, daemon=True)
+
+        self._condition = Condition()
+        self._abort_running = False
+
+        self._tasks: ty.Dict[ty.Hashable, _Task] = dict()
+
+        # (due time, insertion count, key) n.b. entries superseded by a
+        # wakeup are skipped using the latest due time of each task
+        self._heap: ty.List[ty.Tuple[float, int, ty.Hashable]] = []
+        self._due_times: ty.Dict[ty.Hashable, float] = dict()
+        self._num_pushed = 0
+
+    def _push(self, key: ty.Hashable, due_time: float) -> None:
+
+        self._due_times[key] = due_time
+        heapq.heappush(self._heap, (due_time, self._num_pushed, key))
+        self._num_pushed += 1
+
+    def add_task(
+        self,
+        key: ty.Hashable,
+        callback: ty.Callable[[], None],
+        interval_s: interval_type,
+        first_due_in_s: ty.Optional[float] = None,
+    ) -> None:
+        """
+        Run callback every interval_s (first after first_due_in_s which
+        defaults to interval_s)
+
+        interval_s: or a function returning the interval (evaluated after
+            each run)
+
+        n.b. tasks due at the same time are run in the order they were added
+        """
+
+        task = _Task(callback, interval_s)
+        first_interval_s = task.get_interval_s()
+
+        if first_interval_s <= 0:
+            raise ValueError(
+                f"Task interval must be positive (got: {first_interval_s} s)"
+            )
+
+        with self._condition:
+            if key in self._tasks:
+                raise ValueError(f"Task {key} already scheduled")
+
+            self._tasks[key] = task
+            self._push(
+                key,
+                monotonic()
+                + (first_interval_s if first_due_in_s is None else first_due_in_s),
+            )
+            self._condition.notify()
+
+    def wake(self, key: ty.Hashable) -> None:
+        """
+        Run the task as soon as possible (its interval then restarts)
+        """
+
+        with self._condition:
+            if key not in self._tasks:
+                return
+
+            self._push(key, monotonic())
+            self._condition.notify()
+
+    def interrupt(self) -> None:
+
+        with self._condition:
+            self._abort_running = True
+            self._condition.notify()
+
+    def _pop_due(self) -> ty.List[ty.Tuple[ty.Hashable, float]]:
+        """
+        Keys (and due times) of the due tasks (waits until there are some or
+        interrupted)
+        """
+
+        with self._condition:
+            while not self._abort_running:
+
+                now = monotonic()
+                due = []
+
+                while self._heap and self._heap[0][0] <= now:
+                    due_time, _, key = heapq.heappop(self._heap)
+
+                    if self._due_times.get(key) != due_time:
+                        continue  # superseded
+
+                    due.append((key, due_time))
+
+                if due:
+                    return due
+
+                self._condition.wait(
+                    timeout=self._heap[0][0] - now if self._heap else None
+                )
+
+        return []
+
+    def _reschedule(self, key: ty.Hashable, due_time: float) -> None:
+
+        task = self._tasks[key]
+
+        try:
+            interval_s = task.get_interval_s()
+        except Exception as e:
+            _LOGGER.error(f"Failed to get the interval of task {key}: {repr(e)}")
+            return
+
+        if interval_s <= 0:
+            _LOGGER.error(f"Dropping task {key} with interval: {interval_s} s")
+            return
+
+        with self._condition:
+            # n.b. unless woken while running
+            if self._due_times.get(key) == due_time:
+                self._push(key, max(due_time + interval_s, monotonic()))
+
+    def run(self) -> None:
+
+        while not self._abort_running:
+            for key, due_time in self._pop_due():
+                try:
+                    self._tasks[key].callback()
+                except Exception as e:
+                    _LOGGER.error(
+                        f"Scheduled task {key} failed: {repr(e)}\n{tb.format_exc()}"
+                    )
+
+                self._reschedule(key, due_time)
+
+        _LOGGER.info("Pump scheduler finished")
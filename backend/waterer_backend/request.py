@@ -5,13 +5,11 @@
 ###############################################################
 
 import json
-import pathlib as pt
 import typing as ty
 from dataclasses import asdict, dataclass
 from random import randint
 
-import jsonschema
-import pkg_resources as rc
+from waterer_backend.protocol_codec import get_request_codec
 
 ###############################################################
 # Definitions
@@ -19,6 +17,8 @@ import pkg_resources as rc
 
 MAX_LENGTH = 200  # Must stay in sync with value in HwDefs.h
 
+ALL_CHANNELS = -1  # channel of instructions addressing every channel
+
 ###############################################################
 # Classes
 ###############################################################
@@ -44,39 +44,33 @@ class Request:
 
     @staticmethod
     def create(request_str: str):
-        Request.check_valid(request_str)
+        Request._check_length(request_str)
 
-        return Request(**json.loads(request_str))
+        return Request(**get_request_codec().decode(request_str))
 
     ###############################################################
 
     @staticmethod
-    def check_valid(request_str: str) -> None:
+    def _check_length(request_str: str) -> None:
         if len(request_str) + 1 > MAX_LENGTH:
             raise RuntimeError(
                 f"Generate request is too long ({len(request_str)} characters)."
             )
 
-        request_schema_filepath = rc.resource_filename(
-            "waterer_backend", str(pt.Path("config") / "request_schema.json")
-        )
-
-        if not pt.Path(request_schema_filepath).is_file():
-            raise RuntimeError(f"Missing: {request_schema_filepath}")
-
-        with open(request_schema_filepath, "r") as fh:
-            schema = json.load(fh)
+    ###############################################################
 
-        validator = jsonschema.Draft7Validator(schema=schema)
+    @staticmethod
+    def check_valid(request_str: str) -> None:
+        Request._check_length(request_str)
 
-        validator.validate(json.loads(request_str))
+        get_request_codec().decode(request_str)
 
     ###############################################################
 
     def serialize(self) -> str:
 
-        request_str = repr(self)
+        request_str = get_request_codec().encode(asdict(self))
 
-        self.check_valid(request_str)
+        self._check_length(request_str)
 
         return request_str
@@ -5,11 +5,10 @@
 ###############################################################
 
 import json
-import pathlib as pt
-from dataclasses import asdict, dataclass
+import typing as ty
+from dataclasses import asdict, dataclass, field
 
-import jsonschema
-import pkg_resources as rc
+from waterer_backend.protocol_codec import get_response_codec
 
 ###############################################################
 # Definitions
@@ -30,49 +29,56 @@ class Response:
     success: bool
     data: float
     message: str
+    values: ty.List[float] = field(default_factory=list)  # e.g. get_all_status
+
+    ###############################################################
+
+    def _as_message(self) -> ty.Dict[str, ty.Any]:
+
+        response = asdict(self)
+
+        # n.b. omitted when empty (as by the embedded device)
+        if not self.values:
+            del response["values"]
+
+        return response
 
     ###############################################################
 
     def __repr__(self) -> str:
-        return json.dumps(asdict(self))
+        return json.dumps(self._as_message())
 
     ###############################################################
 
     @staticmethod
     def create(response_str: str):
-        Response.check_valid(response_str)
+        Response._check_length(response_str)
 
-        return Response(**json.loads(response_str))
+        return Response(**get_response_codec().decode(response_str))
 
     ###############################################################
 
     @staticmethod
-    def check_valid(response_str: str) -> None:
+    def _check_length(response_str: str) -> None:
         if len(response_str) + 1 > MAX_LENGTH:
             raise RuntimeError(
                 f"Generate response is too long ({len(response_str)} characters)."
             )
 
-        response_schema_filepath = rc.resource_filename(
-            "waterer_backend", str(pt.Path("config") / "response_schema.json")
-        )
-
-        if not pt.Path(response_schema_filepath).is_file():
-            raise RuntimeError(f"Missing: {response_schema_filepath}")
-
-        with open(response_schema_filepath, "r") as fh:
-            schema = json.load(fh)
+    ###############################################################
 
-        validator = jsonschema.Draft7Validator(schema=schema)
+    @staticmethod
+    def check_valid(response_str: str) -> None:
+        Response._check_length(response_str)
 
-        validator.validate(json.loads(response_str))
+        get_response_codec().decode(response_str)
 
     ###############################################################
 
     def serialize(self) -> str:
 
-        response_str = repr(self)
+        response_str = get_response_codec().encode(self._as_message())
 
-        self.check_valid(response_str)
+        self._check_length(response_str)
 
         return response_str
@@ -0,0 +1,219 @@
+# !python3
+
+###############################################################
+# Imports
+###############################################################
+
+import typing as ty
+
+import numpy as np
+
+###############################################################
+# Definitions
+###############################################################
+
+DEFAULT_CAPACITY = 1024
+
+###############################################################
+# Classes
+###############################################################
+
+
+class SampleBuffer:
+
+    """
+    Preallocated, array backed FIFO of fixed width rows (e.g. time, value)
+
+    Rows are appended at the back and dropped from the front. Rather than
+    wrapping around, the live window is moved to the start of a fresh
+    (possibly larger) allocation once the end of storage is reached so that
+    each column is always available as a contiguous view. Appends are
+    amortized O(1). The allocation shrinks (down to the initial capacity)
+    once less than a quarter of it is live, e.g. after a bulk load is thinned.
+
+    As stored rows are only ever modified by set_last (which first copies
+    the storage if a snapshot of it has been taken) snapshots remain valid
+    without copying.
+    """
+
+    def __init__(
+        self,
+        dtypes: ty.Sequence[ty.Any] = (np.float64, np.float64),
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+
+        if capacity < 1:
+            raise ValueError(f"Capacity must be at least 1 (got: {capacity})")
+
+        self._dtypes = tuple(np.dtype(dtype) for dtype in dtypes)
+        self._initial_capacity = capacity
+
+        self.clear()
+
+    def clear(self) -> None:
+        self._columns = [
+            np.empty(self._initial_capacity, dtype=dtype) for dtype in self._dtypes
+        ]
+        self._start = 0
+        self._end = 0
+        self._shared = False
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        return len(self._columns[0])
+
+    @property
+    def num_columns(self) -> int:
+        return len(self._dtypes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns)
+
+    def _shrunk_capacity(self, num_rows: int) -> int:
+        """
+        Halved while less than a quarter would be live
+        """
+
+        new_capacity = self.capacity
+        while (
+            new_capacity // 2 >= self._initial_capacity
+            and (len(self) + num_rows) * 4 < new_capacity
+        ):
+            new_capacity //= 2
+
+        return new_capacity
+
+    def _make_room(self, num_rows: int) -> None:
+
+        if self._end + num_rows <= self.capacity:
+            return
+
+        new_capacity = self._shrunk_capacity(num_rows)
+        while len(self) + num_rows > new_capacity // 2:
+            new_capacity *= 2
+
+        self._relocate(new_capacity)
+
+    def _shrink_if_sparse(self) -> None:
+
+        new_capacity = self._shrunk_capacity(0)
+        if new_capacity < self.capacity:
+            self._relocate(new_capacity)
+
+    def _relocate(self, new_capacity: int) -> None:
+        """
+        Move the live rows to the start of a new allocation
+        """
+
+        size = len(self)
+
+        new_columns = []
+        for column in self._columns:
+            new_column = np.empty(new_capacity, dtype=column.dtype)
+            new_column[:size] = column[self._start : self._end]
+            new_columns.append(new_column)
+
+        self._columns = new_columns
+        self._start = 0
+        self._end = size
+        self._shared = False
+
+    def append(self, *row: ty.Any) -> None:
+
+        if len(row) != self.num_columns:
+            raise ValueError(
+                f"Expected {self.num_columns} values in row (got: {len(row)})"
+            )
+
+        self._make_room(1)
+
+        for column, value in zip(self._columns, row):
+            column[self._end] = value
+
+        self._end += 1
+
+    def extend(self, *columns: ty.Any) -> None:
+        """
+        Append a block of rows supplied column-wise
+        """
+
+        if len(columns) != self.num_columns:
+            raise ValueError(
+                f"Expected {self.num_columns} columns (got: {len(columns)})"
+            )
+
+        num_rows = len(columns[0])
+        if any(len(column) != num_rows for column in columns):
+            raise ValueError("Columns must all have the same length")
+
+        self._make_room(num_rows)
+
+        for column, values in zip(self._columns, columns):
+            column[self._end : self._end + num_rows] = values
+
+        self._end += num_rows
+
+    def popleft(self) -> ty.Tuple[ty.Any, ...]:
+
+        if len(self) == 0:
+            raise IndexError("pop from an empty SampleBuffer")
+
+        row = tuple(column[self._start] for column in self._columns)
+        self._start += 1
+
+        self._shrink_if_sparse()
+
+        return row
+
+    def drop_left(self, num_rows: int) -> None:
+        self._start += min(max(num_rows, 0), len(self))
+
+        self._shrink_if_sparse()
+
+    def first(self, column: int = 0) -> ty.Any:
+
+        if len(self) == 0:
+            raise IndexError("SampleBuffer is empty")
+
+        return self._columns[column][self._start]
+
+    def last(self, column: int = 0) -> ty.Any:
+
+        if len(self) == 0:
+            raise IndexError("SampleBuffer is empty")
+
+        return self._columns[column][self._end - 1]
+
+    def set_last(self, column: int, value: ty.Any) -> None:
+
+        if len(self) == 0:
+            raise IndexError("SampleBuffer is empty")
+
+        if self._shared:
+            self._relocate(self.capacity)  # copy on write
+
+        self._columns[column][self._end - 1] = value
+
+    def column(self, column: int) -> np.ndarray:
+        """
+        Read-only, contiguous view of the live rows of a column
+        """
+
+        view = self._columns[column][self._start : self._end]
+        view.flags.writeable = False
+
+        return view
+
+    def snapshot(self) -> ty.Tuple[np.ndarray, ...]:
+        """
+        Read-only views of the live rows of every column which are not
+        affected by later changes to the buffer
+        """
+
+        self._shared = True
+
+        return tuple(self.column(column) for column in range(self.num_columns))
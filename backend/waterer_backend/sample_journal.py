@@ -0,0 +1,210 @@
+#!python3
+
+"""
+Append-only journal of pump samples
+
+Samples are buffered in memory and appended to the journal file in
+batches as fixed size binary records. On start the journal is replayed on
+top of the last history snapshot; saving a new snapshot compacts
+(truncates) the journal.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import logging
+import os
+import pathlib as pt
+import struct
+import typing as ty
+from threading import Lock
+
+import numpy as np
+from waterer_backend.status_log import AbstractStatusLog
+
+###############################################################
+# Definitions
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+JOURNAL_MAGIC = b"WTRJ"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = JOURNAL_MAGIC + struct.pack("<I", JOURNAL_VERSION)
+
+# n.b. field names (other than time) match the status log names used in
+# history files
+RECORD_DTYPE = np.dtype(
+    [
+        ("time", "<f8"),
+        ("rel_humidity_V_log", "<f8"),
+        ("smoothed_rel_humidity_V_log", "<f8"),
+        ("pump_status_log", "u1"),
+    ]
+)
+
+###############################################################
+# Classes
+###############################################################
+
+
+class SampleJournal:
+    def __init__(self, filepath: pt.Path, batch_size: int = 12) -> None:
+
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be at least 1 (got: {batch_size})")
+
+        self._filepath = filepath
+        self._batch_size = batch_size
+
+        self._lock = Lock()
+        self._pending: ty.List[ty.Tuple[float, float, float, bool]] = []
+
+    @property
+    def filepath(self) -> pt.Path:
+        return self._filepath
+
+    @property
+    def num_pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def append(
+        self,
+        new_time: float,
+        rel_humidity_V: ty.Optional[float],
+        smoothed_rel_humidity_V: ty.Optional[float],
+        pump_status: bool,
+    ) -> None:
+
+        with self._lock:
+            self._pending.append(
+                (
+                    new_time,
+                    np.nan if rel_humidity_V is None else rel_humidity_V,
+                    np.nan
+                    if smoothed_rel_humidity_V is None
+                    else smoothed_rel_humidity_V,
+                    pump_status,
+                )
+            )
+
+            if len(self._pending) >= self._batch_size:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+
+        if len(self._pending) == 0:
+            return
+
+        records = np.array(self._pending, dtype=RECORD_DTYPE)
+        self._pending = []
+
+        os.makedirs(self._filepath.parent, exist_ok=True)
+        self._truncate_incomplete_record()
+
+        with open(self._filepath, "ab") as fh:
+            if fh.tell() == 0:
+                fh.write(JOURNAL_HEADER)
+
+            fh.write(records.tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def _truncate_incomplete_record(self) -> None:
+        """
+        Truncate a trailing record (or header) which was only partially written
+        (e.g. by a power cut) so that appended records remain aligned
+        """
+
+        if not self._filepath.is_file():
+            return
+
+        length = self._filepath.stat().st_size
+
+        complete_length = 0
+        if length >= len(JOURNAL_HEADER):
+            record_size = RECORD_DTYPE.itemsize
+            complete_length = (
+                len(JOURNAL_HEADER)
+                + (length - len(JOURNAL_HEADER)) // record_size * record_size
+            )
+
+        if complete_length == length:
+            return
+
+        _LOGGER.warning(
+            f"Truncating incomplete trailing record of journal: {self._filepath}"
+        )
+
+        with open(self._filepath, "r+b") as fh:
+            fh.truncate(complete_length)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def read(self) -> np.ndarray:
+        """
+        Returns:
+            all (flushed) records as a structured array of RECORD_DTYPE
+
+        n.b. an incomplete trailing record is truncated
+        """
+
+        if not self._filepath.is_file():
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        with self._lock:
+            self._truncate_incomplete_record()
+
+            with open(self._filepath, "rb") as fh:
+                data = fh.read()
+
+        if data[: len(JOURNAL_HEADER)] != JOURNAL_HEADER:
+            _LOGGER.error(f"Ignoring journal with unexpected header: {self._filepath}")
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        return np.frombuffer(
+            data, dtype=RECORD_DTYPE, offset=len(JOURNAL_HEADER)
+        ).copy()  # n.b. writeable
+
+    def replay_into(self, logs: ty.Dict[str, AbstractStatusLog]) -> int:
+        """
+        Add the journaled samples newer than the newest sample of each log
+
+        Returns:
+            number of records replayed
+        """
+
+        records = self.read()
+
+        for name, log in logs.items():
+            newest_time, _ = log.get_newest_value()
+
+            is_new = (
+                np.ones(len(records), dtype=np.bool_)
+                if newest_time is None
+                else records["time"] > newest_time
+            )
+
+            log.add_samples(records["time"][is_new], records[name][is_new])
+
+        return len(records)
+
+    def compact(self, save_snapshot: ty.Callable[[], None]) -> None:
+        """
+        Save a snapshot (that must capture every sample appended so far) and
+        then discard the journaled records
+        """
+
+        with self._lock:
+            save_snapshot()
+
+            self._pending = []
+
+            if self._filepath.is_file():
+                os.remove(self._filepath)
@@ -0,0 +1,213 @@
+#!python3
+
+"""
+Push of the status samples of the pumps (as they are logged) to subscribers,
+e.g. the server-sent event stream of the BLEserver
+
+Each event is encoded once when it is published. Each subscriber has a
+bounded queue: a subscriber falling behind by more than the size of its
+queue loses its oldest events (which are counted so that the client can
+resync with get_status_since) rather than holding up the pumps or the other
+subscribers.
+
+n.b. publish and subscribe from the event loop
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import asyncio
+import json
+import logging
+import typing as ty
+
+from waterer_backend.models import SmartPumpStatus
+
+###############################################################
+# Definitions
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+SAMPLE_EVENT = "sample"  # each logged status
+PUMP_STATE_EVENT = "pump_state"  # the pump was switched on/off
+DROPPED_EVENT = "dropped"  # events were dropped for a slow subscriber
+
+DEFAULT_MAX_QUEUE_SIZE = 100  # events
+
+# called with: channel, status, pump switched (since the previous sample)
+sample_callback_type = ty.Callable[[int, SmartPumpStatus, bool], None]
+
+###############################################################
+# Functions
+###############################################################
+
+
+def encode_event(event: str, data: ty.Dict[str, ty.Any]) -> bytes:
+    """
+    As a server-sent event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+###############################################################
+# Classes
+###############################################################
+
+
+class SampleSubscription:
+    def __init__(
+        self,
+        broadcaster: "SampleBroadcaster",
+        channel: ty.Optional[int] = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ) -> None:
+        """
+        channel: of the events (None for all channels)
+        """
+
+        if max_queue_size < 1:
+            raise ValueError(f"Queue size must be at least 1 (got: {max_queue_size})")
+
+        self._broadcaster = broadcaster
+        self._channel = channel
+        self._queue: "asyncio.Queue[ty.Optional[bytes]]" = asyncio.Queue(
+            maxsize=max_queue_size
+        )
+        self._num_dropped = 0
+        self._closed = False
+
+    @property
+    def channel(self) -> ty.Optional[int]:
+        return self._channel
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, event: bytes) -> None:
+        """
+        Queue an event (dropping the oldest if the queue is full)
+        """
+
+        if self._closed:
+            return
+
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._num_dropped += 1
+
+        self._queue.put_nowait(event)
+
+    async def get(self) -> ty.Optional[bytes]:
+        """
+        Returns:
+            the next event (None once closed)
+        """
+
+        if self._closed:
+            return None
+
+        return await self._queue.get()
+
+    def pop_num_dropped(self) -> int:
+        """
+        Number of events dropped since the last call
+        """
+
+        num_dropped, self._num_dropped = self._num_dropped, 0
+        return num_dropped
+
+    def close(self) -> None:
+
+        if self._closed:
+            return
+
+        self._closed = True
+        self._broadcaster.unsubscribe(self)
+
+        # n.b. wake a waiting get
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    def __enter__(self) -> "SampleSubscription":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class SampleBroadcaster:
+    def __init__(self) -> None:
+        self._subscriptions: ty.List[SampleSubscription] = []
+
+    @property
+    def num_subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(
+        self,
+        channel: ty.Optional[int] = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ) -> SampleSubscription:
+
+        subscription = SampleSubscription(self, channel, max_queue_size)
+        self._subscriptions.append(subscription)
+
+        _LOGGER.info(f"New sample subscriber ({self.num_subscribers} subscribed)")
+
+        return subscription
+
+    def unsubscribe(self, subscription: SampleSubscription) -> None:
+
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+        _LOGGER.info(f"Sample subscriber left ({self.num_subscribers} subscribed)")
+
+    def publish(
+        self, channel: int, status: SmartPumpStatus, pump_switched: bool
+    ) -> None:
+        """
+        Push a newly logged status of a pump to the subscribers (of the channel)
+        """
+
+        subscriptions = [
+            subscription
+            for subscription in self._subscriptions
+            if subscription.channel is None or subscription.channel == channel
+        ]
+
+        # n.b. idle without subscribers
+        if not subscriptions:
+            return
+
+        events = []
+
+        if pump_switched:
+            events.append(
+                encode_event(
+                    PUMP_STATE_EVENT,
+                    {
+                        "channel": channel,
+                        "pump_running": status.pump_running,
+                        "epoch_time": status.epoch_time,
+                    },
+                )
+            )
+
+        events.append(encode_event(SAMPLE_EVENT, {"channel": channel, **status.dict()}))
+
+        for subscription in subscriptions:
+            for event in events:
+                subscription.put(event)
+
+    def close(self) -> None:
+        """
+        End all subscriptions (e.g. on shutdown)
+        """
+
+        for subscription in list(self._subscriptions):
+            subscription.close()
@@ -0,0 +1,291 @@
+#!python3
+
+"""
+Transport to the embedded device allowing several requests to be in flight
+at once
+
+A reader thread matches each response (json line or binary frame) to the
+outstanding request with the same id so that callers only wait for their
+own response (and a slow response only delays its own caller).
+
+n.b. the device handles requests in the order they are received but its
+receive buffer is small (64 bytes on an Uno): a json request (~70 bytes) can
+overflow it while the previous response is printed so requests are only
+pipelined once binary framing is negotiated (see set_window).
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import json
+import logging
+import typing as ty
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Condition, Lock, Thread
+
+import waterer_backend.binary_frame as bf
+
+###############################################################
+# Definitions
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+JSON_WINDOW = 1  # n.b. a request at a time
+DEFAULT_WINDOW = 2  # with binary framing
+DEFAULT_TIMEOUT_S = 5.0
+
+###############################################################
+# Classes
+###############################################################
+
+
+class SerialTransport:
+    def __init__(
+        self,
+        device: ty.Any,
+        window: int = JSON_WINDOW,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+    ) -> None:
+        """
+        device: open serial port (e.g. serial.Serial) whose read returns
+            what is available (at least a byte unless it times out)
+        window: maximum number of requests in flight
+        timeout_s: default time to wait for a response
+        """
+
+        self._check_window(window)
+
+        self._device = device
+        self._window = window
+        self._timeout_s = timeout_s
+
+        self._slots = Condition()
+        self._num_in_flight = 0
+        self._exclusive = False  # n.b. an exchange waits for/holds all slots
+
+        self._write_lock = Lock()
+        self._exclusive_lock = Lock()
+
+        self._pending_lock = Lock()
+        self._pending: ty.Dict[int, Future] = dict()
+        self._raw_pending: ty.Optional[Future] = None
+
+        self._buffer = bytearray()
+
+        self._abort_running = False
+        self._reader = Thread(target=self._read_loop, daemon=True)
+
+    @staticmethod
+    def _check_window(window: int) -> None:
+        if window < 1:
+            raise ValueError(f"Window must be at least one (got: {window})")
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    def set_window(self, window: int) -> None:
+        """
+        e.g. once binary framing is negotiated (n.b. requests in flight are
+        unaffected)
+        """
+
+        self._check_window(window)
+
+        with self._slots:
+            self._window = window
+            self._slots.notify_all()
+
+    def _acquire_slot(self, timeout_s: float) -> bool:
+        with self._slots:
+            if not self._slots.wait_for(
+                lambda: not self._exclusive and self._num_in_flight < self._window,
+                timeout=timeout_s,
+            ):
+                return False
+
+            self._num_in_flight += 1
+            return True
+
+    def _release_slot(self) -> None:
+        with self._slots:
+            self._num_in_flight -= 1
+            self._slots.notify_all()
+
+    def start(self) -> None:
+        self._reader.start()
+
+    def stop(self) -> None:
+        """
+        n.b. the reader finishes after its current read (which may wait for
+        the device timeout)
+        """
+
+        self._abort_running = True
+        self._fail_pending(RuntimeError("Transport stopped"))
+
+    def join(self, timeout_s: ty.Optional[float] = None) -> None:
+        self._reader.join(timeout=timeout_s)
+
+    def _fail_pending(self, error: Exception) -> None:
+
+        with self._pending_lock:
+            futures = list(self._pending.values())
+            if self._raw_pending is not None:
+                futures.append(self._raw_pending)
+
+            self._pending.clear()
+            self._raw_pending = None
+
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def _dispatch(self, message: bf.message_type) -> None:
+
+        with self._pending_lock:
+
+            if self._raw_pending is not None:
+                future = self._raw_pending
+                self._raw_pending = None
+            else:
+                try:
+                    if isinstance(message, bytes):
+                        response_id = bf.response_id(message)
+                    else:
+                        response_id = json.loads(message)["id"]
+                except Exception:
+                    _LOGGER.warning(f"Discarding unparseable response: {message!r}")
+                    return
+
+                future = self._pending.pop(response_id, None)
+
+                if future is None:
+                    # e.g. the response to a request which timed out
+                    _LOGGER.warning(f"Discarding unexpected response: {message!r}")
+                    return
+
+        future.set_result(message)
+
+    def _read_loop(self) -> None:
+
+        while not self._abort_running:
+
+            try:
+                # n.b. frames do not end with a newline (so are not read by
+                # readline) and may be completed by the following read(s)
+                self._buffer += self._device.read(self._device.in_waiting or 1)
+            except Exception as e:
+                if not self._abort_running:
+                    _LOGGER.error(f"Failed to read from device: {repr(e)}")
+                    self._fail_pending(e)
+                break
+
+            message = bf.pop_message(self._buffer)
+            while message is not None:
+                self._dispatch(message)
+                message = bf.pop_message(self._buffer)
+
+        _LOGGER.info("Serial transport reader finished")
+
+    def _write(self, message: bf.message_type) -> None:
+
+        with self._write_lock:
+            if isinstance(message, bytes):
+                self._device.write(message)
+            else:
+                self._device.write(f"{message}\r\n".encode())
+
+    def _wait(
+        self, future: Future, timeout_s: float, description: str
+    ) -> bf.message_type:
+
+        try:
+            return future.result(timeout=timeout_s)
+        except FutureTimeoutError:
+            raise TimeoutError(
+                f"No response to {description} within {timeout_s} s"
+            ) from None
+
+    def request(
+        self,
+        request: bf.message_type,
+        request_id: int,
+        timeout_s: ty.Optional[float] = None,
+    ) -> bf.message_type:
+        """
+        Send a request (json line or frame) and wait for the response with the
+        same id (in the same format)
+
+        Raises:
+            TimeoutError if no slot in the window, or response, is available
+            in time
+        """
+
+        timeout_s = self._timeout_s if timeout_s is None else timeout_s
+
+        if self._abort_running:
+            raise RuntimeError("Transport stopped")
+
+        if not self._acquire_slot(timeout_s):
+            raise TimeoutError(f"No free request slot within {timeout_s} s")
+
+        try:
+            future: Future = Future()
+
+            with self._pending_lock:
+                if request_id in self._pending:
+                    raise ValueError(f"Request with id {request_id} already in flight")
+                self._pending[request_id] = future
+
+            try:
+                self._write(request)
+                return self._wait(future, timeout_s, f"request {request_id}")
+            finally:
+                with self._pending_lock:
+                    self._pending.pop(request_id, None)
+
+        finally:
+            self._release_slot()
+
+    def exchange(
+        self, line: str, timeout_s: ty.Optional[float] = None
+    ) -> bf.message_type:
+        """
+        Send a line (e.g. a malformed request) and return the next response
+        whatever its id (n.b. waits for all requests in flight to complete)
+        """
+
+        timeout_s = self._timeout_s if timeout_s is None else timeout_s
+
+        with self._exclusive_lock:
+
+            try:
+                with self._slots:
+                    self._exclusive = True
+                    if not self._slots.wait_for(
+                        lambda: self._num_in_flight == 0, timeout=timeout_s
+                    ):
+                        raise TimeoutError(
+                            f"Requests still in flight after {timeout_s} s"
+                        )
+
+                future: Future = Future()
+                with self._pending_lock:
+                    self._raw_pending = future
+
+                try:
+                    self._write(line)
+                    return self._wait(future, timeout_s, "exchange")
+                finally:
+                    with self._pending_lock:
+                        if self._raw_pending is future:
+                            self._raw_pending = None
+
+            finally:
+                with self._slots:
+                    self._exclusive = False
+                    self._slots.notify_all()
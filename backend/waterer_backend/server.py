@@ -5,16 +5,90 @@
 ###############################################################
 
 from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional
 
-from flask import Flask, request
+from flask import Flask, Response, abort, request
 from flask_cors import CORS
 from waterer_backend import __version__
+from waterer_backend.columnar_encoding import (
+    COLUMNAR_CONTENT_TYPE,
+    encode_histories,
+    encode_statuses,
+    negotiate_content_type,
+)
 from waterer_backend.config import get_pumps_config
+from waterer_backend.downsample import check_max_points
+from waterer_backend.history_cursor import etag_matches, history_etag
 from waterer_backend.pump_manager import PumpManagerContext, get_pump_manager
 from waterer_backend.request import Request
 from waterer_backend.service_logs import get_service_logs
 from waterer_backend.smart_pump import SmartPumpSettings
 
+###############################################################
+# Functions
+###############################################################
+
+
+def _history_etag(
+    channels: List[int], cursors: List[str], query: Dict[str, Any]
+) -> str:
+    settings = [get_pump_manager().get_settings(channel) for channel in channels]
+    return history_etag(
+        cursors,
+        settings,
+        query,
+        negotiate_content_type(request.headers.get("Accept")),
+    )
+
+
+def _unmodified_history_etag(
+    channels: List[int], query: Dict[str, Any]
+) -> Optional[str]:
+    """
+    ETag of the history if the client already has it (n.b. checked before
+    the response is built)
+    """
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is None:
+        return None
+
+    cursors = [get_pump_manager().get_cursor(channel) for channel in channels]
+    etag = _history_etag(channels, cursors, query)
+
+    return etag if etag_matches(if_none_match, etag) else None
+
+
+def _max_points(query: Dict[str, Any]) -> Optional[int]:
+    """
+    n.b. aborts with a bad request if invalid
+    """
+
+    try:
+        return check_max_points(query.get("max_points"))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+def _negotiated_response(
+    get_json_data: Callable[[], Any],
+    get_columnar_data: Callable[[], bytes],
+    headers: Optional[Dict[str, str]] = None,
+):
+    """
+    Json (as {"data": ...}) or columnar (see columnar_encoding) as accepted
+    """
+
+    headers = {**(headers or {}), "Vary": "Accept"}
+
+    if negotiate_content_type(request.headers.get("Accept")) == COLUMNAR_CONTENT_TYPE:
+        return Response(
+            get_columnar_data(), content_type=COLUMNAR_CONTENT_TYPE, headers=headers
+        )
+
+    return {"data": get_json_data()}, headers
+
+
 ###############################################################
 # Routings
 ###############################################################
@@ -55,8 +129,20 @@ def create_app() -> Flask:
 
     @app.route("/status/<channel>")
     def get_pump_status(channel: str):
-        status = get_pump_manager().get_status(channel=int(channel))
-        return {"data": asdict(status)}
+        max_age_s = request.args.get("max_age_s", type=float)
+        status = get_pump_manager().get_status(
+            channel=int(channel), max_age_s=max_age_s
+        )
+        return {"data": status.dict()}
+
+    @app.route("/status")
+    def get_all_pump_status():
+        max_age_s = request.args.get("max_age_s", type=float)
+        statuses = get_pump_manager().get_all_status(max_age_s=max_age_s)
+        return _negotiated_response(
+            lambda: [status.dict() for status in statuses],
+            lambda: encode_statuses(statuses),
+        )
 
     @app.route("/clear_status/<channel>")
     def clear_status(channel: str):
@@ -68,12 +154,86 @@ def create_app() -> Flask:
         if not request.is_json:
             raise RuntimeError("Settings should be provided as json")
 
-        earliest_time = request.json["earliest_time"]  # type: ignore
+        query: Dict[str, Any] = request.json  # type: ignore
+        channels = [int(channel)]
+        max_points = _max_points(query)
+
+        unmodified_etag = _unmodified_history_etag(channels, query)
+        if unmodified_etag is not None:
+            return "", 304, {"ETag": unmodified_etag, "Vary": "Accept"}
+
+        earliest_time = query.get("earliest_time")
+        latest_time = query.get("latest_time")
+        resolution_s = query.get("resolution_s")
+        since_cursor = query.get("since_cursor")
 
         status_history = get_pump_manager().get_status_since(
-            channel=int(channel), earliest_epoch_time_s=earliest_time
+            channel=int(channel),
+            earliest_epoch_time_s=earliest_time,
+            latest_epoch_time_s=latest_time,
+            resolution_s=resolution_s,
+            since_cursor=since_cursor,
+            max_points=max_points,
+        )
+
+        etag = _history_etag(channels, [status_history.cursor], query)
+        return _negotiated_response(
+            status_history.dict,
+            lambda: encode_histories([status_history]),
+            headers={"ETag": etag},
+        )
+
+    @app.route("/get_status_since", methods=["POST", "GET"])
+    def get_all_status_since():
+        if not request.is_json:
+            raise RuntimeError("Settings should be provided as json")
+
+        query: Dict[str, Any] = request.json  # type: ignore
+        channels = list(range(get_pump_manager().num_pumps))
+        max_points = _max_points(query)
+
+        unmodified_etag = _unmodified_history_etag(channels, query)
+        if unmodified_etag is not None:
+            return "", 304, {"ETag": unmodified_etag, "Vary": "Accept"}
+
+        earliest_time = query.get("earliest_time")
+        latest_time = query.get("latest_time")
+        resolution_s = query.get("resolution_s")
+        since_cursors = query.get("since_cursors")  # n.b. a cursor per channel
+
+        status_histories = get_pump_manager().get_all_status_since(
+            earliest_epoch_time_s=earliest_time,
+            latest_epoch_time_s=latest_time,
+            resolution_s=resolution_s,
+            since_cursors=since_cursors,
+            max_points=max_points,
+        )
+
+        etag = _history_etag(
+            channels, [history.cursor for history in status_histories], query
+        )
+        return _negotiated_response(
+            lambda: [history.dict() for history in status_histories],
+            lambda: encode_histories(status_histories),
+            headers={"ETag": etag},
+        )
+
+    @app.route("/aggregates/<channel>", methods=["POST", "GET"])
+    def get_aggregates(channel: str):
+        if not request.is_json:
+            raise RuntimeError("Settings should be provided as json")
+
+        resolution_s = request.json["resolution_s"]  # type: ignore
+        earliest_time = request.json.get("earliest_time")  # type: ignore
+        latest_time = request.json.get("latest_time")  # type: ignore
+
+        aggregates = get_pump_manager().get_aggregates(
+            channel=int(channel),
+            resolution_s=resolution_s,
+            earliest_epoch_time_s=earliest_time,
+            latest_epoch_time_s=latest_time,
         )
-        return {"data": asdict(status_history)}
+        return {"data": aggregates.dict()}
 
     @app.route("/save_settings")
     def save_settings():
@@ -0,0 +1,400 @@
+#!python3
+
+"""
+Simulated pumps and soil moisture sensors (for testing the pump managers,
+their feedback and performance without hardware)
+
+The moisture m (0: dry, 1: saturated) of the soil of each channel dries
+exponentially (faster during the day) and is wetted by its pump:
+
+    dm/dt = f (1 - m) - k(t) m
+
+where f is the wetting rate while the pump runs and k(t) the drying rate.
+The sensor voltage falls linearly from dry_V to wet_V with the moisture (as
+for the capacitive sensors) plus gaussian noise.
+
+The model is advanced (exactly for piecewise constant rates) to the time of
+a clock whenever it is read so that a virtual clock running faster than
+real time simulates e.g. days of operation in seconds.
+
+The simulator is served as an arduino (SimulatedArduino) to a PumpManager or
+as BLE clients (SimulatedBLEClient) to a BLEPumpManager.
+"""
+
+###############################################################
+# Imports
+###############################################################
+
+import logging
+import math
+import struct
+import typing as ty
+from dataclasses import dataclass
+from datetime import datetime
+from random import Random
+from threading import Lock
+
+from waterer_backend.BLE.BLE_ids import (
+    HUMIDITY_ATTR_ID,
+    PUMP_ATTR_ID,
+    PUMP_NAME,
+    PUMP_STATUS_ATTR_ID,
+)
+from waterer_backend.clock import VirtualClock
+from waterer_backend.embedded_arduino import EmbeddedArduino
+from waterer_backend.request import Request
+from waterer_backend.response import Response
+
+###############################################################
+# Definitions
+###############################################################
+
+_LOGGER = logging.getLogger(__name__)
+
+SIMULATED_VERSION = 1.2  # embedded version of the instructions handled
+
+_SECONDS_PER_DAY = 24 * 3600
+_MAX_STEP_S = 600  # of the integration (over which the drying rate is constant)
+
+###############################################################
+# Classes
+###############################################################
+
+
+@dataclass
+class SoilParameters:
+    dry_V: float = 3.0  # sensor voltage of dry soil
+    wet_V: float = 1.2  # sensor voltage of saturated soil
+    drying_time_constant_days: float = 3.0
+    diurnal_drying_amplitude: float = 0.5  # relative (peaking at 15:00)
+    wetting_rate_per_s: float = 0.05  # f while the pump runs
+    sensor_noise_V: float = 0.01  # standard deviation
+    initial_moisture: float = 0.6
+
+    def drying_rate_per_s(self, the_time: datetime) -> float:
+
+        hour = the_time.hour + the_time.minute / 60
+        diurnal = 1 + self.diurnal_drying_amplitude * math.sin(
+            2 * math.pi * (hour - 9) / 24
+        )
+
+        return diurnal / (self.drying_time_constant_days * _SECONDS_PER_DAY)
+
+
+class _Channel:
+    def __init__(self, parameters: SoilParameters, time_s: float) -> None:
+        self.parameters = parameters
+        self.moisture = parameters.initial_moisture
+        self.time_s = time_s
+        self.pump_off_time_s: ty.Optional[float] = None  # None while off
+
+    def pump_running(self) -> bool:
+        return self.pump_off_time_s is not None and self.time_s < self.pump_off_time_s
+
+    def advance_to(self, time_s: float) -> None:
+
+        while self.time_s < time_s:
+
+            end_s = min(time_s, self.time_s + _MAX_STEP_S)
+
+            running = self.pump_running()
+            if running:
+                assert self.pump_off_time_s is not None
+                end_s = min(end_s, self.pump_off_time_s)
+
+            dt_s = end_s - self.time_s
+
+            k = self.parameters.drying_rate_per_s(
+                datetime.fromtimestamp(self.time_s + dt_s / 2)
+            )
+            f = self.parameters.wetting_rate_per_s if running else 0
+
+            # n.b. relaxes exponentially towards the steady state
+            steady_moisture = f / (f + k)
+            self.moisture = steady_moisture + (
+                self.moisture - steady_moisture
+            ) * math.exp(-(f + k) * dt_s)
+
+            self.time_s = end_s
+
+        if not self.pump_running():
+            self.pump_off_time_s = None
+
+
+class PlantSimulator:
+    def __init__(
+        self,
+        num_channels: int,
+        clock: ty.Optional[VirtualClock] = None,
+        parameters: ty.Union[
+            SoilParameters, ty.List[SoilParameters]
+        ] = SoilParameters(),
+        seed: ty.Optional[int] = None,
+    ) -> None:
+        """
+        clock: defaults to a (virtual) clock running in real time
+        parameters: of all channels or of each channel
+        seed: of the sensor noise
+        """
+
+        if isinstance(parameters, SoilParameters):
+            parameters = [parameters for _ in range(num_channels)]
+        elif len(parameters) != num_channels:
+            raise ValueError(
+                f"Length of parameters list ({len(parameters)}) does not match num_channels ({num_channels})"
+            )
+
+        self._clock = VirtualClock() if clock is None else clock
+        self._random = Random(seed)
+        self._lock = Lock()
+
+        start_time_s = self._clock.time()
+        self._channels = [_Channel(p, start_time_s) for p in parameters]
+
+    @property
+    def clock(self) -> VirtualClock:
+        return self._clock
+
+    @property
+    def num_channels(self) -> int:
+        return len(self._channels)
+
+    def _get_channel(self, channel: int) -> _Channel:
+        """
+        n.b. call holding the lock
+        """
+
+        if channel < 0 or channel >= self.num_channels:
+            raise ValueError(f"Invalid channel: {channel}")
+
+        the_channel = self._channels[channel]
+        the_channel.advance_to(max(self._clock.time(), the_channel.time_s))
+
+        return the_channel
+
+    ###############################################################
+    # Device
+    ###############################################################
+
+    def moisture(self, channel: int) -> float:
+        """
+        true moisture (0: dry, 1: saturated)
+        """
+
+        with self._lock:
+            return self._get_channel(channel).moisture
+
+    def get_voltage(self, channel: int) -> float:
+
+        with self._lock:
+            the_channel = self._get_channel(channel)
+            parameters = the_channel.parameters
+
+            return (
+                parameters.dry_V
+                - the_channel.moisture * (parameters.dry_V - parameters.wet_V)
+                + self._random.gauss(0, parameters.sensor_noise_V)
+            )
+
+    def get_state(self, channel: int) -> bool:
+
+        with self._lock:
+            return self._get_channel(channel).pump_running()
+
+    def turn_on(self, channel: int, duration_s: float = 0) -> None:
+        """
+        duration_s: <= 0 for indefinitely
+        """
+
+        with self._lock:
+            the_channel = self._get_channel(channel)
+            the_channel.pump_off_time_s = (
+                the_channel.time_s + duration_s if duration_s > 0 else math.inf
+            )
+
+    def turn_off(self, channel: int) -> None:
+
+        with self._lock:
+            self._get_channel(channel).pump_off_time_s = None
+
+    ###############################################################
+
+    def handle_request(self, request: Request) -> Response:
+        """
+        Respond to a request as the arduino firmware
+        """
+
+        assert request.id is not None
+
+        response = Response(
+            request.id, request.channel, request.instruction, False, -1, ""
+        )
+
+        if request.instruction == "get_all_status":
+            for channel in range(self.num_channels):
+                response.values += [
+                    self.get_voltage(channel),
+                    float(self.get_state(channel)),
+                ]
+            response.success = True
+            response.data = self.num_channels
+            return response
+
+        if request.instruction == "get_version":
+            response.success = True
+            response.data = SIMULATED_VERSION
+            return response
+
+        if request.channel < 0 or request.channel >= self.num_channels:
+            response.message = "Invalid channel"
+            return response
+
+        if request.instruction == "turn_on":
+            self.turn_on(request.channel, request.data)
+            if request.data > 0:
+                response.message = "TurnOnFor"
+                response.data = request.data
+        elif request.instruction == "turn_off":
+            self.turn_off(request.channel)
+        elif request.instruction == "get_state":
+            response.data = float(self.get_state(request.channel))
+        elif request.instruction == "get_voltage":
+            response.data = self.get_voltage(request.channel)
+        else:
+            response.instruction = ""
+            response.message = f"Error: Unrecognized instruction: {request.instruction}"
+            return response
+
+        response.success = True
+
+        return response
+
+    ###############################################################
+    # Adapters
+    ###############################################################
+
+    def create_arduino(self) -> "SimulatedArduino":
+        return SimulatedArduino(self)
+
+    def create_ble_clients(self) -> ty.List["SimulatedBLEClient"]:
+        return [
+            SimulatedBLEClient(self, channel) for channel in range(self.num_channels)
+        ]
+
+    def create_ble_devices(self) -> ty.List["SimulatedBLEDevice"]:
+        return [
+            SimulatedBLEDevice(name=PUMP_NAME, address=_ble_address(channel), rssi=-50)
+            for channel in range(self.num_channels)
+        ]
+
+
+###############################################################
+
+
+class SimulatedArduino(EmbeddedArduino):
+
+    """
+    The simulator in place of the arduino of a PumpManager
+    """
+
+    def __init__(self, simulator: PlantSimulator) -> None:
+        super().__init__()
+
+        self._simulator = simulator
+        self._connected = False
+
+    @property
+    def connection_info(self) -> str:
+        return f"Simulated device with {self._simulator.num_channels} channel(s), Embedded S/W Version: {SIMULATED_VERSION:.1f}"
+
+    def connect(self):
+        self._connected = True
+        _LOGGER.info(f"Connected: {self.connection_info}")
+
+    def disconnect(self):
+        self._connected = False
+
+    def _check_connected(self) -> None:
+        if not self._connected:
+            raise RuntimeError("Device not open")
+
+    def send_str(self, request_str) -> str:
+        self._check_connected()
+        return self._simulator.handle_request(Request.create(request_str)).serialize()
+
+    def make_request(self, request: Request) -> Response:
+        self._check_connected()
+        return self._simulator.handle_request(request)
+
+
+###############################################################
+
+
+def _ble_address(channel: int) -> str:
+    return f"00:00:00:00:00:{channel:02X}"
+
+
+class SimulatedBLEDevice(ty.NamedTuple):
+    name: str
+    address: str
+    rssi: int
+
+
+class SimulatedBLEClient:
+
+    """
+    A channel of the simulator in place of the BleakClient of a BLESmartPump
+    """
+
+    def __init__(self, simulator: PlantSimulator, channel: int) -> None:
+        self._simulator = simulator
+        self._channel = channel
+        self._connected = True
+        self._pump_attr = bytearray(struct.pack("<i", 0))
+
+    @property
+    def address(self) -> str:
+        return _ble_address(self._channel)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self, **kwargs) -> bool:
+        self._connected = True
+        return True
+
+    async def disconnect(self) -> bool:
+        self._connected = False
+        return True
+
+    async def read_gatt_char(self, char_specifier: str) -> bytearray:
+
+        if char_specifier == HUMIDITY_ATTR_ID:
+            return bytearray(
+                struct.pack("f", self._simulator.get_voltage(self._channel))
+            )
+
+        if char_specifier == PUMP_STATUS_ATTR_ID:
+            return bytearray(struct.pack("b", self._simulator.get_state(self._channel)))
+
+        if char_specifier == PUMP_ATTR_ID:
+            return self._pump_attr
+
+        raise ValueError(f"Unknown characteristic: {char_specifier}")
+
+    async def write_gatt_char(self, char_specifier: str, data: bytes) -> None:
+
+        if char_specifier != PUMP_ATTR_ID:
+            raise ValueError(f"Cannot write characteristic: {char_specifier}")
+
+        self._pump_attr = bytearray(data)
+        (duration_ms,) = struct.unpack("<i", data)
+
+        # n.b. as BLEembedded.ino (other values are ignored)
+        if duration_ms == -1:
+            self._simulator.turn_on(self._channel)
+        elif duration_ms == 0:
+            self._simulator.turn_off(self._channel)
+        elif duration_ms > 0:
+            self._simulator.turn_on(self._channel, duration_ms / 1000)
@@ -6,17 +6,38 @@
 
 import json
 import logging
-import os
+import pathlib as pt
 import traceback as tb
 import typing as ty
+from abc import ABC, abstractmethod
 from datetime import datetime
 from threading import Event, Lock, Thread
 from time import time
 
 import numpy as np
-from waterer_backend.config import get_history_filepath
+from waterer_backend.adaptive_polling import (
+    clamp_status_update_interval_s,
+    next_status_update_interval_s,
+)
+from waterer_backend.clock import SYSTEM_CLOCK, Clock
+from waterer_backend.config import (
+    get_history_archive_filepath,
+    get_history_filepath,
+    get_history_journal_filepath,
+)
+from waterer_backend.downsample import downsample_min_max
 from waterer_backend.embedded_arduino import EmbeddedArduino
+from waterer_backend.history_cursor import SampleSequence
+from waterer_backend.history_file import (
+    HistoryAggregates,
+    HistoryArrays,
+    history_arrays_from_status_data,
+    load_history_aggregates,
+    load_history_file,
+    save_history_file,
+)
 from waterer_backend.models import (
+    SmartPumpAggregates,
     SmartPumpSettings,
     SmartPumpStatus,
     SmartPumpStatusData,
@@ -24,7 +45,15 @@ from waterer_backend.models import (
 )
 from waterer_backend.request import Request
 from waterer_backend.response import Response
-from waterer_backend.status_log import BinaryStatusLog, FloatStatusLog
+from waterer_backend.sample_journal import SampleJournal
+from waterer_backend.sample_stream import sample_callback_type
+from waterer_backend.status_log import (
+    AbstractStatusLog,
+    AbstractStatusLogSnapshot,
+    BinaryStatusLog,
+    FloatStatusLog,
+    optional_list,
+)
 from waterer_backend.utils import update_spans_activation_time
 
 ###############################################################
@@ -39,22 +68,36 @@ _LOGGER = logging.getLogger(__name__)
 ###############################################################
 
 
-class SmartPump(Thread):
+class AbstractSmartPump(ABC):
+
+    """
+    The logs, history and feedback logic of a pump (stepped by a thread or
+    an asyncio task, see SmartPump and AsyncSmartPump)
+    """
+
     def __init__(
         self,
         channel: int,
-        device: ty.Optional[EmbeddedArduino],
         settings: SmartPumpSettings,
         status_update_interval_s: float = 5,
         allow_load_history: bool = False,
         auto_save_interval_s: ty.Optional[int] = 3600,
+        journal_batch_size: int = 12,
+        wakeup_callback: ty.Optional[ty.Callable[[int], None]] = None,
+        clock: Clock = SYSTEM_CLOCK,
+        sample_callback: ty.Optional[sample_callback_type] = None,
     ) -> None:
-
-        Thread.__init__(self)
-
-        self._device = device
-        if device is None:
-            _LOGGER.warning("Pump created without valid device")
+        """
+        status_update_interval_s: nominal interval (the initial interval if
+            the polling is adaptive, see SmartPumpSettings)
+        wakeup_callback: called (with the channel) when the settings change,
+            for when the pump is stepped by a scheduler rather than run as a
+            thread
+        clock: times the samples, the feedback and the status updates (e.g.
+            a virtual clock for a simulated device)
+        sample_callback: called with each logged status (n.b. from the
+            thread/task adding the status)
+        """
 
         self._channel = channel
 
@@ -63,11 +106,32 @@ class SmartPump(Thread):
         with self._settings_lock:
             self._settings = settings
 
-        self._sleep_event = Event()
         self._abort_running = False
 
-        self._status_update_interval_s = status_update_interval_s
+        self._nominal_status_update_interval_s = status_update_interval_s
+        self._status_update_interval_s = (
+            clamp_status_update_interval_s(status_update_interval_s, settings)
+            if settings.adaptive_polling
+            else status_update_interval_s
+        )
         self._auto_save_interval_s = auto_save_interval_s
+        self._clock = clock
+        self._wakeup_callback = wakeup_callback
+        self._sample_callback = sample_callback
+
+        # samples are journaled between (auto) saves of the full history
+        self._journal = (
+            None
+            if auto_save_interval_s is None
+            else SampleJournal(
+                self._history_journal_filepath(), batch_size=journal_batch_size
+            )
+        )
+
+        # held while sampling/snapshotting all of the logs so that they are
+        # read consistently
+        self._logs_lock = Lock()
+        self._sequence = SampleSequence()
 
         if allow_load_history:
             self.load_history()
@@ -77,6 +141,29 @@ class SmartPump(Thread):
         self._last_feedback_update_time: ty.Optional[datetime] = None
         self._last_auto_save_time: float = time()
 
+    @abstractmethod
+    def _wake_run_loop(self) -> None:
+        """
+        Step the pump soon (e.g. after the settings change)
+        """
+        ...
+
+    @abstractmethod
+    def _run_io(self, io: ty.Callable[[], None]) -> None:
+        """
+        Write to the history files (the journal or a snapshot), e.g. off the
+        event loop
+
+        n.b. in the order of the calls
+        """
+        ...
+
+    def _history_archive_filepath(self) -> pt.Path:
+        return get_history_archive_filepath(self._channel)
+
+    def _history_journal_filepath(self) -> pt.Path:
+        return get_history_journal_filepath(self._channel)
+
     def _init_logs(self):
         self._rel_humidity_V_log = FloatStatusLog()
         self._smoothed_rel_humidity_V_log = FloatStatusLog()
@@ -96,34 +183,109 @@ class SmartPump(Thread):
         with self._settings_lock:
             self._settings = value
             _LOGGER.info(f"New setting for channel {self._channel}: {self._settings}")
-            self._sleep_event.set()
+            self._wake_run_loop()
+
+        if self._wakeup_callback is not None:
+            self._wakeup_callback(self._channel)
+
+    @property
+    def status_update_interval_s(self) -> float:
+        """
+        n.b. the current interval if the polling is adaptive
+        """
+        return self._status_update_interval_s
 
-    def save_history(self) -> None:
+    def _adapt_status_update_interval(
+        self,
+        pump_running: bool,
+        pump_switched: bool,
+        humidity_change_V: ty.Optional[float],
+    ) -> None:
+
+        settings = self._settings
 
-        history = SmartPumpStatusData(
-            rel_humidity_V_log=self._rel_humidity_V_log.to_data(),
-            smoothed_rel_humidity_V_log=self._smoothed_rel_humidity_V_log.to_data(),
-            pump_status_log=self._pump_status_log.to_data(),
+        if not settings.adaptive_polling:
+            self._status_update_interval_s = self._nominal_status_update_interval_s
+            return
+
+        self._status_update_interval_s = next_status_update_interval_s(
+            self._status_update_interval_s,
+            settings,
+            pump_running,
+            pump_switched,
+            humidity_change_V,
         )
 
-        filepath = get_history_filepath(self._channel)
+    def _on_pump_switched(self) -> None:
+        """
+        Update the status soon (and then often) after the pump is switched
+        """
+
+        if self._settings.adaptive_polling:
+            self._status_update_interval_s = self._settings.min_status_update_interval_s
+
+        self._wake_run_loop()
+
+        if self._wakeup_callback is not None:
+            self._wakeup_callback(self._channel)
 
-        os.makedirs(filepath.parent, exist_ok=True)
+    def _status_logs(self) -> ty.Dict[str, AbstractStatusLog]:
+        return {
+            "rel_humidity_V_log": self._rel_humidity_V_log,
+            "smoothed_rel_humidity_V_log": self._smoothed_rel_humidity_V_log,
+            "pump_status_log": self._pump_status_log,
+        }
 
-        with open(filepath, "w") as fh:
-            json.dump(history.dict(), fh)
+    def _snapshot_logs(self) -> ty.Dict[str, AbstractStatusLogSnapshot]:
+        with self._logs_lock:
+            return {name: log.snapshot() for name, log in self._status_logs().items()}
+
+    def _init_logs_from_arrays(
+        self,
+        history: HistoryArrays,
+        aggregates: ty.Optional[HistoryAggregates] = None,
+    ) -> None:
+        """
+        aggregates: restored (rather than aggregated from the history) if
+            provided
+        """
+
+        aggregates = aggregates or dict()
+
+        self._rel_humidity_V_log = FloatStatusLog.from_arrays(
+            *history["rel_humidity_V_log"],
+            aggregates=aggregates.get("rel_humidity_V_log"),
+        )
+        self._smoothed_rel_humidity_V_log = FloatStatusLog.from_arrays(
+            *history["smoothed_rel_humidity_V_log"],
+            aggregates=aggregates.get("smoothed_rel_humidity_V_log"),
+        )
+        self._pump_status_log = BinaryStatusLog.from_arrays(*history["pump_status_log"])
+
+    def save_history(self) -> str:
+
+        filepath = self._history_archive_filepath()
+
+        def save_snapshot() -> None:
+            save_history_file(filepath, self._snapshot_logs())
+
+        if self._journal is None:
+            save_snapshot()
+        else:
+            self._journal.compact(save_snapshot)
 
         _LOGGER.info(f"Saved history for pump {self._channel} to {filepath}")
 
-    def load_history(self) -> None:
+        return str(filepath)
+
+    def _load_legacy_history(self) -> ty.Optional[HistoryArrays]:
         filepath = get_history_filepath(self._channel)
 
         if not filepath.is_file():
             _LOGGER.info(
                 f"Failed to find history file to load for pump {self._channel}: {filepath}"
             )
-            self._init_logs()
-            return
+            return None
 
         with open(filepath, "r") as fh:
             history_dict = json.load(fh)
@@ -132,50 +294,75 @@ class SmartPump(Thread):
             history = SmartPumpStatusData(**history_dict)
         except Exception as e:
             _LOGGER.error(f"Failed to parse history file: {filepath} with exception{e}")
+            return None
+
+        _LOGGER.info(f"Migrating history for pump {self._channel} from {filepath}")
+
+        return history_arrays_from_status_data(history)
+
+    def _load_snapshot(self) -> bool:
+        """
+        Returns:
+            True if the history was migrated from the legacy format (and so
+            should be re-saved)
+        """
+        filepath = self._history_archive_filepath()
+
+        if not filepath.is_file():
+            legacy_history = self._load_legacy_history()
+
+            if legacy_history is None:
+                self._init_logs()
+                return False
+
+            self._init_logs_from_arrays(legacy_history)
+            return True
+
+        try:
+            history = load_history_file(filepath)
+            aggregates = load_history_aggregates(filepath)
+        except Exception as e:
+            _LOGGER.error(f"Failed to load history file: {filepath} with exception{e}")
             self._init_logs()
-            return
+            return False
 
         _LOGGER.info(f"Loaded history for pump {self._channel} from {filepath}")
 
-        self._rel_humidity_V_log = FloatStatusLog.from_data(history.rel_humidity_V_log)
-        self._smoothed_rel_humidity_V_log = FloatStatusLog.from_data(
-            history.smoothed_rel_humidity_V_log
-        )
-        self._pump_status_log = BinaryStatusLog.from_data(history.pump_status_log)
+        self._init_logs_from_arrays(history, aggregates)
+        return False
+
+    def load_history(self) -> None:
+
+        migrated = self._load_snapshot()
+
+        if self._journal is not None:
+            num_replayed = self._journal.replay_into(self._status_logs())
+            _LOGGER.info(
+                f"Replayed {num_replayed} journaled samples for pump {self._channel}"
+            )
+
+        if migrated:
+            self.save_history()
 
     def _check_response(self, desc: str, response: Response) -> None:
         if not response.success:
             raise RuntimeError(f"Failed to {desc}: {response.message}")
 
     def _pcnt_from_V_humidity(
-        self, rel_humidity_V: ty.Union[None, float, ty.List[ty.Optional[float]]]
-    ) -> ty.Union[None, float, ty.List[float]]:
+        self, rel_humidity_V: ty.Union[None, float, np.ndarray]
+    ) -> ty.Union[None, float, np.ndarray]:
+        """
+        n.b. element-wise for a (float) array in which missing values are NaN
+        """
 
         if rel_humidity_V is None:
             return None
 
-        if isinstance(rel_humidity_V, list):
-
-            arr = np.asarray(rel_humidity_V)
-            none_vals = arr == None
-            arr[none_vals] = 0
-
-            scaled_arr = (
-                (self._settings.dry_humidity_V - arr)
-                / (self._settings.dry_humidity_V - self._settings.wet_humidity_V)
-                * 100
-            )
-
-            scaled_optional_arr = scaled_arr
-            scaled_optional_arr[none_vals] = None
-            return scaled_optional_arr.tolist()
-
-        else:
-            return (
-                (self._settings.dry_humidity_V - rel_humidity_V)
-                / (self._settings.dry_humidity_V - self._settings.wet_humidity_V)
-                * 100
-            )
+        return (
+            (self._settings.dry_humidity_V - rel_humidity_V)
+            / (self._settings.dry_humidity_V - self._settings.wet_humidity_V)
+            * 100
+        )
 
     def _smoothed_humidity(self, rel_humidity_V: float) -> ty.Optional[float]:
         alpha = 1.0 / self._settings.num_smoothing_samples
@@ -191,6 +378,385 @@ class SmartPump(Thread):
 
         return alpha * rel_humidity_V + (1 - alpha) * last_value
 
+    def add_status(
+        self, rel_humidity_V: float, pump_status: bool, status_time: float
+    ) -> None:
+        """
+        Log a status sample (samples not newer than the latest are dropped)
+        """
+
+        with self._logs_lock:
+
+            newest_time, _ = self._pump_status_log.get_newest_value()
+            if newest_time is not None and status_time <= newest_time:
+                _LOGGER.debug(
+                    f"Dropping status of pump {self._channel} at {status_time} preceding {newest_time}"
+                )
+                return
+
+            _, last_rel_humidity_V = self._rel_humidity_V_log.get_newest_value()
+            _, last_pump_status = self._pump_status_log.get_newest_value()
+
+            smoothed_rel_humidity_V = self._smoothed_humidity(rel_humidity_V)
+
+            self._pump_status_log.add_sample(status_time, pump_status)
+            self._rel_humidity_V_log.add_sample(status_time, rel_humidity_V)
+            self._smoothed_rel_humidity_V_log.add_sample(
+                status_time, smoothed_rel_humidity_V
+            )
+            self._sequence.append(status_time)
+
+        if self._journal is not None:
+            journal = self._journal
+            self._run_io(
+                lambda: journal.append(
+                    status_time, rel_humidity_V, smoothed_rel_humidity_V, pump_status
+                )
+            )
+
+        pump_switched = last_pump_status is not None and bool(last_pump_status) != bool(
+            pump_status
+        )
+
+        if self._sample_callback is not None:
+            self._sample_callback(
+                self._channel,
+                SmartPumpStatus(
+                    rel_humidity_V=rel_humidity_V,
+                    rel_humidity_pcnt=self._pcnt_from_V_humidity(rel_humidity_V),
+                    smoothed_rel_humidity_pcnt=self._pcnt_from_V_humidity(
+                        smoothed_rel_humidity_V
+                    ),
+                    pump_running=pump_status,
+                    epoch_time=status_time,
+                ),
+                pump_switched,
+            )
+
+        self._adapt_status_update_interval(
+            pump_running=pump_status,
+            pump_switched=pump_switched,
+            humidity_change_V=None
+            if last_rel_humidity_V is None
+            else rel_humidity_V - last_rel_humidity_V,
+        )
+
+        # save (n.b. in real time)
+
+        if self._auto_save_interval_s is not None and (
+            (time() - self._last_auto_save_time) > self._auto_save_interval_s
+        ):
+            self._run_io(self.save_history)
+            self._last_auto_save_time = time()
+
+    def status_is_stale(self, max_age_s: ty.Optional[float]) -> bool:
+        """
+        True if no status is logged or it is older than max_age_s (if provided)
+        """
+
+        with self._logs_lock:
+            status_time, _ = self._pump_status_log.get_newest_value()
+
+        if status_time is None:
+            return True
+
+        return max_age_s is not None and self._clock.time() - status_time > max_age_s
+
+    def _newest_status(self) -> SmartPumpStatus:
+
+        with self._logs_lock:
+            status_time, pump_status = self._pump_status_log.get_newest_value()
+            _, rel_humidity_V = self._rel_humidity_V_log.get_newest_value()
+            (
+                _,
+                smoothed_rel_humidity_V,
+            ) = self._smoothed_rel_humidity_V_log.get_newest_value()
+
+        if status_time is None:
+            raise RuntimeError(f"No status available for pump {self._channel}")
+
+        assert pump_status is not None
+        assert rel_humidity_V is not None
+
+        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
+        assert isinstance(rel_humidity_pcnt, float)
+
+        # n.b. None while the pump is running
+        smoothed_rel_humidity_pcnt = self._pcnt_from_V_humidity(smoothed_rel_humidity_V)
+        assert smoothed_rel_humidity_pcnt is None or isinstance(
+            smoothed_rel_humidity_pcnt, float
+        )
+
+        return SmartPumpStatus(
+            rel_humidity_V=rel_humidity_V,
+            rel_humidity_pcnt=rel_humidity_pcnt,
+            smoothed_rel_humidity_pcnt=smoothed_rel_humidity_pcnt,
+            pump_running=pump_status,
+            epoch_time=status_time,
+        )
+
+    @property
+    def cursor(self) -> str:
+        """
+        of the latest logged sample (see history_cursor)
+        """
+
+        with self._logs_lock:
+            return self._sequence.cursor
+
+    def clear_status_logs(self):
+        with self._logs_lock:
+            self._rel_humidity_V_log.clear()
+            self._smoothed_rel_humidity_V_log.clear()
+            self._pump_status_log.clear()
+            self._sequence.clear()
+
+    def get_status_since(
+        self,
+        earliest_epoch_time_s: ty.Optional[float],
+        latest_epoch_time_s: ty.Optional[float] = None,
+        resolution_s: ty.Optional[float] = None,
+        since_cursor: ty.Optional[str] = None,
+        max_points: ty.Optional[int] = None,
+    ) -> SmartPumpStatusHistory:
+        """
+        Samples logged after earliest_epoch_time_s and up to (and including)
+        latest_epoch_time_s (a time of None means unbounded)
+
+        If provided the humidity is returned at the coarsest pre-aggregated
+        resolution no coarser than resolution_s
+
+        since_cursor: only samples logged after the sample of this cursor
+            (e.g. the cursor of the previous response) if it is known
+        max_points: downsample each humidity series to at most this many
+            points (keeping the minima and maxima, see downsample)
+        """
+
+        # n.b. the logs are only locked while (cheaply) taking the snapshots
+
+        with self._logs_lock:
+            rel_humidity_V_log = self._rel_humidity_V_log.snapshot()
+            smoothed_rel_humidity_V_log = self._smoothed_rel_humidity_V_log.snapshot()
+            pump_status_log = self._pump_status_log.snapshot()
+
+            earliest_epoch_time_s = self._sequence.earliest_time_s(
+                earliest_epoch_time_s, since_cursor
+            )
+            cursor = self._sequence.cursor
+
+        rel_humidity_V_epoch_time, rel_humidity_V = rel_humidity_V_log.get_arrays(
+            earliest_epoch_time_s, latest_epoch_time_s, resolution_s
+        )
+
+        (
+            smoothed_rel_humidity_V_epoch_time,
+            smoothed_rel_humidity_V,
+        ) = smoothed_rel_humidity_V_log.get_arrays(
+            earliest_epoch_time_s, latest_epoch_time_s, resolution_s
+        )
+
+        if max_points is not None:
+            rel_humidity_V_epoch_time, rel_humidity_V = downsample_min_max(
+                rel_humidity_V_epoch_time, rel_humidity_V, max_points
+            )
+            (
+                smoothed_rel_humidity_V_epoch_time,
+                smoothed_rel_humidity_V,
+            ) = downsample_min_max(
+                smoothed_rel_humidity_V_epoch_time, smoothed_rel_humidity_V, max_points
+            )
+
+        # n.b. only the switching of the pump is logged (so it is not
+        # downsampled)
+        pump_running_epoch_time, pump_running = pump_status_log.get_values(
+            earliest_epoch_time_s, latest_epoch_time_s
+        )
+
+        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
+        smoothed_rel_humidity_pcnt = self._pcnt_from_V_humidity(smoothed_rel_humidity_V)
+        assert isinstance(rel_humidity_pcnt, np.ndarray)
+        assert isinstance(smoothed_rel_humidity_pcnt, np.ndarray)
+
+        # n.b. missing values (NaN) only become None in the response
+
+        rel_humidity_V_epoch_time_list = rel_humidity_V_epoch_time.tolist()
+
+        return SmartPumpStatusHistory(
+            rel_humidity_V=optional_list(rel_humidity_V),
+            rel_humidity_V_epoch_time=rel_humidity_V_epoch_time_list,
+            rel_humidity_pcnt=optional_list(rel_humidity_pcnt),
+            rel_humidity_pcnt_epoch_time=rel_humidity_V_epoch_time_list,
+            smoothed_rel_humidity_pcnt=optional_list(smoothed_rel_humidity_pcnt),
+            smoothed_rel_humidity_pcnt_epoch_time=smoothed_rel_humidity_V_epoch_time.tolist(),
+            pump_running_epoch_time=pump_running_epoch_time,
+            pump_running=pump_running,
+            cursor=cursor,
+        )
+
+    def get_aggregates(
+        self,
+        resolution_s: float,
+        earliest_epoch_time_s: ty.Optional[float] = None,
+        latest_epoch_time_s: ty.Optional[float] = None,
+    ) -> SmartPumpAggregates:
+        """
+        Min/max/mean humidity and the pump on time in buckets (with a start
+        time after earliest_epoch_time_s and up to latest_epoch_time_s) of
+        the coarsest pre-aggregated resolution no coarser than resolution_s
+        """
+
+        with self._logs_lock:
+            rel_humidity_V_log = self._rel_humidity_V_log.snapshot()
+            pump_status_log = self._pump_status_log.snapshot()
+
+        interval_s = rel_humidity_V_log.get_aggregate_interval_s(resolution_s)
+
+        epoch_time, V_min, V_max, V_mean = rel_humidity_V_log.get_aggregate_arrays(
+            resolution_s, earliest_epoch_time_s, latest_epoch_time_s
+        )
+
+        # n.b. the humidity (pcnt) decreases with the voltage for a dry
+        # voltage above the wet voltage
+
+        pcnt_a = self._pcnt_from_V_humidity(V_min)
+        pcnt_b = self._pcnt_from_V_humidity(V_max)
+        pcnt_mean = self._pcnt_from_V_humidity(V_mean)
+        assert isinstance(pcnt_a, np.ndarray) and isinstance(pcnt_b, np.ndarray)
+        assert isinstance(pcnt_mean, np.ndarray)
+
+        (
+            pump_on_time_epoch_time,
+            pump_on_time_s,
+        ) = pump_status_log.get_on_time_buckets(
+            interval_s, earliest_epoch_time_s, latest_epoch_time_s
+        )
+
+        return SmartPumpAggregates(
+            resolution_s=interval_s,
+            epoch_time=epoch_time.tolist(),
+            rel_humidity_V_min=V_min.tolist(),
+            rel_humidity_V_max=V_max.tolist(),
+            rel_humidity_V_mean=V_mean.tolist(),
+            rel_humidity_pcnt_min=np.minimum(pcnt_a, pcnt_b).tolist(),
+            rel_humidity_pcnt_max=np.maximum(pcnt_a, pcnt_b).tolist(),
+            rel_humidity_pcnt_mean=pcnt_mean.tolist(),
+            pump_on_time_epoch_time=pump_on_time_epoch_time.tolist(),
+            pump_on_time_s=pump_on_time_s.tolist(),
+        )
+
+    def _closed_loop_request(self) -> ty.Optional[Request]:
+        """
+        Returns:
+            request to turn on the pump (None if the soil is wet enough)
+        """
+
+        (
+            _,
+            current_humidity_V,
+        ) = self._smoothed_rel_humidity_V_log.get_newest_value()
+        current_humidity_pcnt = self._pcnt_from_V_humidity(current_humidity_V)
+
+        _LOGGER.info(
+            f"{self.channel}: Humidity: Current: {current_humidity_pcnt} %, Target: {self._settings.feedback_setpoint_pcnt} %"
+        )
+
+        if (
+            isinstance(current_humidity_pcnt, float)
+            and self._settings.feedback_setpoint_pcnt > current_humidity_pcnt
+        ):
+            _LOGGER.info(f"Activating pump for {self._settings.pump_on_time_s} s")
+
+            return Request(
+                channel=self.channel,
+                instruction="turn_on",
+                data=self._settings.pump_on_time_s,
+            )
+
+        return None
+
+    def _feedback_due(self) -> bool:
+        """
+        True if the activation time passed since the last call
+
+        n.b. call holding the settings lock
+        """
+
+        next_update_time = self._clock.now()
+
+        should_activate = (
+            self._last_feedback_update_time is not None
+            and update_spans_activation_time(
+                self._last_feedback_update_time,
+                next_update_time,
+                self._settings.pump_activation_time_as_date,
+            )
+        )
+
+        self._last_feedback_update_time = next_update_time
+
+        return should_activate
+
+
+class SmartPump(AbstractSmartPump, Thread):
+    def __init__(
+        self,
+        channel: int,
+        device: ty.Optional[EmbeddedArduino],
+        settings: SmartPumpSettings,
+        status_update_interval_s: float = 5,
+        allow_load_history: bool = False,
+        auto_save_interval_s: ty.Optional[int] = 3600,
+        journal_batch_size: int = 12,
+        poll_status: bool = True,
+        wakeup_callback: ty.Optional[ty.Callable[[int], None]] = None,
+        clock: Clock = SYSTEM_CLOCK,
+        sample_callback: ty.Optional[sample_callback_type] = None,
+        status_refresher: ty.Optional[ty.Callable[[ty.Optional[float]], None]] = None,
+    ) -> None:
+        """
+        poll_status: if False the status is not requested from the device by
+            the pump but supplied via add_status (e.g. by a bulk poll of all
+            channels)
+        status_refresher: if the status is not polled, called (with max_age_s)
+            by get_status to refresh a stale status (e.g. with a bulk poll)
+
+        n.b. see AbstractSmartPump for the other arguments
+        """
+
+        Thread.__init__(self)
+
+        self._device = device
+        if device is None:
+            _LOGGER.warning("Pump created without valid device")
+
+        self._poll_status = poll_status
+        self._status_refresher = status_refresher
+        self._sleep_event = Event()
+
+        # held while reading the status on request (so that concurrent
+        # requests share one read)
+        self._refresh_lock = Lock()
+
+        AbstractSmartPump.__init__(
+            self,
+            channel=channel,
+            settings=settings,
+            status_update_interval_s=status_update_interval_s,
+            allow_load_history=allow_load_history,
+            auto_save_interval_s=auto_save_interval_s,
+            journal_batch_size=journal_batch_size,
+            wakeup_callback=wakeup_callback,
+            clock=clock,
+            sample_callback=sample_callback,
+        )
+
+    def _wake_run_loop(self) -> None:
+        self._sleep_event.set()
+
+    def _run_io(self, io: ty.Callable[[], None]) -> None:
+        # n.b. on the thread logging the status
+        io()
+
     def turn_on(self, duration_s: int = 0):
 
         if self._device is None:
@@ -205,6 +771,7 @@ class SmartPump(Thread):
             )
         )
         self._check_response("turn_on", response)
+        self._on_pump_switched()
 
     def turn_off(self):
 
@@ -220,6 +787,7 @@ class SmartPump(Thread):
             )
         )
         self._check_response("turn_off", response)
+        self._on_pump_switched()
 
     def _update_status(self) -> bool:
 
@@ -238,8 +806,6 @@ class SmartPump(Thread):
         assert response is not None
 
         rel_humidity_V = response.data
-        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
-        smoothed_rel_humidity_V = self._smoothed_humidity(rel_humidity_V)
 
         ok, response = self._make_request_safe(
             Request(channel=self.channel, instruction="get_state", data=0)
@@ -249,102 +815,33 @@ class SmartPump(Thread):
 
         assert response is not None
 
-        pump_status = bool(response.data)
-        status_time = time()
-
-        # log
-
-        self._pump_status_log.add_sample(status_time, pump_status)
-        self._rel_humidity_V_log.add_sample(status_time, rel_humidity_V)
-        self._smoothed_rel_humidity_V_log.add_sample(
-            status_time, smoothed_rel_humidity_V
-        )
-
-        # save
-
-        if self._auto_save_interval_s is not None and (
-            (time() - self._last_auto_save_time) > self._auto_save_interval_s
-        ):
-            self.save_history()
-            self._last_auto_save_time = time()
+        self.add_status(rel_humidity_V, bool(response.data), self._clock.time())
 
         return True
 
     @property
     def status(self) -> SmartPumpStatus:
+        return self.get_status()
 
-        with self._settings_lock:
-
-            self._update_status()
-
-            status_time, pump_status = self._pump_status_log.get_newest_value()
-            assert status_time is not None
-            assert pump_status is not None
-
-            _, rel_humidity_V = self._rel_humidity_V_log.get_newest_value()
-            assert rel_humidity_V is not None
-
-            rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
-            assert isinstance(rel_humidity_pcnt, float)
-
-            (
-                _,
-                smoothed_rel_humidity_V,
-            ) = self._smoothed_rel_humidity_V_log.get_newest_value()
-
-            smoothed_rel_humidity_pcnt = self._pcnt_from_V_humidity(
-                smoothed_rel_humidity_V
-            )
-            assert isinstance(smoothed_rel_humidity_pcnt, float)
-
-            return SmartPumpStatus(
-                rel_humidity_V,
-                rel_humidity_pcnt,
-                smoothed_rel_humidity_pcnt,
-                pump_status,
-                status_time,
-            )
-
-    def clear_status_logs(self):
-        self._rel_humidity_V_log.clear()
-        self._smoothed_rel_humidity_V_log.clear()
-        self._pump_status_log.clear()
-
-    def get_status_since(
-        self, earliest_epoch_time_s: ty.Optional[float]
-    ) -> SmartPumpStatusHistory:
-        """
-        if earliest time is None all samples are returned
+    def get_status(self, max_age_s: ty.Optional[float] = None) -> SmartPumpStatus:
         """
-        rel_humidity_V_epoch_time, rel_humidity_V = self._rel_humidity_V_log.get_values(
-            earliest_epoch_time_s
-        )
-
-        rel_humidity_pcnt = self._pcnt_from_V_humidity(rel_humidity_V)
-        assert isinstance(rel_humidity_pcnt, list)
-
-        (
-            smoothed_rel_humidity_V_epoch_time,
-            smoothed_rel_humidity_V,
-        ) = self._smoothed_rel_humidity_V_log.get_values(earliest_epoch_time_s)
+        Latest logged status (of the run loop) which is first read from the
+        device if there is none or it is older than max_age_s
 
-        smoothed_rel_humidity_pcnt = self._pcnt_from_V_humidity(smoothed_rel_humidity_V)
-        assert isinstance(smoothed_rel_humidity_pcnt, list)
+        n.b. concurrent callers share a single read (if not polled by the pump
+        the status_refresher is responsible for this)
+        """
 
-        pump_running_epoch_time, pump_running = self._pump_status_log.get_values(
-            earliest_epoch_time_s
-        )
+        if self.status_is_stale(max_age_s):
+            if self._poll_status:
+                with self._refresh_lock:
+                    # n.b. may have been read while waiting for the lock
+                    if self.status_is_stale(max_age_s):
+                        self._update_status()
+            elif self._status_refresher is not None:
+                self._status_refresher(max_age_s)
 
-        return SmartPumpStatusHistory(
-            rel_humidity_V=rel_humidity_V,
-            rel_humidity_V_epoch_time=rel_humidity_V_epoch_time,
-            rel_humidity_pcnt=rel_humidity_pcnt,
-            rel_humidity_pcnt_epoch_time=rel_humidity_V_epoch_time,
-            smoothed_rel_humidity_pcnt=smoothed_rel_humidity_pcnt,
-            smoothed_rel_humidity_pcnt_epoch_time=smoothed_rel_humidity_V_epoch_time,
-            pump_running_epoch_time=pump_running_epoch_time,
-            pump_running=pump_running,
-        )
+        return self._newest_status()
 
     # Stops the feedback loop (so a join() should execute quickly)
     def interrupt(self):
@@ -384,55 +881,35 @@ class SmartPump(Thread):
 
     def _do_activate_closed_loop_pump(self):
 
-        (
-            _,
-            current_humidity_V,
-        ) = self._smoothed_rel_humidity_V_log.get_newest_value()
-        current_humidity_pcnt = self._pcnt_from_V_humidity(current_humidity_V)
+        turn_on_request = self._closed_loop_request()
+        if turn_on_request is None:
+            return
 
-        _LOGGER.info(
-            f"{self.channel}: Humidity: Current: {current_humidity_pcnt} %, Target: {self._settings.feedback_setpoint_pcnt} %"
+        ok, _ = self._make_request_safe(turn_on_request)
+        if ok:
+            self._on_pump_switched()
+
+    def _do_run_loop(self):
+        self._sleep_event.clear()
+        self._sleep_event.wait(
+            timeout=self._clock.real_interval_s(self._status_update_interval_s)
         )
 
-        if (
-            isinstance(current_humidity_pcnt, float)
-            and self._settings.feedback_setpoint_pcnt > current_humidity_pcnt
-        ):
-            _LOGGER.info(f"Activating pump for {self._settings.pump_on_time_s} s")
+        self.step()
 
-            turn_on_request = Request(
-                channel=self.channel,
-                instruction="turn_on",
-                data=self._settings.pump_on_time_s,
-            )
+    def step(self):
+        """
+        Update the status and perform any due feedback event
+        """
 
-            ok, _ = self._make_request_safe(turn_on_request)
+        if self._poll_status:
+            ok = self._update_status()
             if not ok:
                 return
 
-    def _do_run_loop(self):
-        self._sleep_event.clear()
-        self._sleep_event.wait(timeout=self._status_update_interval_s)
-        ok = self._update_status()
-        if not ok:
-            return
-
         with self._settings_lock:
 
-            next_update_time = datetime.now()
-
-            should_activate = (
-                self._last_feedback_update_time is not None
-                and update_spans_activation_time(
-                    self._last_feedback_update_time,
-                    next_update_time,
-                    self._settings.pump_activation_time,
-                )
-            )
-
-            self._last_feedback_update_time = next_update_time
-
-            if should_activate:
+            if self._feedback_due():
                 _LOGGER.info(f"{self.channel}: Performing feedback event: ")
                 self._do_activate_closed_loop_pump()
 
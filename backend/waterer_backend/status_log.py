@@ -5,29 +5,150 @@
 ###############################################################
 
 import json
+import math
 import typing as ty
 from abc import ABC, abstractmethod
-from collections import deque
 from threading import Lock
 
 import numpy as np
+from waterer_backend.compressed_series import CompressedSeries, SeriesSnapshot
 from waterer_backend.models import (
+    AggregateTierSettings,
     BinaryStatusLogData,
     BinaryStatusLogSettings,
     FloatStatusLogData,
     FloatStatusLogSettings,
 )
+from waterer_backend.sample_buffer import SampleBuffer
 
 ###############################################################
 # Definitions
 ###############################################################
 
 
+###############################################################
+# Functions
+###############################################################
+
+
+def optional_list(values: np.ndarray) -> ty.List[ty.Optional[float]]:
+    """
+    Convert a float array to a list in which NaN's are replaced by None
+
+    n.b. for the (json) responses - missing values are otherwise kept as NaN
+    """
+
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+
+    return np.where(missing, None, values).tolist()
+
+
+def _time_range(
+    times: np.ndarray, min_time_s: ty.Optional[float], max_time_s: ty.Optional[float]
+) -> slice:
+    """
+    Slice of the (sorted) times with: min_time_s < time <= max_time_s
+    """
+
+    start = 0 if min_time_s is None else np.searchsorted(times, min_time_s, "right")
+    stop = (
+        len(times)
+        if max_time_s is None
+        else np.searchsorted(times, max_time_s, "right")
+    )
+
+    return slice(int(start), max(int(start), int(stop)))
+
+
+def _thinned_indices(
+    times: np.ndarray, interval_s: float, last_time_s: ty.Optional[float] = None
+) -> np.ndarray:
+    """
+    Indices of the (sorted) times that are each separated from the previously
+    retained time (initially last_time_s) by more than interval_s
+
+    n.b. costs O(k log n) for k retained samples
+    """
+
+    indices = []
+
+    index = (
+        0
+        if last_time_s is None
+        else int(np.searchsorted(times, last_time_s + interval_s, "right"))
+    )
+
+    while index < len(times):
+        indices.append(index)
+        index = int(np.searchsorted(times, times[index] + interval_s, "right"))
+
+    return np.asarray(indices, dtype=np.int_)
+
+
+def _as_time_array(new_times: ty.Sequence[float]) -> np.ndarray:
+
+    times = np.asarray(new_times, dtype=np.float64)
+
+    if np.any(np.diff(times) <= 0):
+        raise ValueError("Sample times must be strictly increasing")
+
+    return times
+
+
 ###############################################################
 # Classes
 ###############################################################
 
 
+class AbstractStatusLogSnapshot(ABC):
+
+    """
+    Immutable view of a status log as of a given version
+    """
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        ...
+
+    def to_arrays(self) -> ty.Tuple[np.ndarray, np.ndarray]:
+        """
+        All samples as (times, values) arrays (e.g. for bulk persistence)
+        """
+
+        return self.get_arrays()
+
+    def to_aggregate_arrays(self) -> ty.Dict[float, np.ndarray]:
+        """
+        The rows of each aggregate tier by interval (see
+        AggregateTierSnapshot.to_rows), none by default
+        """
+
+        return dict()
+
+    @abstractmethod
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        ...
+
+    @abstractmethod
+    def get_values(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[ty.List[float], ty.List[ty.Any]]:
+        ...
+
+    @abstractmethod
+    def get_newest_value(self) -> ty.Tuple[ty.Optional[float], ty.Optional[ty.Any]]:
+        ...
+
+
 class AbstractStatusLog(ABC):
     @staticmethod
     @abstractmethod
@@ -38,17 +159,63 @@ class AbstractStatusLog(ABC):
     def to_data(self) -> str:
         ...
 
+    def to_arrays(self) -> ty.Tuple[np.ndarray, np.ndarray]:
+        """
+        All samples as (times, values) arrays (e.g. for bulk persistence)
+        """
+
+        return self.get_arrays()
+
+    def to_aggregate_arrays(self) -> ty.Dict[float, np.ndarray]:
+        """
+        See AbstractStatusLogSnapshot.to_aggregate_arrays
+        """
+
+        return dict()
+
     @abstractmethod
     def clear(self):
         ...
 
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """
+        Incremented by each change to the log
+        """
+        ...
+
+    @abstractmethod
+    def snapshot(self) -> AbstractStatusLogSnapshot:
+        """
+        Consistent view of the log which is unaffected by later samples
+
+        n.b. cheap (no samples are copied) so that readers only briefly
+        hold up writers
+        """
+        ...
+
     @abstractmethod
     def add_sample(self, new_time: float, new_value) -> None:
         ...
 
+    @abstractmethod
+    def add_samples(self, new_times: ty.Sequence[float], new_values) -> None:
+        ...
+
+    @abstractmethod
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        ...
+
     @abstractmethod
     def get_values(
-        self, min_time_s: ty.Optional[float] = None
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
     ) -> ty.Tuple[ty.List[float], ty.List[ty.Any]]:
         ...
 
@@ -57,6 +224,254 @@ class AbstractStatusLog(ABC):
         ...
 
 
+class AggregateTier:
+
+    """
+    Maintains the min, max and mean of the samples falling in each
+    interval_s wide bucket (aligned to the epoch). Buckets starting more than
+    max_age_s before the newest sample are dropped.
+
+    Missing (NaN) values are ignored and buckets without any valid values
+    are not recorded.
+    """
+
+    def __init__(self, settings: AggregateTierSettings) -> None:
+
+        if settings.interval_s <= 0:
+            raise ValueError(
+                f"Aggregate interval must be positive (got: {settings.interval_s} s)"
+            )
+
+        self._interval_s = settings.interval_s
+        self._max_age_s = settings.max_age_s
+
+        self.clear()
+
+    @staticmethod
+    def from_rows(settings: AggregateTierSettings, rows: np.ndarray) -> "AggregateTier":
+        """
+        Inverse of AggregateTierSnapshot.to_rows (n.b. the last row is
+        restored as the bucket still being filled)
+        """
+
+        tier = AggregateTier(settings)
+
+        if rows.shape[1] == 0:
+            return tier
+
+        starts, mins, maxs, means, counts = rows
+        counts = counts.astype(np.int64)
+
+        tier._buckets.extend(starts[:-1], mins[:-1], maxs[:-1], means[:-1], counts[:-1])
+
+        tier._open_bucket = float(starts[-1])
+        tier._open_min = float(mins[-1])
+        tier._open_max = float(maxs[-1])
+        tier._open_sum = float(means[-1] * counts[-1])
+        tier._open_count = int(counts[-1])
+
+        return tier
+
+    @property
+    def interval_s(self) -> float:
+        return self._interval_s
+
+    def clear(self) -> None:
+
+        # closed buckets: start time, min, max, mean, count
+        self._buckets = SampleBuffer(dtypes=(np.float64,) * 4 + (np.int64,))
+
+        self._open_bucket: ty.Optional[float] = None
+        self._reset_open_bucket(None)
+
+    def _bucket_start(self, times: ty.Any) -> ty.Any:
+        return np.floor(times / self._interval_s) * self._interval_s
+
+    def _reset_open_bucket(self, bucket_start: ty.Optional[float]) -> None:
+
+        if self._open_bucket is not None and self._open_count > 0:
+            self._buckets.append(
+                self._open_bucket,
+                self._open_min,
+                self._open_max,
+                self._open_sum / self._open_count,
+                self._open_count,
+            )
+
+        self._open_bucket = bucket_start
+        self._open_min = np.inf
+        self._open_max = -np.inf
+        self._open_sum = 0.0
+        self._open_count = 0
+
+    def _prune(self, newest_time: float) -> None:
+
+        self._buckets.drop_left(
+            int(
+                np.searchsorted(
+                    self._buckets.column(0), newest_time - self._max_age_s, "left"
+                )
+            )
+        )
+
+    def add_sample(self, new_time: float, new_value: float) -> None:
+
+        bucket_start = math.floor(new_time / self._interval_s) * self._interval_s
+        if bucket_start != self._open_bucket:
+            self._reset_open_bucket(bucket_start)
+            self._prune(new_time)
+
+        if not math.isnan(new_value):
+            self._open_min = min(self._open_min, new_value)
+            self._open_max = max(self._open_max, new_value)
+            self._open_sum += new_value
+            self._open_count += 1
+
+    def add_samples(self, new_times: np.ndarray, new_values: np.ndarray) -> None:
+
+        if len(new_times) == 0:
+            return
+
+        is_valid = ~np.isnan(new_values)
+        values = new_values[is_valid]
+        bucket_starts = self._bucket_start(new_times[is_valid])
+
+        if len(values) > 0:
+
+            group_starts = np.flatnonzero(
+                np.r_[True, bucket_starts[1:] != bucket_starts[:-1]]
+            )
+
+            buckets = bucket_starts[group_starts]
+            mins = np.minimum.reduceat(values, group_starts)
+            maxs = np.maximum.reduceat(values, group_starts)
+            sums = np.add.reduceat(values, group_starts)
+            counts = np.diff(np.r_[group_starts, len(values)])
+
+            if buckets[0] == self._open_bucket:
+                mins[0] = min(mins[0], self._open_min)
+                maxs[0] = max(maxs[0], self._open_max)
+                sums[0] += self._open_sum
+                counts[0] += self._open_count
+                self._open_count = 0  # now accounted for in the first group
+
+            self._reset_open_bucket(None)
+
+            self._buckets.extend(
+                buckets[:-1], mins[:-1], maxs[:-1], sums[:-1] / counts[:-1], counts[:-1]
+            )
+
+            self._open_bucket = float(buckets[-1])
+            self._open_min = float(mins[-1])
+            self._open_max = float(maxs[-1])
+            self._open_sum = float(sums[-1])
+            self._open_count = int(counts[-1])
+
+        newest_bucket = float(self._bucket_start(new_times[-1]))
+        if newest_bucket != self._open_bucket:
+            self._reset_open_bucket(newest_bucket)
+
+        self._prune(new_times[-1])
+
+    def snapshot(self) -> "AggregateTierSnapshot":
+
+        open_row = (
+            None
+            if self._open_bucket is None or self._open_count == 0
+            else (
+                self._open_bucket,
+                self._open_min,
+                self._open_max,
+                self._open_sum / self._open_count,
+                self._open_count,
+            )
+        )
+
+        return AggregateTierSnapshot(
+            self._interval_s, self._buckets.snapshot(), open_row
+        )
+
+    def get_values(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        See AggregateTierSnapshot.get_values
+        """
+
+        return self.snapshot().get_values(min_time_s, max_time_s)
+
+
+class AggregateTierSnapshot:
+
+    """
+    Immutable view of the buckets of an AggregateTier
+    """
+
+    def __init__(
+        self,
+        interval_s: float,
+        buckets: ty.Sequence[np.ndarray],
+        open_row: ty.Optional[ty.Tuple[float, float, float, float, int]],
+    ) -> None:
+
+        self._interval_s = interval_s
+        self._buckets = buckets  # start time, min, max, mean, count
+        self._open_row = open_row
+
+    @property
+    def interval_s(self) -> float:
+        return self._interval_s
+
+    def to_rows(self) -> np.ndarray:
+        """
+        Returns:
+            bucket start times, mins, maxs, means and counts as the rows of
+            a (float) array (including the bucket still being filled)
+        """
+
+        columns = [np.asarray(column, dtype=np.float64) for column in self._buckets]
+
+        if self._open_row is not None:
+            columns = [
+                np.append(column, value)
+                for column, value in zip(columns, self._open_row)
+            ]
+
+        return np.vstack(columns)
+
+    def get_values(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Buckets with: min_time_s < bucket start <= max_time_s (including the
+        one still being filled)
+
+        Returns:
+            bucket start times, mins, maxs, means
+        """
+
+        index = _time_range(self._buckets[0], min_time_s, max_time_s)
+        columns = [column[index] for column in self._buckets[:4]]
+
+        if (
+            self._open_row is not None
+            and (min_time_s is None or self._open_row[0] > min_time_s)
+            and (max_time_s is None or self._open_row[0] <= max_time_s)
+        ):
+            columns = [
+                np.append(column, value)
+                for column, value in zip(columns, self._open_row)
+            ]
+
+        times, mins, maxs, means = columns
+
+        return times, mins, maxs, means
+
+
 class FloatStatusLog(AbstractStatusLog):
 
     """
@@ -69,6 +484,13 @@ class FloatStatusLog(AbstractStatusLog):
     Provided they are separated from the next oldest sample
     by at least:
     - low_res_interval_s
+
+    Both tiers are held in array backed SampleBuffers (with missing
+    values stored as NaN) or, if compress_samples, CompressedSeries (which
+    decompress on query).
+
+    In addition the min/max/mean of the samples are aggregated into each of
+    the (coarser) aggregate_tiers which can be queried by resolution.
     """
 
     def __init__(
@@ -80,9 +502,15 @@ class FloatStatusLog(AbstractStatusLog):
 
         with self._lock:
 
+            self._version = 0
+
             self._low_res_switchover_age_s = settings.low_res_switchover_age_s
             self._low_res_interval_s = settings.low_res_interval_s
             self._low_res_max_age_s = settings.low_res_max_age_s
+            self._compress_samples = settings.compress_samples
+            self._aggregate_tier_settings = sorted(
+                settings.aggregate_tiers, key=lambda tier: tier.interval_s
+            )
 
         self.clear()
 
@@ -93,12 +521,49 @@ class FloatStatusLog(AbstractStatusLog):
     ) -> "FloatStatusLog":
 
         log = FloatStatusLog(settings)
+        log.add_samples(log_data.times, log_data.values)
+
+        return log
+
+    @staticmethod
+    def from_arrays(
+        times: np.ndarray,
+        values: np.ndarray,
+        settings: FloatStatusLogSettings = FloatStatusLogSettings(),
+        aggregates: ty.Optional[ty.Mapping[float, np.ndarray]] = None,
+    ) -> "FloatStatusLog":
+        """
+        aggregates: the rows of (some of) the aggregate tiers by interval (see
+            to_aggregate_arrays) which may span further back than the
+            samples. Other tiers are aggregated from the samples.
+        """
+
+        log = FloatStatusLog(settings)
+        log.add_samples(times, values)
 
-        for index, time in enumerate(log_data.times):
-            log.add_sample(time, log_data.values[index])
+        if aggregates is not None:
+            log._restore_aggregate_tiers(aggregates)
 
         return log
 
+    def _restore_aggregate_tiers(self, aggregates: ty.Mapping[float, np.ndarray]):
+
+        with self._lock:
+
+            self._version += 1
+
+            self._aggregate_tiers = [
+                AggregateTier.from_rows(tier_settings, aggregates[tier.interval_s])
+                if tier.interval_s in aggregates
+                else tier
+                for tier_settings, tier in zip(
+                    self._aggregate_tier_settings, self._aggregate_tiers
+                )
+            ]
+
+    def to_aggregate_arrays(self) -> ty.Dict[float, np.ndarray]:
+        return self.snapshot().to_aggregate_arrays()
+
     def to_data(self) -> FloatStatusLogData:
         """
         Convert data to json string
@@ -108,88 +573,362 @@ class FloatStatusLog(AbstractStatusLog):
 
         return FloatStatusLogData(times=times, values=values)
 
+    def _new_series(self) -> ty.Union[SampleBuffer, CompressedSeries]:
+        return CompressedSeries() if self._compress_samples else SampleBuffer()
+
     def clear(self) -> None:
 
         with self._lock:
 
-            self._high_res_values: ty.Deque[ty.Optional[float]] = deque()
-            self._high_res_times: ty.Deque[float] = deque()
+            self._version += 1
+
+            self._high_res = self._new_series()
+            self._low_res = self._new_series()
 
-            self._low_res_values: ty.Deque[ty.Optional[float]] = deque()
-            self._low_res_times: ty.Deque[float] = deque()
+            self._aggregate_tiers = [
+                AggregateTier(tier_settings)
+                for tier_settings in self._aggregate_tier_settings
+            ]
 
     def add_sample(self, new_time: float, new_value: ty.Optional[float]) -> None:
 
         with self._lock:
 
-            assert len(self._high_res_times) == 0 or new_time > self._high_res_times[-1]
+            assert len(self._high_res) == 0 or new_time > self._high_res.last()
+
+            self._version += 1
+
+            value = np.nan if new_value is None else new_value
 
-            self._high_res_times.append(new_time)
-            self._high_res_values.append(new_value)
+            self._high_res.append(new_time, value)
 
-            # Identify older high res values to move to low res
+            for tier in self._aggregate_tiers:
+                tier.add_sample(new_time, value)
 
-            valid_high_res_index = 0
-            for p, log_time in enumerate(self._high_res_times):
-                if (new_time - log_time) < self._low_res_switchover_age_s:
-                    valid_high_res_index = p
-                    break
+            # Move older high res values to low res (the newest is always retained)
 
-            for index in range(valid_high_res_index):
-                old_time = self._high_res_times.popleft()
-                old_value = self._high_res_values.popleft()
+            while (
+                len(self._high_res) > 1
+                and (new_time - self._high_res.first())
+                >= self._low_res_switchover_age_s
+            ):
+                old_time, old_value = self._high_res.popleft()
 
-                if len(self._low_res_times) == 0:
+                if len(self._low_res) == 0:
                     take_sample = True
-                elif (old_time - self._low_res_times[-1]) > self._low_res_interval_s:
+                elif (old_time - self._low_res.last()) > self._low_res_interval_s:
                     take_sample = True
                 else:
                     take_sample = False
 
                 if take_sample:
-                    self._low_res_times.append(old_time)
-                    self._low_res_values.append(old_value)
+                    self._low_res.append(old_time, old_value)
+
+            # clean very old samples from low res
+
+            while (
+                len(self._low_res) > 0
+                and new_time - self._low_res.first() > self._low_res_max_age_s
+            ):
+                self._low_res.popleft()
+
+    def add_samples(
+        self,
+        new_times: ty.Sequence[float],
+        new_values: ty.Sequence[ty.Optional[float]],
+    ) -> None:
+        """
+        Bulk equivalent of calling add_sample for each sample in turn
+
+        The high/low res partitioning, thinning and pruning are applied once
+        for the whole block (n.b. the rows older than the switchover go
+        straight to low res so that high res never holds e.g. a loaded
+        history).
+        """
+
+        times = _as_time_array(new_times)
+        values = np.asarray(new_values, dtype=np.float64)  # n.b. None -> NaN
+
+        if len(times) != len(values):
+            raise ValueError(
+                f"Got {len(times)} times but {len(values)} values to add to log"
+            )
+
+        if len(times) == 0:
+            return
+
+        with self._lock:
+
+            assert len(self._high_res) == 0 or times[0] > self._high_res.last()
+
+            self._version += 1
+
+            for tier in self._aggregate_tiers:
+                tier.add_samples(times, values)
+
+            newest_time = times[-1]
+            switchover_time = newest_time - self._low_res_switchover_age_s
+
+            # Move older values to low res (the newest is always retained in
+            # high res)
+
+            high_res_times = self._high_res.column(0)
+            num_old_high_res = int(
+                np.searchsorted(high_res_times, switchover_time, "right")
+            )
+            num_old = min(
+                int(np.searchsorted(times, switchover_time, "right")), len(times) - 1
+            )
+
+            old_times = np.concatenate(
+                (high_res_times[:num_old_high_res], times[:num_old])
+            )
+            old_values = np.concatenate(
+                (self._high_res.column(1)[:num_old_high_res], values[:num_old])
+            )
+            take_indices = _thinned_indices(
+                old_times,
+                self._low_res_interval_s,
+                self._low_res.last() if len(self._low_res) > 0 else None,
+            )
+
+            self._low_res.extend(old_times[take_indices], old_values[take_indices])
+
+            self._high_res.drop_left(num_old_high_res)
+            self._high_res.extend(times[num_old:], values[num_old:])
 
             # clean very old samples from low res
 
-            while True:
-                if len(self._low_res_times) == 0:
-                    break
+            self._low_res.drop_left(
+                int(
+                    np.searchsorted(
+                        self._low_res.column(0),
+                        newest_time - self._low_res_max_age_s,
+                        "left",
+                    )
+                )
+            )
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the (high and low res) samples
+        """
+
+        with self._lock:
+            return self._high_res.nbytes + self._low_res.nbytes
+
+    def snapshot(self) -> "FloatStatusLogSnapshot":
 
-                if new_time - self._low_res_times[0] > self._low_res_max_age_s:
-                    self._low_res_times.popleft()
-                    self._low_res_values.popleft()
+        with self._lock:
+
+            series = []
+            for buffer in (self._low_res, self._high_res):
+                if isinstance(buffer, CompressedSeries):
+                    series.append(buffer.snapshot())
                 else:
-                    break
+                    series.append(SeriesSnapshot.from_arrays(*buffer.snapshot()))
+
+            return FloatStatusLogSnapshot(
+                self._version,
+                series,
+                [tier.snapshot() for tier in self._aggregate_tiers],
+            )
+
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+        resolution_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        return self.snapshot().get_arrays(min_time_s, max_time_s, resolution_s)
 
     def get_values(
-        self, min_time_s: ty.Optional[float] = None
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+        resolution_s: ty.Optional[float] = None,
     ) -> ty.Tuple[ty.List[float], ty.List[ty.Optional[float]]]:
+        return self.snapshot().get_values(min_time_s, max_time_s, resolution_s)
+
+    def get_aggregate_arrays(
+        self,
+        resolution_s: float,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return self.snapshot().get_aggregate_arrays(
+            resolution_s, min_time_s, max_time_s
+        )
+
+    def get_aggregates(
+        self,
+        resolution_s: float,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[ty.List[float], ty.List[float], ty.List[float], ty.List[float]]:
+        return self.snapshot().get_aggregates(resolution_s, min_time_s, max_time_s)
+
+    def get_newest_value(self) -> ty.Tuple[ty.Optional[float], ty.Optional[float]]:
         """
         Returns:
             times,  values
         """
 
         with self._lock:
-            all_times = list(self._low_res_times + self._high_res_times)
-            all_values = list(self._low_res_values + self._high_res_values)
+            if len(self._high_res) == 0:
+                return None, None
 
-            if min_time_s is None:
-                return all_times, all_values
+            newest_value = float(self._high_res.last(1))
 
-            if len(all_times) == 0 or all_times[-1] < min_time_s:
-                return [], []
+            return (
+                float(self._high_res.last(0)),
+                None if np.isnan(newest_value) else newest_value,
+            )
+
+
+class FloatStatusLogSnapshot(AbstractStatusLogSnapshot):
+
+    """
+    Immutable view of the samples (and aggregates) of a FloatStatusLog
+    """
+
+    def __init__(
+        self,
+        version: int,
+        series: ty.Sequence[SeriesSnapshot],
+        aggregate_tiers: ty.Sequence[AggregateTierSnapshot],
+    ) -> None:
+
+        self._version = version
+        self._series = series  # low res then high res
+        self._aggregate_tiers = aggregate_tiers
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def to_aggregate_arrays(self) -> ty.Dict[float, np.ndarray]:
+        return {tier.interval_s: tier.to_rows() for tier in self._aggregate_tiers}
+
+    def _select_tier(
+        self, resolution_s: ty.Optional[float]
+    ) -> ty.Optional[AggregateTierSnapshot]:
+        """
+        The coarsest aggregate tier that is at least as fine as resolution_s
+        """
+
+        if resolution_s is None:
+            return None
+
+        selected_tier = None
+        for tier in self._aggregate_tiers:
+            if tier.interval_s <= resolution_s:
+                selected_tier = tier
+
+        return selected_tier
+
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+        resolution_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        """
+        Array (missing values are NaN) equivalent of get_values
+        """
 
-            index = len(all_times) - 1
+        tier = self._select_tier(resolution_s)
+        if tier is not None:
+            tier_times, _, _, tier_means = tier.get_values(min_time_s, max_time_s)
+            return tier_times, tier_means
 
-            while index > 0:
-                if all_times[index] <= min_time_s:
-                    index += 1
-                    break
+        times = []
+        values = []
 
-                index -= 1
+        for series in self._series:
+            series_times, series_values = series.get_arrays(min_time_s, max_time_s)
+            times.append(series_times)
+            values.append(series_values)
 
-            return all_times[index:], all_values[index:]
+        return np.concatenate(times), np.concatenate(values)
+
+    def get_values(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+        resolution_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[ty.List[float], ty.List[ty.Optional[float]]]:
+        """
+        Samples with: min_time_s < time <= max_time_s (None for no bound)
+
+        If resolution_s is provided and an aggregate tier at least that fine
+        exists the bucket means of the coarsest such tier are returned instead
+        of the raw samples.
+
+        Returns:
+            times,  values
+        """
+
+        times, values = self.get_arrays(min_time_s, max_time_s, resolution_s)
+
+        return times.tolist(), optional_list(values)
+
+    def _select_aggregate_tier(self, resolution_s: float) -> AggregateTierSnapshot:
+
+        tier = self._select_tier(resolution_s)
+        if tier is None:
+            raise ValueError(
+                f"No aggregate tier with a resolution of {resolution_s} s or finer"
+            )
+
+        return tier
+
+    def get_aggregate_interval_s(self, resolution_s: float) -> float:
+        """
+        Bucket width of the aggregates returned for resolution_s
+        """
+
+        return self._select_aggregate_tier(resolution_s).interval_s
+
+    def get_aggregate_arrays(
+        self,
+        resolution_s: float,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Array equivalent of get_aggregates
+        """
+
+        tier = self._select_aggregate_tier(resolution_s)
+
+        return tier.get_values(min_time_s, max_time_s)
+
+    def get_aggregates(
+        self,
+        resolution_s: float,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[ty.List[float], ty.List[float], ty.List[float], ty.List[float]]:
+        """
+        Per-bucket aggregates from the coarsest tier at least as fine as
+        resolution_s (see get_values for the time bounds)
+
+        Returns:
+            bucket start times, mins, maxs, means
+        """
+
+        times, mins, maxs, means = self.get_aggregate_arrays(
+            resolution_s, min_time_s, max_time_s
+        )
+
+        return times.tolist(), mins.tolist(), maxs.tolist(), means.tolist()
 
     def get_newest_value(self) -> ty.Tuple[ty.Optional[float], ty.Optional[float]]:
         """
@@ -197,14 +936,32 @@ class FloatStatusLog(AbstractStatusLog):
             times,  values
         """
 
-        with self._lock:
-            if len(self._high_res_times) == 0:
-                return None, None
+        newest = self._series[-1].get_newest()
+
+        if newest is None:
+            return None, None
 
-            return self._high_res_times[-1], self._high_res_values[-1]
+        newest_time, newest_value = newest
+
+        return newest_time, None if np.isnan(newest_value) else newest_value
 
 
 class BinaryStatusLog(AbstractStatusLog):
+
+    """
+    Manages a run-length encoded log of a (slowly changing) binary state
+
+    Each run of identical samples is stored as its first and latest sample
+    time. A state is taken to hold until the start of the next run. Runs
+    whose latest sample is older than max_age_s are dropped.
+    """
+
+    # columns of the run buffer
+    _START = 0
+    _END = 1
+    _VALUE = 2
+    _ON_TIME = 3  # cumulative on time before the start of the run
+
     def __init__(
         self, settings: BinaryStatusLogSettings = BinaryStatusLogSettings()
     ) -> None:
@@ -212,6 +969,7 @@ class BinaryStatusLog(AbstractStatusLog):
         self._lock = Lock()
 
         with self._lock:
+            self._version = 0
             self._max_age_s = settings.max_age_s
 
         self.clear()
@@ -223,9 +981,19 @@ class BinaryStatusLog(AbstractStatusLog):
     ) -> "BinaryStatusLog":
 
         log = BinaryStatusLog(settings)
+        log.add_samples(log_data.times, log_data.values)
+
+        return log
+
+    @staticmethod
+    def from_arrays(
+        times: np.ndarray,
+        values: np.ndarray,
+        settings: BinaryStatusLogSettings = BinaryStatusLogSettings(),
+    ) -> "BinaryStatusLog":
 
-        for index, time in enumerate(log_data.times):
-            log.add_sample(time, log_data.values[index])
+        log = BinaryStatusLog(settings)
+        log.add_samples(times, values)
 
         return log
 
@@ -240,67 +1008,343 @@ class BinaryStatusLog(AbstractStatusLog):
 
     def clear(self) -> None:
         with self._lock:
-            self._times: deque[float] = deque()
-            self._values: deque[bool] = deque()
+            self._version += 1
+            self._runs = SampleBuffer(
+                dtypes=(np.float64, np.float64, np.uint8, np.float64)
+            )
+
+    @property
+    def num_runs(self) -> int:
+        with self._lock:
+            return len(self._runs)
+
+    def _prune(self, newest_time: float) -> None:
+
+        if len(self._runs) == 0 or (
+            newest_time - self._runs.first(self._END) <= self._max_age_s
+        ):
+            return
+
+        self._runs.drop_left(
+            int(
+                np.searchsorted(
+                    self._runs.column(self._END), newest_time - self._max_age_s, "left"
+                )
+            )
+        )
 
     def add_sample(self, new_time: float, new_value: bool) -> None:
 
         with self._lock:
 
-            if new_value:  # hold on to all true values
-                self._times.append(new_time)
-                self._values.append(new_value)
-            elif len(self._times) <= 2:
-                self._times.append(new_time)
-                self._values.append(new_value)
-            elif self._values[-1] == new_value and self._values[-2] == new_value:
-                self._times[-1] = new_time
+            runs = self._runs
+
+            assert len(runs) == 0 or new_time > runs.last(self._END)
+
+            self._version += 1
+
+            if len(runs) > 0 and bool(runs.last(self._VALUE)) == bool(new_value):
+                runs.set_last(self._END, new_time)
             else:
-                self._times.append(new_time)
-                self._values.append(new_value)
+                on_time = (
+                    0.0
+                    if len(runs) == 0
+                    else runs.last(self._ON_TIME)
+                    + runs.last(self._VALUE) * (new_time - runs.last(self._START))
+                )
+                runs.append(new_time, new_time, new_value, on_time)
+
+            self._prune(new_time)
+
+    def add_samples(
+        self, new_times: ty.Sequence[float], new_values: ty.Sequence[bool]
+    ) -> None:
+        """
+        Bulk equivalent of calling add_sample for each sample in turn
+        """
+
+        times = _as_time_array(new_times)
+        values = np.asarray(new_values, dtype=np.bool_)
+
+        if len(times) != len(values):
+            raise ValueError(
+                f"Got {len(times)} times but {len(values)} values to add to log"
+            )
+
+        if len(times) == 0:
+            return
+
+        with self._lock:
+
+            runs = self._runs
 
-            # clean too-old samples
+            assert len(runs) == 0 or times[0] > runs.last(self._END)
 
-            while True:
-                if len(self._times) == 0:
-                    break
+            self._version += 1
 
-                if new_time - self._times[0] > self._max_age_s:
-                    self._times.popleft()
-                    self._values.popleft()
+            run_start = np.ones(len(values), dtype=np.bool_)
+            run_start[1:] = values[1:] != values[:-1]
+
+            run_end = np.ones(len(values), dtype=np.bool_)
+            run_end[:-1] = run_start[1:]
+
+            starts = times[run_start]
+            ends = times[run_end]
+            run_values = values[run_start]
+
+            # continue the stored run
+
+            if len(runs) > 0 and bool(runs.last(self._VALUE)) == run_values[0]:
+                runs.set_last(self._END, ends[0])
+                starts, ends, run_values = starts[1:], ends[1:], run_values[1:]
+
+            if len(starts) > 0:
+
+                if len(runs) > 0:
+                    previous_start = runs.last(self._START)
+                    previous_value = runs.last(self._VALUE)
+                    previous_on_time = runs.last(self._ON_TIME)
                 else:
-                    break
+                    previous_start = starts[0]
+                    previous_value = 0
+                    previous_on_time = 0.0
+
+                run_on_times = (
+                    np.diff(np.r_[previous_start, starts])
+                    * np.r_[previous_value, run_values[:-1]]
+                )
+
+                runs.extend(
+                    starts,
+                    ends,
+                    run_values,
+                    previous_on_time + np.cumsum(run_on_times),
+                )
+
+            self._prune(times[-1])
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def snapshot(self) -> "BinaryStatusLogSnapshot":
+        with self._lock:
+            return BinaryStatusLogSnapshot(self._version, self._runs.snapshot())
+
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        return self.snapshot().get_arrays(min_time_s, max_time_s)
 
     def get_values(
-        self, min_time_s: ty.Optional[float] = None
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
     ) -> ty.Tuple[ty.List[float], ty.List[int]]:
+        return self.snapshot().get_values(min_time_s, max_time_s)
+
+    def get_value_at(self, time_s: float) -> ty.Optional[int]:
+        return self.snapshot().get_value_at(time_s)
+
+    def get_on_time_s(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> float:
+        return self.snapshot().get_on_time_s(min_time_s, max_time_s)
+
+    def get_on_time_buckets(
+        self,
+        interval_s: float,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        return self.snapshot().get_on_time_buckets(interval_s, min_time_s, max_time_s)
+
+    def get_newest_value(self) -> ty.Tuple[ty.Optional[float], ty.Optional[int]]:
         """
         Returns:
-            times,  values
+            time,  value
+
+        n.b. read directly (a snapshot would force the next sample to copy
+        the runs)
         """
+
         with self._lock:
-            if min_time_s is None:
-                return (
-                    list(self._times),
-                    np.asarray(list(self._values), dtype=np.int_).tolist(),
-                )
 
-            if len(self._times) == 0 or self._times[-1] < min_time_s:
-                return [], []
+            if len(self._runs) == 0:
+                return None, None
 
-            index = len(self._times) - 1
+            return float(self._runs.last(self._END)), int(self._runs.last(self._VALUE))
 
-            while index > 0:
-                if self._times[index] <= min_time_s:
-                    index += 1
-                    break
 
-                index -= 1
+class BinaryStatusLogSnapshot(AbstractStatusLogSnapshot):
 
-            return (
-                list(self._times)[index:],
-                (np.asarray(self._values, dtype=np.int_)[index:]).tolist(),
-            )
+    """
+    Immutable view of the runs of a BinaryStatusLog
+    """
+
+    def __init__(self, version: int, runs: ty.Sequence[np.ndarray]) -> None:
+
+        self._version = version
+        self._starts, self._ends, self._values, self._on_times = runs
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get_arrays(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        """
+        Array (values as uint8) equivalent of get_values
+        """
+
+        # runs that overlap the time range
+
+        first_run = (
+            0
+            if min_time_s is None
+            else np.searchsorted(self._ends, min_time_s, "right")
+        )
+        last_run = (
+            len(self._starts)
+            if max_time_s is None
+            else np.searchsorted(self._starts, max_time_s, "right")
+        )
+        index = slice(int(first_run), max(int(first_run), int(last_run)))
+
+        starts = self._starts[index]
+        ends = self._ends[index]
+        values = self._values[index]
+
+        times = np.column_stack((starts, ends)).ravel()
+        values = np.repeat(values, 2)
+
+        keep = np.ones(len(times), dtype=np.bool_)
+        keep[1::2] = ends > starts  # single sample runs
+
+        if min_time_s is not None:
+            keep &= times > min_time_s
+
+        if max_time_s is not None:
+            keep &= times <= max_time_s
+
+        return times[keep], values[keep]
+
+    def get_values(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[ty.List[float], ty.List[int]]:
+        """
+        The first and latest sample of each run with:
+            min_time_s < time <= max_time_s (None for no bound)
+
+        Returns:
+            times,  values
+        """
+
+        times, values = self.get_arrays(min_time_s, max_time_s)
+
+        return times.tolist(), values.astype(np.int_).tolist()
+
+    def get_value_at(self, time_s: float) -> ty.Optional[int]:
+        """
+        The state at time_s (None if this precedes or follows the log)
+        """
+
+        if len(self._starts) == 0 or time_s > self._ends[-1]:
+            return None
+
+        index = int(np.searchsorted(self._starts, time_s, "right")) - 1
+        if index < 0:
+            return None
+
+        return int(self._values[index])
+
+    def _on_time_until(self, times: np.ndarray) -> np.ndarray:
+        """
+        Cumulative on time (since the start of the log) at each of times
+        """
+
+        index = np.searchsorted(self._starts, times, "right") - 1
+        run = np.maximum(index, 0)
+
+        held_until = np.where(
+            run < len(self._starts) - 1, times, np.minimum(times, self._ends[-1])
+        )
+
+        return np.where(
+            index < 0,
+            self._on_times[0],
+            self._on_times[run] + self._values[run] * (held_until - self._starts[run]),
+        )
+
+    def get_on_time_s(
+        self,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> float:
+        """
+        Total time for which the state was True between min_time_s and
+        max_time_s (None for no bound)
+        """
+
+        if len(self._starts) == 0:
+            return 0.0
+
+        on_time_s = float(
+            self._on_time_until(self._ends[-1] if max_time_s is None else max_time_s)
+        )
+
+        if min_time_s is not None:
+            on_time_s -= float(self._on_time_until(min_time_s))
+
+        return max(on_time_s, 0.0)
+
+    def get_on_time_buckets(
+        self,
+        interval_s: float,
+        min_time_s: ty.Optional[float] = None,
+        max_time_s: ty.Optional[float] = None,
+    ) -> ty.Tuple[np.ndarray, np.ndarray]:
+        """
+        Time for which the state was True in each interval_s wide bucket
+        (aligned to the epoch) with: min_time_s < bucket start <= max_time_s
+
+        n.b. derived from the cumulative on time at the bucket edges and so
+        costs O(buckets log runs)
+
+        Returns:
+            bucket start times, on times
+        """
+
+        if interval_s <= 0:
+            raise ValueError(f"Bucket interval must be positive (got: {interval_s} s)")
+
+        if len(self._starts) == 0:
+            return np.empty(0), np.empty(0)
+
+        first_bucket = np.floor(self._starts[0] / interval_s)
+        last_bucket = np.floor(self._ends[-1] / interval_s)
+
+        if min_time_s is not None:
+            first_bucket = max(first_bucket, np.floor(min_time_s / interval_s) + 1)
+        if max_time_s is not None:
+            last_bucket = min(last_bucket, np.floor(max_time_s / interval_s))
+
+        if last_bucket < first_bucket:
+            return np.empty(0), np.empty(0)
+
+        edges = np.arange(first_bucket, last_bucket + 2) * interval_s
+
+        return edges[:-1], np.diff(self._on_time_until(edges))
 
     def get_newest_value(self) -> ty.Tuple[ty.Optional[float], ty.Optional[int]]:
         """
@@ -308,9 +1352,7 @@ class BinaryStatusLog(AbstractStatusLog):
             time,  value
         """
 
-        with self._lock:
-
-            if len(self._times) == 0:
-                return None, None
+        if len(self._starts) == 0:
+            return None, None
 
-            return self._times[-1], int(self._values[-1])
+        return float(self._ends[-1]), int(self._values[-1])
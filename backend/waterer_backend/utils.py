@@ -4,6 +4,7 @@
 # Imports
 ###############################################################
 
+import typing as ty
 from datetime import datetime, time
 
 ###############################################################
@@ -27,13 +28,27 @@ def update_spans_activation_time(
 
     assert last_update_dt < current_dt
 
-    update_dt_today = time_today_from_update_time(update_time)
+    # n.b. the update time on the day of each end of the interval (which is
+    # much shorter than a day) e.g. for intervals spanning midnight or the
+    # days of a virtual clock
+    for day in {last_update_dt.date(), current_dt.date()}:
+        update_dt = datetime.combine(day, update_time.time())
 
-    return last_update_dt < update_dt_today and update_dt_today <= current_dt
+        if last_update_dt < update_dt and update_dt <= current_dt:
+            return True
+
+    return False
 
 
 ###############################################################
 
 
-def day_of_the_year() -> int:
-    return datetime.now().timetuple().tm_yday
+def day_of_the_year(the_time: ty.Optional[datetime] = None) -> int:
+    """
+    the_time: defaults to now
+    """
+
+    if the_time is None:
+        the_time = datetime.now()
+
+    return the_time.timetuple().tm_yday
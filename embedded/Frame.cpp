@@ -0,0 +1,42 @@
+#include "Frame.h"
+
+// n.b. the index is the opcode (must stay in sync with binary_frame.py)
+static const char *kInstructions[] = {"get_state",   "turn_on",
+                                      "turn_off",    "get_voltage",
+                                      "get_version", "get_all_status"};
+static const uint8_t kNumInstructions =
+    sizeof(kInstructions) / sizeof(kInstructions[0]);
+
+uint16_t CRC16(const uint8_t *data, size_t length) {
+  uint16_t crc = 0xFFFF;
+
+  for (size_t idx = 0; idx < length; ++idx) {
+    crc ^= (uint16_t)data[idx] << 8;
+    for (uint8_t bit = 0; bit < 8; ++bit)
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+
+  return crc;
+}
+
+uint8_t OpcodeFromInstruction(const String &instruction) {
+  for (uint8_t opcode = 0; opcode < kNumInstructions; ++opcode)
+    if (instruction == kInstructions[opcode]) return opcode;
+
+  return kUnknownOpcode;
+}
+
+String InstructionFromOpcode(uint8_t opcode) {
+  if (opcode >= kNumInstructions) return "";
+
+  return kInstructions[opcode];
+}
+
+void WriteU16(uint8_t *buffer, uint16_t value) {
+  buffer[0] = value & 0xFF;
+  buffer[1] = value >> 8;
+}
+
+uint16_t ReadU16(const uint8_t *buffer) {
+  return (uint16_t)buffer[0] | ((uint16_t)buffer[1] << 8);
+}
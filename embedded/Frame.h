@@ -0,0 +1,51 @@
+#pragma once
+
+#include "Arduino.h"
+
+#include "HWDef.h"
+
+/*
+
+Compact binary framing (alternative to the json lines)
+
+A request frame starts with kRequestSync (and so is distinguished from a json
+request which starts with '{') and the response to it is also a frame.
+
+request (kRequestFrameSize bytes):
+  sync (u8), opcode (u8), id (u16), channel (i8), data (i32), crc (u16)
+
+response (kResponseHeaderSize + 4 * num_values + kCRCSize bytes):
+  sync (u8), opcode (u8), id (u16), channel (i8), status (u8), data (f32),
+  num_values (u8), values (f32 x num_values), crc (u16)
+
+status: 0 on success else an error code
+
+n.b. little endian, crc: CRC-16/CCITT-FALSE of all of the preceding bytes
+
+*/
+
+const uint8_t kRequestSync = 0xA5;
+const uint8_t kResponseSync = 0x5A;
+
+const size_t kRequestFrameSize = 11;
+const size_t kResponseHeaderSize = 11;
+const size_t kCRCSize = 2;
+const size_t kMaxResponseFrameSize =
+    kResponseHeaderSize + 4 * MAX_RESPONSE_VALUES + kCRCSize;
+
+const uint8_t kUnknownOpcode = 0xFF;
+
+// error codes
+const uint8_t kStatusOK = 0;
+const uint8_t kErrorInvalidChannel = 1;
+const uint8_t kErrorUnrecognizedInstruction = 2;
+const uint8_t kErrorBadFrame = 3;
+
+uint16_t CRC16(const uint8_t *data, size_t length);
+
+// kUnknownOpcode/"" if unrecognized
+uint8_t OpcodeFromInstruction(const String &instruction);
+String InstructionFromOpcode(uint8_t opcode);
+
+void WriteU16(uint8_t *buffer, uint16_t value);
+uint16_t ReadU16(const uint8_t *buffer);
@@ -15,6 +15,10 @@ extern const int DT_WAIT_FOR_SERIAL_PORT_MS;
 
 #define JSON_DOC_SIZE 200
 
+// Voltage and state of each pump (get_all_status)
+#define MAX_RESPONSE_VALUES 6
+#define RESPONSE_JSON_DOC_SIZE (JSON_DOC_SIZE + JSON_ARRAY_SIZE(MAX_RESPONSE_VALUES))
+
 // Scaling
 
 extern const int AIN_LEVELS;
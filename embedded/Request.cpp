@@ -1,6 +1,7 @@
 #include "Request.h"
 
 #include <ArduinoJson.h>
+#include "Frame.h"
 #include "HWDef.h"
 
 const String CRequest::kIDKey = "id";
@@ -52,6 +53,38 @@ CRequest CRequest::Create(String doc_as_str, bool &success,
   return request;
 }
 
+CRequest CRequest::CreateFromFrame(const uint8_t *frame, bool &success,
+                                   String &error_message) {
+  CRequest request;
+
+  request.m_ID = ReadU16(frame + 2);
+
+  if (frame[0] != kRequestSync) {
+    error_message = "Missing frame sync.";
+    success = false;
+    return request;
+  }
+
+  if (CRC16(frame, kRequestFrameSize - kCRCSize) !=
+      ReadU16(frame + kRequestFrameSize - kCRCSize)) {
+    error_message = "Frame CRC mismatch.";
+    success = false;
+    return request;
+  }
+
+  // n.b. an unknown opcode leaves the instruction empty (i.e. unrecognized)
+  request.m_Instruction = InstructionFromOpcode(frame[1]);
+  request.m_Channel = (int8_t)frame[4];
+
+  int32_t data;
+  memcpy(&data, frame + 5, sizeof(data));
+  request.m_Data = data;
+
+  success = true;
+
+  return request;
+}
+
 String CRequest::Serialize() {
   StaticJsonDocument<JSON_DOC_SIZE> doc;
   doc[kIDKey] = m_ID;
@@ -15,6 +15,9 @@ class CRequest : public ISerializableEntity {
   CRequest(long id, long channel, String instruction, long data);
   static CRequest Create(String request_as_str, bool &success,
                          String &error_message);
+  // frame: kRequestFrameSize bytes (see Frame.h)
+  static CRequest CreateFromFrame(const uint8_t *frame, bool &success,
+                                  String &error_message);
   String Serialize();
 
  public:
@@ -1,6 +1,7 @@
 #include "Response.h"
 
 #include <ArduinoJson.h>
+#include "Frame.h"
 #include "HWDef.h"
 
 const String CResponse::kIDKey = "id";
@@ -9,6 +10,7 @@ const String CResponse::kInstructionKey = "instruction";
 const String CResponse::kSuccessKey = "success";
 const String CResponse::kDataKey = "data";
 const String CResponse::kMessageKey = "message";
+const String CResponse::kValuesKey = "values";
 
 CResponse::CResponse()
     : m_ID{-1},
@@ -16,7 +18,9 @@ CResponse::CResponse()
       m_Instruction{""},
       m_Success{false},
       m_Data{-1.0f},
-      m_Message{""} {}
+      m_Message{""},
+      m_ErrorCode{kStatusOK},
+      m_NumValues{0} {}
 
 CResponse::CResponse(const CRequest &request)
     : m_ID{request.m_ID},
@@ -24,7 +28,9 @@ CResponse::CResponse(const CRequest &request)
       m_Instruction{request.m_Instruction},
       m_Success{false},
       m_Data{-1.0f},
-      m_Message{""} {}
+      m_Message{""},
+      m_ErrorCode{kStatusOK},
+      m_NumValues{0} {}
 
 CResponse::CResponse(long ID, long channel, String instruction, bool success,
                      float data, String message)
@@ -33,11 +39,13 @@ CResponse::CResponse(long ID, long channel, String instruction, bool success,
       m_Instruction{instruction},
       m_Success{success},
       m_Data{data},
-      m_Message{message} {}
+      m_Message{message},
+      m_ErrorCode{kStatusOK},
+      m_NumValues{0} {}
 
 CResponse CResponse::Create(String doc_as_str, bool &success,
                             String &error_message) {
-  StaticJsonDocument<JSON_DOC_SIZE> doc;
+  StaticJsonDocument<RESPONSE_JSON_DOC_SIZE> doc;
 
   CResponse response;
 
@@ -75,11 +83,20 @@ CResponse CResponse::Create(String doc_as_str, bool &success,
   response.m_Data = doc[kDataKey];
   response.m_Message = doc[kMessageKey].as<String>();
 
+  if (doc.containsKey(kValuesKey)) {
+    JsonArray values = doc[kValuesKey];
+    for (JsonVariant value : values) {
+      if (response.m_NumValues >= MAX_RESPONSE_VALUES)
+        return exit_error("Too many values");
+      response.m_Values[response.m_NumValues++] = value;
+    }
+  }
+
   return response;
 }
 
 String CResponse::Serialize() {
-  DynamicJsonDocument doc(JSON_DOC_SIZE);
+  DynamicJsonDocument doc(RESPONSE_JSON_DOC_SIZE);
 
   doc[kIDKey] = m_ID;
   doc[kChannelKey] = m_Channel;
@@ -88,9 +105,44 @@ String CResponse::Serialize() {
   doc[kDataKey] = m_Data;
   doc[kMessageKey] = m_Message;
 
+  // n.b. omitted when empty so that other responses are unchanged
+  if (m_NumValues > 0) {
+    JsonArray values = doc.createNestedArray(kValuesKey);
+    for (int idx = 0; idx < m_NumValues; ++idx) values.add(m_Values[idx]);
+  }
+
   String doc_as_str;
 
   serializeJson(doc, doc_as_str);
 
   return doc_as_str;
-}
\ No newline at end of file
+}
+
+size_t CResponse::SerializeFrame(uint8_t *buffer) const {
+  size_t size{0};
+
+  buffer[size++] = kResponseSync;
+  buffer[size++] = OpcodeFromInstruction(m_Instruction);
+  WriteU16(buffer + size, (uint16_t)m_ID);
+  size += 2;
+  buffer[size++] = (uint8_t)(int8_t)m_Channel;
+
+  if (m_Success)
+    buffer[size++] = kStatusOK;
+  else
+    buffer[size++] = m_ErrorCode == kStatusOK ? kErrorBadFrame : m_ErrorCode;
+
+  memcpy(buffer + size, &m_Data, sizeof(m_Data));
+  size += sizeof(m_Data);
+
+  buffer[size++] = (uint8_t)m_NumValues;
+  for (int idx = 0; idx < m_NumValues; ++idx) {
+    memcpy(buffer + size, &m_Values[idx], sizeof(m_Values[idx]));
+    size += sizeof(m_Values[idx]);
+  }
+
+  WriteU16(buffer + size, CRC16(buffer, size));
+  size += kCRCSize;
+
+  return size;
+}
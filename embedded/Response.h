@@ -2,6 +2,7 @@
 
 #include "Arduino.h"
 
+#include "HWDef.h"
 #include "ISerializableEntity.h"
 #include "Request.h"
 
@@ -13,6 +14,7 @@ class CResponse : public ISerializableEntity {
   static const String kSuccessKey;
   static const String kDataKey;
   static const String kMessageKey;
+  static const String kValuesKey;
 
   CResponse();
   CResponse(const CRequest &request);
@@ -23,6 +25,8 @@ class CResponse : public ISerializableEntity {
   static CResponse Create(String doc_as_str, bool &success,
                           String &error_message);
   String Serialize();
+  // returns the number of bytes written (at most kMaxResponseFrameSize)
+  size_t SerializeFrame(uint8_t *buffer) const;
 
  public:
   long m_ID;
@@ -31,4 +35,9 @@ class CResponse : public ISerializableEntity {
   String m_Instruction;
   float m_Data;
   String m_Message;
+  uint8_t m_ErrorCode;  // frame status if unsuccessful (see Frame.h)
+
+  // e.g. get_all_status: [V_0, state_0, V_1, state_1, ...]
+  float m_Values[MAX_RESPONSE_VALUES];
+  int m_NumValues;
 };
@@ -5,6 +5,7 @@
 
 #include "UI.h"
 
+#include "Frame.h"
 #include "HWDef.h"
 
 #include "Version.h"
@@ -50,6 +51,12 @@ void CUI::Update() {
 
   if (!m_SerialPort.available()) return;
 
+  // n.b. a json request starts with '{'
+  if (m_SerialPort.peek() == kRequestSync) {
+    HandleFrame();
+    return;
+  }
+
   String request_str = m_SerialPort.readStringUntil(kLineEnding);
   request_str.trim();
 
@@ -69,17 +76,46 @@ void CUI::Update() {
   m_SerialPort.println("");
 }
 
+void CUI::HandleFrame() {
+  uint8_t frame[kRequestFrameSize];
+  size_t num_read = m_SerialPort.readBytes(frame, kRequestFrameSize);
+
+  bool deserialize_ok{false};
+  String error_msg;
+  CRequest request;
+
+  if (num_read == kRequestFrameSize)
+    request = CRequest::CreateFromFrame(frame, deserialize_ok, error_msg);
+
+  CResponse response{request};
+
+  if (deserialize_ok) {
+    response = HandleRequest(request);
+  } else {
+    response.m_Success = false;
+    response.m_ErrorCode = kErrorBadFrame;
+  }
+
+  uint8_t buffer[kMaxResponseFrameSize];
+  m_SerialPort.write(buffer, response.SerializeFrame(buffer));
+}
+
 //
 
 CResponse CUI::HandleRequest(const CRequest &request) {
   CResponse response{request};
 
+  // addresses every channel so handled before the channel is checked
+  if (request.m_Instruction == "get_all_status")
+    return HandleGetAllStatus(request);
+
   bool success{false};
   CSmartPump &smart_pump = m_PumpManager.GetPump(request.m_Channel, success);
 
   if (!success) {
     response.m_Success = false;
     response.m_Message = "Invalid channel";
+    response.m_ErrorCode = kErrorInvalidChannel;
     return response;
   }
 
@@ -114,9 +150,36 @@ CResponse CUI::HandleRequest(const CRequest &request) {
   } else {
     response.m_Success = false;
     response.m_Instruction = "";
+    response.m_ErrorCode = kErrorUnrecognizedInstruction;
     response.m_Message =
         "Error: Unrecognized instruction: " + request.m_Instruction;
   }
 
   return response;
 }
+
+CResponse CUI::HandleGetAllStatus(const CRequest &request) {
+  CResponse response{request};
+
+  for (long channel = 0; channel < CPumpManager::kNumPumps; ++channel) {
+    bool success{false};
+    CSmartPump &smart_pump = m_PumpManager.GetPump(channel, success);
+
+    if (!success || response.m_NumValues + 2 > MAX_RESPONSE_VALUES) {
+      response.m_Success = false;
+      response.m_Message = "Invalid channel";
+      response.m_ErrorCode = kErrorInvalidChannel;
+      return response;
+    }
+
+    response.m_Values[response.m_NumValues++] =
+        smart_pump.GetHumiditySensor().GetVoltage();
+    response.m_Values[response.m_NumValues++] =
+        (bool)smart_pump.GetPump().GetOutputState();
+  }
+
+  response.m_Success = true;
+  response.m_Data = CPumpManager::kNumPumps;
+
+  return response;
+}
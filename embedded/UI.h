@@ -19,7 +19,9 @@ class CUI : public IEventLoopEntity {
 
  private:
   bool ParseRequest(const String &request_str, CRequest &request) const;
+  void HandleFrame();
   CResponse HandleRequest(const CRequest &request);
+  CResponse HandleGetAllStatus(const CRequest &request);
 
   void ReportError(const String &error_msg) const;
 
@@ -1,6 +1,6 @@
 #include "Version.h"
 
 extern const int VERSION_MAJOR = 1;
-extern const int VERSION_MINOR = 0;
+extern const int VERSION_MINOR = 2;
 
 float GetVersion() { return VERSION_MAJOR + 0.1 * VERSION_MINOR; }
\ No newline at end of file